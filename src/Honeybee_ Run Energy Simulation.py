@@ -22,6 +22,8 @@
 Use this component to export HBZones into an IDF file, and run them through EnergyPlus.
 _
 The component outputs the report from the simulation, the file path of the IDF file, and the CSV result file from the EnergyPlus run.
+_
+IDF objects of zones, surfaces, constructions, materials and schedules are cached between the runs so in a parametric study only the objects that have been changed are written again.
 -
 Provided by Honeybee 0.0.65
     Args:
@@ -45,7 +47,7 @@ Provided by Honeybee 0.0.65
         simulationOutputs_: A list of the outputs that you would like EnergyPlus to write into the result CSV file.  This can be any set of any outputs that you would like from EnergyPlus, writen as a list of text that will be written into the IDF.  It is recommended that, if you are not expereinced with writing EnergyPlus outputs, you should use the "Honeybee_Write EP Result Parameters" component to request certain types of common outputs.  If no value is input here, this component will automatically request outputs of heating, cooling, lighting, and equipment energy use.
         +++++++++++++++: ...
         _writeIdf: Set to "True" to have the component take your HBZones and other inputs and write them into an IDF file.  The file path of the resulting file will appear in the idfFileAddress output of this component.  Note that only setting this to "True" and not setting the output below to "True" will not automatically run the IDF through EnergyPlus for you.
-        runEnergyPlus_: Set to "True" to have the component run your IDF through EnergyPlus once it has finished writing it.  This will ensure that a CSV result file appears in the resultFileAddress output. Set to 2 if you want the analysis to run in background. This option is useful for parametric runs when you don't want to see command shells.
+        runEnergyPlus_: Set to "True" to have the component run your IDF through EnergyPlus once it has finished writing it.  This will ensure that a CSV result file appears in the resultFileAddress output. Set to 2 if you want the analysis to run in background. This option is useful for parametric runs when you don't want to see command shells. Set to 3 to run the analysis in background without converting the results to a CSV file (EnergyPlus 8.3 or newer). In this case resultFileAddress will be the eplusout.sql file of the simulation, which has no limit on the number of columns and can be read much faster by the Read EP Result components.
         +++++++++++++++: ...
         _workingDir_: An optional working directory to a folder on your system, into which your IDF and result files will be written.  NOTE THAT DIRECTORIES INPUT HERE SHOULD NOT HAVE ANY SPACES OR UNDERSCORES IN THE FILE PATH.
         _idfFileName_: Optional text which will be used to name your IDF and result files.  Change this to aviod over-writing results of previous energy simulations.
@@ -56,17 +58,17 @@ Provided by Honeybee 0.0.65
         report: Check here to see a report of the EnergyPlus run, including errors.
         idfFileAddress: The file path of the IDF file that has been generated on your machine.
         performanceSummary: The Html file path of the Building Utility Performance Summar. You can review the report by copying the file path, and open it in your web browser.
-        resultFileAddress: The file path of the CSV result file that has been generated on your machine.  This only happens when you set "runEnergyPlus_" to "True."
+        resultFileAddress: The file path of the CSV result file that has been generated on your machine.  This only happens when you set "runEnergyPlus_" to "True." If "runEnergyPlus_" is set to 3 this will be the path to the SQL result file.
         eioFileAddress:  The file path of the EIO file that has been generated on your machine.  This file contains information about the sizes of all HVAC equipment from the simulation.
         studyFolder: The directory in which the simulation has been run.  Connect this to the 'Honeybee_Lookup EnergyPlus' folder to bring many of the files in this directory into Grasshopper.
 """
 ghenv.Component.Name = "Honeybee_ Run Energy Simulation"
 ghenv.Component.NickName = 'runEnergySimulation'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "10 | Energy | Energy"
-#compatibleHBVersion = VER 0.0.63\nMAR_01_2018
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nJUL_24_2015
 ghenv.Component.AdditionalHelpFromDocStrings = "1"
 
@@ -82,6 +84,7 @@ import shutil
 import collections
 import subprocess
 import copy
+import StringIO
 
 rc.Runtime.HostUtils.DisplayOleAlerts(False)
 
@@ -113,6 +116,78 @@ class WriteIDF(object):
         self.workingDir = workingDir
         self.PVcount = 0
         self.PVcounter = 0
+        
+        # IDF objects of the previous runs. Only changed objects will be written again.
+        self.blockCache = sc.sticky["honeybee_IDFBlockCache"](ghenv.Component)
+    
+    @staticmethod
+    def copyIfChanged(source, target):
+        """Copy source to target unless target is a copy of the same version of source."""
+        try:
+            sourceStat, targetStat = os.stat(source), os.stat(target)
+            if sourceStat.st_size == targetStat.st_size and \
+               int(sourceStat.st_mtime) == int(targetStat.st_mtime): return False
+        except OSError:
+            pass
+        shutil.copy2(source, target)
+        return True
+    
+    def EPZoneBlock(self, zone):
+        """Cached version of EPZone."""
+        if zone.isPlenum:
+            zone.partOfArea = False
+        
+        fingerprint = (zone.name, zone.north, zone.origin.X, zone.origin.Y, zone.origin.Z, \
+                       zone.zoneType, zone.multiplier, zone.ceilingHeight, zone.volume, zone.floorArea, \
+                       zone.insideConvectionAlgorithm, zone.outsideConvectionAlgorithm, zone.partOfArea)
+        return self.blockCache.get("Zone", fingerprint, self.EPZone, zone)
+    
+    def EPZoneSurfaceBlock(self, surface):
+        """Cached version of EPZoneSurface."""
+        if int(surface.type) == 4: surface.type = 0
+        
+        # duplicated vertices are removed based on the tolerance of the document
+        fingerprint = (surface.name, surface.type, surface.construction, surface.parent.name, \
+                       surface.BC, surface.BCObject.name, surface.sunExposure, surface.windExposure, \
+                       surface.groundViewFactor, surface.vertexTuples(), sc.doc.ModelAbsoluteTolerance)
+        return self.blockCache.get("BuildingSurface", fingerprint, self.EPZoneSurface, surface)
+    
+    def EPFenSurfaceBlock(self, surface):
+        """Cached version of EPFenSurface."""
+        try:
+            # duplicated vertices are removed based on the tolerance of the document
+            fingerprint = [sc.sticky["honeybee_folders"]["EPVersion"], sc.doc.ModelAbsoluteTolerance]
+            for childSrf in surface.childSrfs:
+                fingerprint.append((childSrf.name, childSrf.type, childSrf.construction, childSrf.parent.name, \
+                                    childSrf.BCObject.name, childSrf.groundViewFactor, childSrf.frameName, \
+                                    childSrf.Multiplier, tuple(childSrf.shadingControlName), \
+                                    childSrf.vertexTuples()))
+        except AttributeError:
+            # let EPFenSurface report the problem
+            return self.EPFenSurface(surface)
+        
+        return self.blockCache.get("FenestrationSurface", tuple(fingerprint), self.EPFenSurface, surface)
+    
+    def EPMaterialBlock(self, materialName):
+        """Cached version of EPMaterialStr."""
+        materialName = materialName.strip()
+        fingerprint = (materialName, repr(sc.sticky["honeybee_windowMaterialLib"].get(materialName)), \
+                       repr(sc.sticky["honeybee_materialLib"].get(materialName)))
+        return self.blockCache.get("Material", fingerprint, self.EPMaterialStr, materialName)
+    
+    def EPConstructionBlock(self, constructionName):
+        """Cached version of EPConstructionStr."""
+        fingerprint = (constructionName, repr(sc.sticky["honeybee_constructionLib"].get(constructionName)))
+        return self.blockCache.get("Construction", fingerprint, self.EPConstructionStr, constructionName)
+    
+    def EPSCHBlock(self, scheduleName):
+        """Cached version of EPSCHStr. File-based schedules are not cached."""
+        if scheduleName.lower().endswith(".csv"): return self.EPSCHStr(scheduleName)
+        
+        scheduleName = scheduleName.upper()
+        fingerprint = (scheduleName, repr(sc.sticky["honeybee_ScheduleLib"].get(scheduleName)), \
+                       repr(sc.sticky["honeybee_ScheduleTypeLimitsLib"].get(scheduleName)))
+        return self.blockCache.get("Schedule", fingerprint, self.EPSCHStr, scheduleName)
 
     def EPZone(self, zone):
         if zone.isPlenum:
@@ -136,7 +211,7 @@ class WriteIDF(object):
         return zoneStr
 
     def EPZoneSurface (self, surface):
-        coordinates = surface.coordinates
+        coordinates = surface.vertexTuples()
         checked, coordinates= self.checkCoordinates(coordinates)
         if int(surface.type) == 4: surface.type = 0
         
@@ -155,11 +230,11 @@ class WriteIDF(object):
         
             str_2 = '\t';
             
-            for ptCount, pt in enumerate(coordinates):
+            for ptCount, (x, y, z) in enumerate(coordinates):
                 if ptCount < len (coordinates) - 1:
-                    str_2 = str_2 + `pt.X` + ',\n\t' + `pt.Y` + ',\n\t' + `pt.Z` + ',\n\t'
+                    str_2 = str_2 + `x` + ',\n\t' + `y` + ',\n\t' + `z` + ',\n\t'
                 else:
-                    str_2 = str_2 + `pt.X` + ',\n\t' + `pt.Y` + ',\n\t' + `pt.Z` + ';\n\n'
+                    str_2 = str_2 + `x` + ',\n\t' + `y` + ',\n\t' + `z` + ';\n\n'
             
             fullString = str_1 + str_2
             
@@ -346,9 +421,11 @@ class WriteIDF(object):
         # this is a place holder for now I just return true
         #return True, glzCoordinates
     
+        # coordinates are (x, y, z) tuples from the vertex store of the zone
+        tol2 = (2 * sc.doc.ModelAbsoluteTolerance) ** 2
         def isDuplicate(pt, newPts):
             for p in newPts:
-                if pt.DistanceTo(p) < 2 * sc.doc.ModelAbsoluteTolerance:
+                if (pt[0] - p[0]) ** 2 + (pt[1] - p[1]) ** 2 + (pt[2] - p[2]) ** 2 < tol2:
                     return True
             return False
             
@@ -372,7 +449,7 @@ class WriteIDF(object):
         try:
             for childSrf in surface.childSrfs:
                 # check surface area
-                glzCoordinates = childSrf.coordinates
+                glzCoordinates = childSrf.vertexTuples()
                 checked, glzCoordinates= self.checkCoordinates(glzCoordinates)
                 
                 # Set any shading control objects.
@@ -418,11 +495,11 @@ class WriteIDF(object):
                             '\t' + `len(glzCoordinates)` + ',\t!- Number of Vertices\n'
                 
                     str_2 = '\t';
-                    for ptCount, pt in enumerate(glzCoordinates):
+                    for ptCount, (x, y, z) in enumerate(glzCoordinates):
                         if ptCount < len (glzCoordinates) - 1:
-                            str_2 = str_2 + `pt.X` + ',\n\t' + `pt.Y` + ',\n\t' + `pt.Z` + ',\n\t'
+                            str_2 = str_2 + `x` + ',\n\t' + `y` + ',\n\t' + `z` + ',\n\t'
                         else:
-                            str_2 = str_2 + `pt.X` + ',\n\t' + `pt.Y` + ',\n\t' + `pt.Z` + ';\n\n'
+                            str_2 = str_2 + `x` + ',\n\t' + `y` + ',\n\t' + `z` + ';\n\n'
                     
                     glzStr += str_1 + str_2
                 
@@ -1194,9 +1271,9 @@ class WriteIDF(object):
             scheduleFileName = os.path.basename(scheduleName)
             scheduleObjectName = "_".join(scheduleFileName.split(".")[:-1])
             
-            # copy schedule file into working dir
+            # copy schedule file into working dir if it has been changed since the last run
             scheduleNewAddress = os.path.join(self.workingDir, scheduleFileName)
-            shutil.copyfile(scheduleName, scheduleNewAddress)
+            self.copyIfChanged(scheduleName, scheduleNewAddress)
             
             # put them as key, value so I can find the new name when write schedule
             self.fileBasedSchedules[scheduleName.upper()] = scheduleObjectName
@@ -1267,6 +1344,10 @@ class WriteIDF(object):
     def requestVarDict(self):
         return '\nOutput:VariableDictionary,\n' + \
         '\t' + 'regular;                 !- Key Field' + '\n'
+    
+    def requestSQLite(self):
+        return '\nOutput:SQLite,\n' + \
+        '\t' + 'Simple;                  !- Option Type' + '\n'
         
     def EarthTube(self,zone):
         if zone.ETschedule.upper().endswith('CSV'):
@@ -1546,7 +1627,7 @@ def checkUnits():
 
 class RunIDF(object):
     
-    def writeBatchFile(self, workingDir, idfFileName, epwFileAddress, EPDirectory = 'C:\\EnergyPlusV8-1-0', runInBackground = False):
+    def writeBatchFile(self, workingDir, idfFileName, epwFileAddress, EPDirectory = 'C:\\EnergyPlusV8-1-0', runInBackground = False, readVars = True):
         
         workingDrive = workingDir[:2]
         
@@ -1557,8 +1638,14 @@ class RunIDF(object):
         
         fullPath = workingDir + shIdfFileName
         folderName = workingDir.replace( (workingDrive + '\\'), '')
-        batchStr = workingDrive + '\ncd\\' +  folderName + '\n"' + EPDirectory + \
-                '\\Epl-run" ' + fullPath + ' ' + fullPath + ' idf ' + epwFileAddress + ' EP N nolimit N N 0 Y'
+        if readVars:
+            batchStr = workingDrive + '\ncd\\' +  folderName + '\n"' + EPDirectory + \
+                    '\\Epl-run" ' + fullPath + ' ' + fullPath + ' idf ' + epwFileAddress + ' EP N nolimit N N 0 Y'
+        else:
+            # call energyplus directly and skip ReadVarsESO. Results will be read from the sql file.
+            batchStr = workingDrive + '\ncd\\' +  folderName + '\n"' + EPDirectory + \
+                    '\\energyplus" -x -s C -w "' + epwFileAddress + '" -d "' + workingDir[:-1] + \
+                    '" -p "' + shIdfFileName + '" "' + fullPath + '.idf"'
         
         batchFileAddress = fullPath +'.bat'
         batchfile = open(batchFileAddress, 'w')
@@ -1698,7 +1785,8 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     reEvaluate.evaluateZones()
     
     idfFileFullName = workingDir + "\\" + idfFileName
-    idfFile = open(idfFileFullName, "w")
+    # collect the objects in memory and write the file at once
+    idfFile = StringIO.StringIO()
     
     ################## HEADER ###################
     print "[1 of 8] Writing simulation parameters..."
@@ -1787,7 +1875,7 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     scheduleTypeLimits = set([key.upper() for key in sc.sticky["honeybee_ScheduleTypeLimitsLib"].keys()])
     
     for scheduleTypeLimit in scheduleTypeLimits:
-        try: idfFile.write(hb_writeIDF.EPSCHStr(scheduleTypeLimit))
+        try: idfFile.write(hb_writeIDF.EPSCHBlock(scheduleTypeLimit))
         except: pass
     
     # Geometry rules
@@ -1855,7 +1943,7 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     # write idf file
     for zone in thermalZonesPyClasses:
         # Zone
-        idfFile.write(hb_writeIDF.EPZone(zone))
+        idfFile.write(hb_writeIDF.EPZoneBlock(zone))
         
         # get the schedule and loads for the zone
         schedules = zone.getCurrentSchedules(True)
@@ -1888,7 +1976,7 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
                 EPConstructionsCollection.append(srf.construction.upper())
             
             # Surfaces
-            idfFile.write(hb_writeIDF.EPZoneSurface(srf))
+            idfFile.write(hb_writeIDF.EPZoneSurfaceBlock(srf))
             
             if srf.hasChild:
                 # check the construction
@@ -1941,7 +2029,7 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
                                 except: pass
                 
                 # write the glazing strings
-                idfFile.write(hb_writeIDF.EPFenSurface(srf))
+                idfFile.write(hb_writeIDF.EPFenSurfaceBlock(srf))
         
         #If there are internal masses assigned to the zone, write them into the IDF.
         if len(zone.internalMassNames) > 0:
@@ -2204,19 +2292,19 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     
     # Write any materials that are outside constructions.
     for mat in EPMaterialCollection:
-        materialStr = hb_writeIDF.EPMaterialStr(mat.upper())
+        materialStr = hb_writeIDF.EPMaterialBlock(mat.upper())
         if materialStr:
             idfFile.write(materialStr)
     
     # Write constructions
     for cnstr in EPConstructionsCollection:
-        constructionStr, materials = hb_writeIDF.EPConstructionStr(cnstr)
+        constructionStr, materials = hb_writeIDF.EPConstructionBlock(cnstr)
         if constructionStr:
             idfFile.write(constructionStr)
             #Check for materials.
             for mat in materials:
                 if not mat.upper() in EPMaterialCollection:
-                    materialStr = hb_writeIDF.EPMaterialStr(mat.upper())
+                    materialStr = hb_writeIDF.EPMaterialBlock(mat.upper())
                     if materialStr:
                         idfFile.write(materialStr)
                         EPMaterialCollection.append(mat.upper())
@@ -2268,7 +2356,7 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
             pass
             
         elif scheduleValues!=None:
-            idfFile.write(hb_writeIDF.EPSCHStr(schedule))
+            idfFile.write(hb_writeIDF.EPSCHBlock(schedule))
             
             if scheduleValues[0].lower() == "schedule:year":
                 numOfWeeklySchedules = int((len(scheduleValues)-2)/5)
@@ -2382,6 +2470,11 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     # request an output variable dictionary.
     idfFile.write(hb_writeIDF.requestVarDict())
     
+    # request the sql file when the results are read from it instead of ReadVarsESO.
+    if runEnergyPlus == 3 and (not simulationOutputs or \
+       not any(line.strip().upper().startswith('OUTPUT:SQLITE') for line in simulationOutputs)):
+        idfFile.write(hb_writeIDF.requestSQLite())
+    
     # write the outputs requested by the user.
     if simulationOutputs:
         print "[8 of 8] Writing outputs..."
@@ -2407,9 +2500,14 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
         for line in HBgeneratoroutputs:
             idfFile.write(line + '\n')
         # Writing outputs for Honeybee generators if there are any
-        
+    
+    with open(idfFileFullName, "w") as outf:
+        outf.write(idfFile.getvalue())
     idfFile.close()
     
+    hb_writeIDF.blockCache.prune()
+    print hb_writeIDF.blockCache.report()
+    
     print "...\n... idf file is successfully written to : " + idfFileFullName + "\n"
     
     ######################## RUN ENERGYPLUS SIMULATION #######################
@@ -2421,8 +2519,9 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     if runEnergyPlus:
         print "Analysis is running!..."
         # write the batch file
-        hb_runIDF.writeBatchFile(workingDir, idfFileName, epwFileAddress, sc.sticky["honeybee_folders"]["EPPath"], runEnergyPlus > 1)
-        resultFileFullName = idfFileFullName.replace('.idf', '.csv')
+        hb_runIDF.writeBatchFile(workingDir, idfFileName, epwFileAddress, sc.sticky["honeybee_folders"]["EPPath"], runEnergyPlus > 1, runEnergyPlus != 3)
+        if runEnergyPlus == 3: resultFileFullName = idfFileFullName.replace('.idf', '.sql')
+        else: resultFileFullName = idfFileFullName.replace('.idf', '.csv')
         eioFileFullName = idfFileFullName.replace('.idf', '.eio')
         performanceSummaryReport = idfFileFullName.replace('.idf', 'Table.html');
         rddFileName = idfFileFullName.replace('.idf', '.rdd')
@@ -2430,7 +2529,7 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
         try:
             test = open(workingDir + '\eplusout.csv', 'r')
             test.close()
-            resultFileFullName = workingDir + '\eplusout.csv'
+            if runEnergyPlus != 3: resultFileFullName = workingDir + '\eplusout.csv'
         except:
             pass
         print "...\n...\n\nDone! Read below for errors and warnings:\n\n"
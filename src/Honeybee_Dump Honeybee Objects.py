@@ -33,7 +33,7 @@ Provided by Honeybee 0.0.65
 
     Args:
         _HBObjects: A list of Honeybee objects
-        _fileName: A name for the file to which HBObjects will be written (e.g. 20ZonesExample.HB).
+        _fileName: A name for the file to which HBObjects will be written (e.g. 20ZonesExample.HB). Use .HBX as the extension (e.g. 20ZonesExample.HBX) to write the objects to a binary container which is smaller for large models and lets zones be loaded one by one.
         _workingDir_: An optional working directory into which the HBZones will be written.  The default is set to C:\ladybug.
         _dump: Set to True to save the objects to file
     Returns:
@@ -43,11 +43,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Dump Honeybee Objects"
 ghenv.Component.NickName = 'dumpHBObjects'
-ghenv.Component.Message = 'VER 0.0.65\nFEB_06_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = 'HB-Legacy'
 ghenv.Component.SubCategory = "00 | Honeybee"
-#compatibleHBVersion = VER 0.0.59\nDEC_15_2017
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "6"
 except: pass
@@ -68,7 +68,7 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
     hb_EPObjectsAux = sc.sticky["honeybee_EPObjectsAUX"]()
     if workingDir == None:
         workingDir = sc.sticky["Honeybee_DefaultFolder"] 
-    if not fileName.upper().endswith('.HB.'):
+    if not fileName.upper().endswith('.HB') and not fileName.upper().endswith('.HBX'):
         fileName = fileName + '.HB'
     defaultEPConstrSet = ['INTERIOR CEILING', 'INTERIOR DOOR', 'INTERIOR FLOOR', 'INTERIOR PARTITION', \
         'INTERIOR WALL', 'INTERIOR WINDOW', 'EXTERIOR DOOR', 'EXTERIOR FLOOR', 'EXTERIOR ROOF', \
@@ -107,6 +107,9 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
             NUscale = rc.Geometry.Transform.Scale(rc.Geometry.Plane(rc.Geometry.Plane.WorldXY),fac,fac,fac)
             HBZone.transform(NUscale, "", False)
         
+        # don't write the coordinates that none of the surfaces use
+        HBZone.compactVertexStore()
+        
         # dump all surfaces and replace surfaces with ids.
         surfaceIds = [srf.ID for srf in HBZone.surfaces]
         for surface in HBZone.surfaces:
@@ -372,6 +375,11 @@ def dumpHBObjects(HBObjects, fileName, workingDir=None):
             " InputError: Adjacent object %s is not in the list of HBObjects."%name
     
     HBData = {'ids':ids, 'objs': objs}
+    if filePath.upper().endswith('.HBX'):
+        sc.sticky["honeybee_HBObjectsWriter"].write(filePath, HBData)
+        print "Saved file to %s"%filePath
+        return filePath
+    
     with open(filePath, "wb") as outf:
         pickle.dump(HBData, outf)
         print "Saved file to %s"%filePath
@@ -72,11 +72,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Export To OpenStudio"
 ghenv.Component.NickName = 'exportToOpenStudio'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "10 | Energy | Energy"
-#compatibleHBVersion = VER 0.0.56\nMAY_18_2018
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nJUL_24_2015
 ghenv.Component.AdditionalHelpFromDocStrings = "1"
 
@@ -4312,9 +4312,11 @@ class WriteOPS(object):
         # this is a place holder for now I just return true
         #return True, glzCoordinates
     
+        # coordinates are (x, y, z) tuples from the vertex store of the zone
+        tol2 = (2 * sc.doc.ModelAbsoluteTolerance) ** 2
         def isDuplicate(pt, newPts):
             for p in newPts:
-                if pt.DistanceTo(p) < 2 * sc.doc.ModelAbsoluteTolerance:
+                if (pt[0] - p[0]) ** 2 + (pt[1] - p[1]) ** 2 + (pt[2] - p[2]) ** 2 < tol2:
                     return True
             return False
             
@@ -4332,7 +4334,7 @@ class WriteOPS(object):
     def opsZoneSurface (self, surface, model, space):
         # collect Honeybee surfaces for nonplanar cases
         # this is just for OpenStudio and not energyplus
-        coordinates = surface.coordinates
+        coordinates = surface.vertexTuples()
         checked, coordinates= self.checkCoordinates(coordinates)
         
         if int(surface.type) == 4: surface.type = 0
@@ -4340,9 +4342,9 @@ class WriteOPS(object):
         if checked:
             # generate OpenStudio points
             pointVectors = ops.Point3dVector();
-            for pt in coordinates:
+            for x, y, z in coordinates:
                 # add the points to an openStudio list
-                pointVectors.Add(ops.Point3d(pt.X,pt.Y,pt.Z))
+                pointVectors.Add(ops.Point3d(x, y, z))
             
             # create surface
             thisSurface = ops.Surface(pointVectors, model);
@@ -4407,14 +4409,14 @@ class WriteOPS(object):
     
     def OPSFenSurface (self, surface, openStudioParentSrf, model):
         for childSrf in surface.childSrfs:
-            coordinates = childSrf.coordinates
+            coordinates = childSrf.vertexTuples()
             
             # generate OpenStudio points
             windowPointVectors = ops.Point3dVector();
             
-            for pt in coordinates:
+            for x, y, z in coordinates:
                 # add the points to an openStudio list
-                windowPointVectors.Add(ops.Point3d(pt.X,pt.Y,pt.Z))
+                windowPointVectors.Add(ops.Point3d(x, y, z))
             
             glazing = ops.SubSurface(windowPointVectors, model)
             glazing.setName(childSrf.name)
@@ -40,11 +40,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Generate Zone Test Points"
 ghenv.Component.NickName = 'genHBZoneTestPts'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "03 | Daylight | Recipes"
-#compatibleHBVersion = VER 0.0.56\nFEB_01_2015
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "0"
 except: pass
@@ -150,13 +150,16 @@ def getHBZoneFloorSurfaces(HBZone):
     try:
         # call the objects from the lib
         hb_hive = sc.sticky["honeybee_Hive"]()
-        HBZone = hb_hive.callFromHoneybeeHive([HBZone])[0]
+        HBZone = hb_hive.proxyFromHoneybeeHive([HBZone], ghenv.Component)[0]
 
         for HBS in HBZone.surfaces:
             if int(HBS.type) == 2:
                 testSrf = copy.deepcopy(HBS.geometry)
                 testSrf.Flip()
                 testSurfaces.append(testSrf)
+        
+        if sc.sticky["honeybee_Hive"].reportProxies:
+            print "\n".join(sc.sticky["honeybee_Hive"].proxyReport(ghenv.Component, clear = True))
         return testSurfaces
     except:
         return -1
@@ -38,11 +38,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Get Zone EnergyPlus Schedules"
 ghenv.Component.NickName = 'getHBZoneEPSchedules'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "05 | Energy | Building Program"
-#compatibleHBVersion = VER 0.0.56\nFEB_01_2015
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "0"
 except: pass
@@ -71,7 +71,11 @@ def main(HBZone):
     
     # get Honeybee zone
     hb_hive = sc.sticky["honeybee_Hive"]()
-    HBZoneObject = hb_hive.callFromHoneybeeHive([HBZone])[0]
+    HBZoneObject = hb_hive.proxyFromHoneybeeHive([HBZone], ghenv.Component)[0]
+    
+    # assigning the default schedules changes the zone so only work on a copy if they are not assigned
+    if HBZoneObject.isSchedulesAssigned: HBZoneObject = HBZoneObject.target()
+    else: HBZoneObject = HBZoneObject.materialize()
     
     try:
         schedules = HBZoneObject.getCurrentSchedules(True, ghenv.Component)
@@ -89,6 +93,9 @@ def main(HBZone):
     equipmentSchedule = schedules['equipmentSchedule']
     infiltrationSchedule = schedules['infiltrationSchedule']
     
+    if sc.sticky["honeybee_Hive"].reportProxies:
+        print "\n".join(sc.sticky["honeybee_Hive"].proxyReport(ghenv.Component, clear = True))
+    
     return occupancySchedule, occupancyActivitySch, heatingSetPtSchedule, coolingSetPtSchedule, lightingSchedule, equipmentSchedule, infiltrationSchedule
     
     
@@ -41,13 +41,17 @@ Provided by Honeybee 0.0.65
     Args:
         defaultFolder_: Optional input for Honeybee default folder.
                        If empty default folder will be set to C:\ladybug or C:\Users\%USERNAME%\AppData\Roaming\Ladybug\
+        hiveBudgetMB_: Optional memory budget in MB for the Honeybee objects that are shared
+                       between the components. Once the objects are over the budget the objects of
+                       the least recently used components that aren't connected to other components
+                       are removed. Set to 0 for no budget. Default is 4096.
     Returns:
         report: Current Honeybee mood!!!
 """
 
 ghenv.Component.Name = "Honeybee_Honeybee"
 ghenv.Component.NickName = 'Honeybee'
-ghenv.Component.Message = 'VER 0.0.65\nFEB_06_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.icon
 ghenv.Component.Category = 'HB-Legacy'
 ghenv.Component.SubCategory = "00 | Honeybee"
@@ -70,6 +74,7 @@ import shutil
 import os
 import System.Threading.Tasks as tasks
 import System
+import clr
 import time
 import itertools
 import datetime
@@ -82,6 +87,19 @@ import uuid
 import re
 import random
 import zipfile
+import threading
+import collections
+import array
+import bisect
+import operator
+import hashlib
+import zlib
+import struct
+import cStringIO
+try: import mmap
+except ImportError: mmap = None
+try: import sqlite3
+except ImportError: sqlite3 = None
 
 try:
     System.Net.ServicePointManager.SecurityProtocol = System.Net.SecurityProtocolType.Tls12
@@ -1636,8 +1654,925 @@ class hb_MSHToRAD(object):
     
         return matFile, radFile
 
+class SchedulerTask(object):
+    """A command that is executed by JobScheduler after all its dependencies are done."""
+    
+    def __init__(self, name, command, dependencies = [], cores = 1, shell = False, cwd = None):
+        self.name = name
+        self.command = command
+        self.dependencies = list(dependencies)
+        self.cores = max(1, int(cores))
+        self.shell = shell
+        self.cwd = cwd
+        
+        # waiting, running, done, failed or skipped
+        self.status = "waiting"
+        self.exitCode = None
+        self.error = None
+        self.startTime = None
+        self.endTime = None
+    
+    @property
+    def wallTime(self):
+        if self.startTime is None or self.endTime is None: return 0
+        return self.endTime - self.startTime
+    
+    def __repr__(self):
+        return "%s: %s (exit code: %s, %.2f s)"%(self.name, self.status, self.exitCode, self.wallTime)
+
+class JobScheduler(object):
+    """Run a graph of commands (e.g. batch files) on a bounded pool of worker threads.
+    
+    Tasks are added with their dependencies and are started as soon as all the
+    dependencies are done. Each worker waits on its process instead of polling
+    so there is no sleep between the tasks. All the schedulers share a global
+    core budget so components that run at the same time don't start more
+    processes than the number of cores. If a task fails all the tasks that
+    depend on it are skipped.
+    
+    Usage:
+        scheduler = JobScheduler()
+        scheduler.addTask("init", "init.bat")
+        scheduler.addTask("rtrace_0", "rtrace_0.bat", ["init"])
+        scheduler.addTask("rtrace_1", "rtrace_1.bat", ["init"])
+        scheduler.addTask("pcomb", "pcomb.bat", ["rtrace_0", "rtrace_1"])
+        success = scheduler.run()
+        print scheduler.report()
+    """
+    
+    # global core budget for all the schedulers in this session
+    coreBudget = None
+    coresInUse = 0
+    budgetCondition = threading.Condition()
+    
+    def __init__(self):
+        self.tasks = collections.OrderedDict()
+    
+    @staticmethod
+    def cpuCount():
+        try: return max(1, int(os.environ["NUMBER_OF_PROCESSORS"]))
+        except (KeyError, ValueError):
+            try:
+                import multiprocessing
+                return multiprocessing.cpu_count()
+            except (ImportError, NotImplementedError):
+                return 1
+    
+    @classmethod
+    def setCoreBudget(cls, cores):
+        """Set the maximum number of cores that can be used by all the schedulers."""
+        with cls.budgetCondition:
+            cls.coreBudget = max(1, int(cores))
+            cls.budgetCondition.notify_all()
+    
+    @classmethod
+    def acquireCores(cls, cores):
+        with cls.budgetCondition:
+            if cls.coreBudget is None: cls.coreBudget = cls.cpuCount()
+            # a task that needs more than the budget can still run on its own
+            while cls.coresInUse > 0 and cls.coresInUse + cores > cls.coreBudget:
+                cls.budgetCondition.wait()
+            cls.coresInUse += cores
+    
+    @classmethod
+    def releaseCores(cls, cores):
+        with cls.budgetCondition:
+            cls.coresInUse = max(0, cls.coresInUse - cores)
+            cls.budgetCondition.notify_all()
+    
+    def addTask(self, name, command, dependencies = [], cores = 1, shell = False, cwd = None):
+        if name in self.tasks:
+            raise ValueError("Task %s is already added to the scheduler."%name)
+        task = SchedulerTask(name, command, dependencies, cores, shell, cwd)
+        self.tasks[name] = task
+        return task
+    
+    def checkGraph(self):
+        """Raise a ValueError if a dependency is missing or there is a cycle in the tasks."""
+        for task in self.tasks.values():
+            for dependency in task.dependencies:
+                if dependency not in self.tasks:
+                    raise ValueError("Dependency %s of task %s is not in the scheduler."%(dependency, task.name))
+        
+        visited = {}
+        for name in self.tasks:
+            # iterative depth first search. 1: in the current path, 2: done
+            stack = [(name, iter(self.tasks[name].dependencies))]
+            if visited.get(name) == 2: continue
+            visited[name] = 1
+            while stack:
+                current, dependencies = stack[-1]
+                for dependency in dependencies:
+                    if visited.get(dependency) == 1:
+                        raise ValueError("There is a cycle between the tasks at %s."%dependency)
+                    if visited.get(dependency) is None:
+                        visited[dependency] = 1
+                        stack.append((dependency, iter(self.tasks[dependency].dependencies)))
+                        break
+                else:
+                    visited[current] = 2
+                    stack.pop()
+    
+    def execute(self, task):
+        """Run the command of a task and wait for it to finish."""
+        task.startTime = time.time()
+        try:
+            process = subprocess.Popen(task.command, shell = task.shell, cwd = task.cwd)
+            task.exitCode = process.wait()
+        except (OSError, IOError, ValueError), e:
+            task.exitCode = -1
+            task.error = str(e)
+        task.endTime = time.time()
+        task.status = "done" if task.exitCode == 0 else "failed"
+    
+    def run(self, maxWorkers = None, callback = None):
+        """Run all the tasks and return True if all of them are done successfully.
+        
+        Args:
+            maxWorkers: Maximum number of tasks that run in parallel by this
+                scheduler. Default is number of cores.
+            callback: An optional function that is called with each task
+                after it is finished (e.g. to report the progress).
+        """
+        self.checkGraph()
+        if not self.tasks: return True
+        
+        if not maxWorkers: maxWorkers = self.cpuCount()
+        maxWorkers = max(1, min(int(maxWorkers), len(self.tasks)))
+        
+        dependents = dict((name, []) for name in self.tasks)
+        remaining = {}
+        for task in self.tasks.values():
+            remaining[task.name] = set(task.dependencies)
+            for dependency in task.dependencies: dependents[dependency].append(task.name)
+        
+        ready = collections.deque(name for name in self.tasks if not remaining[name])
+        state = {"running": 0}
+        condition = threading.Condition()
+        
+        def skip(name):
+            for dependent in dependents[name]:
+                if self.tasks[dependent].status == "waiting":
+                    self.tasks[dependent].status = "skipped"
+                    skip(dependent)
+        
+        def worker():
+            while True:
+                with condition:
+                    while not ready and state["running"] > 0:
+                        condition.wait()
+                    if not ready: return
+                    task = self.tasks[ready.popleft()]
+                    task.status = "running"
+                    state["running"] += 1
+                
+                self.acquireCores(task.cores)
+                try: self.execute(task)
+                except Exception, e:
+                    task.status = "failed"
+                    task.error = str(e)
+                finally: self.releaseCores(task.cores)
+                
+                with condition:
+                    state["running"] -= 1
+                    if task.status == "done":
+                        for dependent in dependents[task.name]:
+                            remaining[dependent].discard(task.name)
+                            if not remaining[dependent] and self.tasks[dependent].status == "waiting":
+                                ready.append(dependent)
+                    else:
+                        skip(task.name)
+                    condition.notify_all()
+                
+                if callback is not None:
+                    try: callback(task)
+                    except Exception, e: print "Failed to report %s: %s"%(task.name, e)
+        
+        workers = [threading.Thread(target = worker) for count in range(maxWorkers)]
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
+        for thread in workers: thread.join()
+        
+        return all(task.status == "done" for task in self.tasks.values())
+    
+    def report(self):
+        """Return wall time and exit status of all the tasks as a string."""
+        lines = []
+        for task in self.tasks.values():
+            line = "%s: %s"%(task.name, task.status)
+            if task.exitCode is not None: line += ", exit code %d"%task.exitCode
+            if task.startTime is not None: line += ", %.2f s"%task.wallTime
+            if task.error: line += " (%s)"%task.error
+            lines.append(line)
+        return "\n".join(lines)
+
+class EPBatchRunner(object):
+    """Run a list of IDF files through EnergyPlus in parallel.
+    
+    Each run gets its own run folder and calls the energyplus executable
+    directly (EnergyPlus 8.3 or newer) so the runs don't overwrite each other's
+    output files. The runs are executed by a JobScheduler and share its global
+    core budget. This class doesn't use Rhino or Grasshopper and can be used
+    from a plain Python script.
+    
+    Usage:
+        runner = EPBatchRunner("C:\\EnergyPlusV8-9-0")
+        runner.addRun("c:\\ladybug\\option_1.idf", "c:\\ladybug\\weather.epw")
+        runner.addRun("c:\\ladybug\\option_2.idf", "c:\\ladybug\\weather.epw")
+        results = runner.run(4)
+    
+    Args:
+        EPDirectory: EnergyPlus folder. If None energyplus should be on the PATH.
+        readVars: Set to True to run ReadVarsESO after each simulation and
+            create the csv result file.
+        executable: Name of EnergyPlus executable.
+    """
+    
+    # number of fatal and severe errors that are kept from each err file
+    maxErrMessages = 5
+    
+    def __init__(self, EPDirectory = None, readVars = False, executable = "energyplus"):
+        if EPDirectory: executable = os.path.join(EPDirectory, executable)
+        self.executable = executable
+        self.readVars = readVars
+        self.runs = []
+    
+    def addRun(self, idfFile, epwFile, runFolder = None):
+        """Add an IDF/EPW pair. Default run folder is a folder next to the idf file with the same name."""
+        idfFile = os.path.abspath(idfFile)
+        name = os.path.splitext(os.path.basename(idfFile))[0]
+        if any(run["name"] == name for run in self.runs): name += "_%d"%len(self.runs)
+        if runFolder is None: runFolder = os.path.join(os.path.dirname(idfFile), name)
+        
+        run = {"name": name, "idf": idfFile, "epw": os.path.abspath(epwFile), \
+               "runFolder": os.path.abspath(runFolder)}
+        self.runs.append(run)
+        return run
+    
+    def command(self, run):
+        command = [self.executable, "-w", run["epw"], "-d", run["runFolder"], \
+                   "-p", run["name"], "-s", "C"]
+        if self.readVars: command.append("-r")
+        command.append(run["idf"])
+        return command
+    
+    def resultFiles(self, run):
+        """Return the path to output files of a run."""
+        filePath = os.path.join(run["runFolder"], run["name"])
+        return dict((ext, filePath + "." + ext) for ext in ("err", "sql", "csv", "eio", "rdd")) 
+    
+    @classmethod
+    def readErrFile(cls, errFile):
+        """Return the number of fatal errors, severe errors and warnings and the first errors."""
+        summary = {"fatal": 0, "severe": 0, "warning": 0, "completed": False, "messages": []}
+        try:
+            with open(errFile, "r") as inf:
+                for line in inf:
+                    if "**  Fatal  **" in line: key = "fatal"
+                    elif "** Severe  **" in line: key = "severe"
+                    elif "** Warning **" in line: key = "warning"
+                    else:
+                        if "EnergyPlus Completed Successfully" in line: summary["completed"] = True
+                        continue
+                    summary[key] += 1
+                    if key != "warning" and len(summary["messages"]) < cls.maxErrMessages:
+                        summary["messages"].append(line.strip())
+        except (IOError, OSError):
+            summary["messages"].append("Failed to find %s"%errFile)
+        return summary
+    
+    def run(self, maxWorkers = None, progress = True):
+        """Run all the simulations and return the results in the same order as the runs.
+        
+        Args:
+            maxWorkers: Number of simulations that run in parallel. Default is
+                number of cores.
+            progress: Set to False to not print the progress, or a function
+                that will be called with (finishedCount, runCount, result).
+        
+        Returns:
+            A list of dictionaries with name, status, exitCode, wallTime,
+            errSummary (see readErrFile) and the path to result files (err,
+            sql, csv, eio and rdd). Path to a result file is None if the file
+            is not created.
+        """
+        scheduler = JobScheduler()
+        for run in self.runs:
+            if not os.path.isdir(run["runFolder"]): os.makedirs(run["runFolder"])
+            scheduler.addTask(run["name"], self.command(run), cwd = run["runFolder"])
+        
+        runs = dict((run["name"], run) for run in self.runs)
+        finished = []
+        lock = threading.Lock()
+        
+        def report(task):
+            result = self.collectResult(runs[task.name], task)
+            with lock:
+                finished.append(result)
+                if progress is True:
+                    print "[%d of %d] %s: %s (%.1f s, %d severe errors)"%(len(finished), len(runs), \
+                        task.name, task.status, task.wallTime, result["errSummary"]["severe"] + result["errSummary"]["fatal"])
+                elif progress:
+                    progress(len(finished), len(runs), result)
+        
+        scheduler.run(maxWorkers, report)
+        
+        results = dict((result["name"], result) for result in finished)
+        return [results.get(run["name"]) or self.collectResult(run, scheduler.tasks[run["name"]]) \
+                for run in self.runs]
+    
+    def collectResult(self, run, task):
+        result = dict(run)
+        result["status"] = task.status
+        result["exitCode"] = task.exitCode
+        result["wallTime"] = task.wallTime
+        files = self.resultFiles(run)
+        result["errSummary"] = self.readErrFile(files["err"])
+        if task.error: result["errSummary"]["messages"].insert(0, task.error)
+        for ext, filePath in files.items():
+            result[ext] = filePath if os.path.isfile(filePath) else None
+        return result
+
+class HourBlockError(Exception):
+    """An error in the function of an HourBlockPool with the hour (and zone) that failed."""
+    
+    def __init__(self, hour, message, errorType = None, zone = None):
+        Exception.__init__(self, hour, message, errorType, zone)
+        self.hour = hour
+        self.message = message
+        self.errorType = errorType
+        self.zone = zone
+    
+    def __str__(self):
+        if self.zone is None: return "Hour %s failed: %s"%(self.hour, self.message)
+        return "Hour %s failed in zone %s: %s"%(self.hour, self.zone, self.message)
+
+def runHourBlock(function, hours):
+    """Run function for a block of hours and return the list of results."""
+    results = []
+    for hour in hours:
+        try: results.append(function(hour))
+        except HourBlockError: raise
+        except Exception, e:
+            raise HourBlockError(hour, str(e), e.__class__.__name__, getattr(e, "hbZone", None))
+    return results
+
+class HourBlockPool(object):
+    """Run a function for every hour of an analysis on a pool of workers.
+    
+    The hours are split into blocks of consecutive hours and each worker
+    computes whole blocks into its own result list. The blocks are merged in
+    hour order so the results don't depend on the number of workers. The first
+    failing hour stops the pool and is raised as an HourBlockError. Use tagZone
+    in the function to add the zone to the error.
+    
+    The blocks run on worker threads which run in parallel in IronPython.
+    
+    Usage:
+        pool = HourBlockPool(blockSize = 24)
+        results = pool.map(computeHour, range(len(HOYs)))
+    """
+    
+    def __init__(self, blockSize = 24, maxWorkers = None):
+        self.blockSize = max(1, int(blockSize))
+        if not maxWorkers: maxWorkers = JobScheduler.cpuCount()
+        self.maxWorkers = max(1, int(maxWorkers))
+    
+    @staticmethod
+    def tagZone(error, zone):
+        """Add the zone to an error that is raised in the function. Use it before re-raising the error."""
+        try:
+            if getattr(error, "hbZone", None) is None: error.hbZone = zone
+        except (AttributeError, TypeError):
+            pass
+    
+    def partition(self, hours):
+        hours = list(hours)
+        return [hours[count:count + self.blockSize] for count in range(0, len(hours), self.blockSize)]
+    
+    def map(self, function, hours):
+        """Return the results of function for all the hours in the same order as hours."""
+        blocks = self.partition(hours)
+        if not blocks: return []
+        
+        if self.maxWorkers == 1 or len(blocks) == 1:
+            blockResults = [runHourBlock(function, block) for block in blocks]
+        else:
+            blockResults = self.mapThreads(function, blocks)
+        
+        results = []
+        for blockResult in blockResults: results.extend(blockResult)
+        return results
+    
+    def mapThreads(self, function, blocks):
+        blockResults = [None] * len(blocks)
+        errors = []
+        state = {"nextBlock": 0}
+        lock = threading.Lock()
+        
+        def worker():
+            while True:
+                with lock:
+                    if errors or state["nextBlock"] == len(blocks): return
+                    blockCount = state["nextBlock"]
+                    state["nextBlock"] += 1
+                try:
+                    blockResults[blockCount] = runHourBlock(function, blocks[blockCount])
+                except HourBlockError, e:
+                    with lock: errors.append(e)
+        
+        workers = [threading.Thread(target = worker) for count in range(min(self.maxWorkers, len(blocks)))]
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
+        for thread in workers: thread.join()
+        
+        # report the earliest failing hour so the error doesn't depend on the timing of the threads
+        if errors: raise min(errors, key = lambda error: error.hour)
+        return blockResults
+
+class ZoneRayTracer(object):
+    """Find the closest surface that a ray hits in a list of surface meshes.
+    
+    All the surface meshes are joined into one mesh so each ray is a single
+    MeshRay call against the face tree that Rhino builds over the triangles of
+    the mesh (a bounding volume hierarchy) instead of one call per surface. The
+    faces that were hit are mapped back to their surface through the face
+    ranges of the joined mesh. Rhino 5 can't return the faces of a hit so the
+    tracer falls back to one call per surface there.
+    
+    Usage:
+        tracer = ZoneRayTracer(zoneSrfsMesh)
+        viewFactors = tracer.viewFactors(point, viewVectors)
+    """
+    
+    # set to False the first time the MeshRay overload with face indices is missing
+    faceIndicesSupported = True
+    
+    def __init__(self, meshes):
+        self.meshes = list(meshes)
+        self.mesh = rc.Geometry.Mesh()
+        self.faceStarts = []
+        for mesh in self.meshes:
+            self.faceStarts.append(self.mesh.Faces.Count)
+            self.mesh.Append(mesh)
+        
+        # trace one ray so the face tree is built before the mesh is shared between threads
+        rc.Geometry.Intersect.Intersection.MeshRay(self.mesh, rc.Geometry.Ray3d(rc.Geometry.Point3d.Origin, rc.Geometry.Vector3d.ZAxis))
+    
+    def surfaceOfFace(self, faceIndex):
+        # empty meshes share the start of the next surface so bisect_right skips them
+        return bisect.bisect_right(self.faceStarts, faceIndex) - 1
+    
+    def closestSurfacePerMesh(self, ray):
+        closestSrf = -1
+        closestParam = None
+        for srfCount, mesh in enumerate(self.meshes):
+            param = rc.Geometry.Intersect.Intersection.MeshRay(mesh, ray)
+            if param >= 0 and (closestParam is None or param < closestParam):
+                closestSrf, closestParam = srfCount, param
+        return closestSrf
+    
+    def closestSurface(self, ray):
+        """Return the index of the closest surface that the ray hits or -1 if it hits nothing."""
+        if not ZoneRayTracer.faceIndicesSupported: return self.closestSurfacePerMesh(ray)
+        
+        faceIndices = clr.Reference[System.Array[int]]()
+        try:
+            param = rc.Geometry.Intersect.Intersection.MeshRay(self.mesh, ray, faceIndices)
+        except TypeError:
+            ZoneRayTracer.faceIndicesSupported = False
+            return self.closestSurfacePerMesh(ray)
+        
+        if param < 0: return -1
+        if not faceIndices.Value: return self.closestSurfacePerMesh(ray)
+        # a ray that hits an edge between two surfaces goes to the first one like the per surface check
+        return min(self.surfaceOfFace(faceIndex) for faceIndex in faceIndices.Value)
+    
+    def isBlocked(self, ray):
+        """Return True if the ray hits any of the surfaces."""
+        return rc.Geometry.Intersect.Intersection.MeshRay(self.mesh, ray) >= 0
+    
+    def viewFactors(self, point, vectors):
+        """Return the fraction of the vectors from the point that hit each surface first."""
+        hits = [0] * len(self.meshes)
+        for vec in vectors:
+            srfCount = self.closestSurface(rc.Geometry.Ray3d(point, vec))
+            if srfCount != -1: hits[srfCount] += 1
+        divisor = float(len(vectors))
+        return [hitCount / divisor for hitCount in hits]
+
+class RadianceSceneCache(object):
+    """Content-addressed cache of Radiance scene octrees and ambient files.
+    
+    Scene files (materials, geometry and additional rad files but not the sky)
+    are hashed and copied to the cache folder as key_n.rad. The scene octree is
+    built once from these copies and the sky is added to it by oconv -i so a
+    study that only changes the sky or the test points doesn't re-build the
+    scene. The cache folder should be outside the study folder as the study
+    folder is cleaned before each run. Files that are referenced from inside
+    the scene files (e.g. !xform) are not part of the key.
+    
+    Ambient files are keyed by the scene, the sky, the Radiance parameters and
+    the test points so a run only reuses the ambient values of an earlier run of
+    the same study. A run with a reused ambient file doesn't give the exact same
+    values as the first run so hb_WriteRAD only uses them if reuseAmbientFiles
+    is set to True.
+    
+    Once the cache folder is over maxMB the files of the least recently used
+    scenes and ambient files are removed.
+    
+    Args:
+        cacheFolder: Path to the cache folder. It will be created if it doesn't exist.
+        maxMB: Size limit of the cache folder in MB. Set to 0 for no limit.
+    """
+    
+    formatVersion = 1
+    
+    # shared between all the instances to report the performance of the cache
+    stats = {"hits": 0, "misses": 0, "ambientHits": 0, "ambientMisses": 0, "bytesSaved": 0, "evicted": 0}
+    
+    def __init__(self, cacheFolder, maxMB = 4096):
+        self.cacheFolder = os.path.abspath(cacheFolder)
+        self.maxMB = maxMB
+        if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+    
+    @classmethod
+    def hashFiles(cls, filePaths, blockSize = 1048576):
+        """Return sha1 of the content of the files as a hex string."""
+        key = hashlib.sha1("HBSceneCache%d" % cls.formatVersion)
+        for count, filePath in enumerate(filePaths):
+            key.update("\n#file %d\n" % count)
+            with open(filePath, "rb") as inf:
+                block = inf.read(blockSize)
+                while block:
+                    key.update(block)
+                    block = inf.read(blockSize)
+        return key.hexdigest()
+    
+    def cachedFileSize(self, filePath):
+        """Return the size of a cached file or 0 if it isn't in the cache. The file is marked as used."""
+        try:
+            size = os.path.getsize(filePath)
+            os.utime(filePath, None)
+            return size
+        except OSError: return 0
+    
+    def evict(self, keep = ()):
+        """Remove the files of the least recently used keys until the cache folder is under maxMB.
+        
+        Args:
+            keep: Keys of the files that are used by the current study.
+        """
+        if not self.maxMB: return
+        # files of a key start with the 40 characters of the key (key.oct, key_n.rad, key.amb)
+        groups = {}
+        for fileName in os.listdir(self.cacheFolder):
+            filePath = os.path.join(self.cacheFolder, fileName)
+            try: modified, size = os.path.getmtime(filePath), os.path.getsize(filePath)
+            except OSError: continue
+            group = groups.setdefault(fileName[:40], [0, 0, []])
+            group[0] = max(group[0], modified)
+            group[1] += size
+            group[2].append(filePath)
+        
+        total = sum(group[1] for group in groups.values())
+        for lastUsed, key in sorted((group[0], key) for key, group in groups.items()):
+            if total <= self.maxMB * 1048576: break
+            if key in keep: continue
+            for filePath in groups[key][2]:
+                try: os.remove(filePath)
+                except OSError: pass
+            total -= groups[key][1]
+            self.stats["evicted"] += 1
+    
+    def oconvLines(self, octFileName, sceneFiles, skyFile, r = 2048):
+        """Return the key of the scene and the lines to create octFileName.oct.
+        
+        If the scene octree is not in the cache yet the lines build it first.
+        """
+        key = self.hashFiles(sceneFiles)
+        sceneOct = os.path.join(self.cacheFolder, key + ".oct")
+        
+        lines = ""
+        octSize = self.cachedFileSize(sceneOct)
+        if octSize:
+            self.stats["hits"] += 1
+            self.stats["bytesSaved"] += octSize
+        else:
+            self.stats["misses"] += 1
+            self.evict(keep = (key,))
+            cachedFiles = []
+            for count, sceneFile in enumerate(sceneFiles):
+                cachedFile = os.path.join(self.cacheFolder, "%s_%d.rad" % (key, count))
+                shutil.copyfile(sceneFile, cachedFile)
+                cachedFiles.append(cachedFile.replace("\\", "/"))
+            
+            # build the octree in a temp file so a failed oconv doesn't leave a broken octree
+            tempOct = os.path.join(self.cacheFolder, "%s_%s.tmp" % (key, uuid.uuid4().hex[:8]))
+            lines += "oconv -r " + str(r) + " " + " ".join(cachedFiles) + " > " + tempOct.replace("\\", "/") + \
+                     " && move /Y " + tempOct.replace("/", "\\") + " " + sceneOct.replace("/", "\\") + " > nul\n"
+        
+        lines += "oconv -f -i " + sceneOct.replace("\\", "/") + " " + skyFile.replace("\\", "/") + \
+                 " > " + octFileName + ".oct\n"
+        
+        return key, lines
+    
+    def ambientFile(self, sceneKey, skyFile, radParameters, simulationType = 0, pointFiles = ()):
+        """Return path to the shared ambient file for this study.
+        
+        Args:
+            pointFiles: Test point files of the study in order. The points are
+                part of the key no matter how they are split between the files.
+        
+        Returns None if there is no ambient calculation (-ab 0).
+        """
+        if int(radParameters["_ab_"]) == 0: return None
+        
+        key = hashlib.sha1(sceneKey)
+        key.update(self.hashFiles([skyFile]))
+        key.update(repr(sorted((par, str(value)) for par, value in radParameters.items())))
+        key.update(str(simulationType))
+        for pointFile in pointFiles:
+            with open(pointFile, "rb") as inf:
+                key.update(inf.read())
+        ambFile = os.path.join(self.cacheFolder, key.hexdigest() + ".amb")
+        
+        ambSize = self.cachedFileSize(ambFile)
+        if ambSize:
+            self.stats["ambientHits"] += 1
+            self.stats["bytesSaved"] += ambSize
+        else:
+            self.stats["ambientMisses"] += 1
+            self.evict(keep = (sceneKey, key.hexdigest()))
+        
+        return ambFile
+    
+    @classmethod
+    def report(cls):
+        return "Radiance scene cache: %d hits, %d misses, %d ambient file hits, %d ambient file misses, %.1f MB saved, %d keys evicted." % \
+               (cls.stats["hits"], cls.stats["misses"], cls.stats["ambientHits"], \
+                cls.stats["ambientMisses"], cls.stats["bytesSaved"] / 1048576.0, cls.stats["evicted"])
+
+class ViewFactorCache(object):
+    """Disk cache of the ray traced results of the Indoor View Factor Calculator.
+    
+    The key is a sha1 of the prepared view factor geometry (test points and the
+    surface, opaque and window meshes of each zone) together with the settings
+    that change the results (e.g. viewResolution and window transmissivities).
+    Any change upstream that changes the geometry creates a new key so a
+    recompute is only needed when the zones or the settings are changed.
+    
+    The results are saved as key.hbvf with a header (magic, format version, key
+    and number of zones) followed by the values of each zone as little-endian
+    packed arrays. A file that can't be read for any reason is a cache miss.
+    Once the folder is over maxMB the least recently used files are removed.
+    
+    Args:
+        cacheFolder: Path to the cache folder. Default is viewFactorCache in the
+            Honeybee default folder. It will be created if it doesn't exist.
+        maxMB: Size limit of the cache folder in MB. Set to 0 for no limit.
+    """
+    
+    formatVersion = 3
+    magic = "HBVF"
+    
+    # shared between all the instances to report the performance of the cache
+    stats = {"hits": 0, "misses": 0, "bytesLoaded": 0, "evicted": 0}
+    
+    def __init__(self, cacheFolder = None, maxMB = 2048):
+        if cacheFolder is None:
+            cacheFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "viewFactorCache")
+        self.cacheFolder = os.path.abspath(cacheFolder)
+        self.maxMB = maxMB
+        if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+    
+    @classmethod
+    def updateKey(cls, key, value):
+        if isinstance(value, rc.Geometry.Mesh):
+            coordinates = array.array('d')
+            for vertex in value.Vertices: coordinates.extend((vertex.X, vertex.Y, vertex.Z))
+            faces = array.array('i')
+            for face in value.Faces: faces.extend((face.A, face.B, face.C, face.D))
+            key.update("mesh %d %d:" % (len(coordinates), len(faces)))
+            key.update(coordinates.tostring())
+            key.update(faces.tostring())
+        elif isinstance(value, rc.Geometry.Point3d):
+            key.update("pt:")
+            key.update(array.array('d', (value.X, value.Y, value.Z)).tostring())
+        elif isinstance(value, (list, tuple)):
+            key.update("[%d:" % len(value))
+            for item in value: cls.updateKey(key, item)
+            key.update("]")
+        else:
+            key.update(repr(value) + ";")
+    
+    @classmethod
+    def key(cls, *values):
+        """Return sha1 of the values as a hex string. Values can be nested lists of meshes, points, numbers and strings."""
+        key = hashlib.sha1("HBViewFactorCache%d" % cls.formatVersion)
+        for value in values: cls.updateKey(key, value)
+        return key.hexdigest()
+    
+    def cacheFile(self, key):
+        return os.path.join(self.cacheFolder, key + ".hbvf")
+    
+    @staticmethod
+    def packArray(typecode, values):
+        values = array.array(typecode, values)
+        if sys.byteorder != "little": values.byteswap()
+        return struct.pack("<I", len(values)) + values.tostring()
+    
+    @staticmethod
+    def unpackArray(typecode, data, offset):
+        count = struct.unpack_from("<I", data, offset)[0]
+        offset += 4
+        values = array.array(typecode)
+        end = offset + count * values.itemsize
+        if end > len(data): raise ValueError("The cache file is truncated.")
+        values.fromstring(data[offset:end])
+        if sys.byteorder != "little": values.byteswap()
+        return values, end
+    
+    @staticmethod
+    def packNames(names):
+        # the name of a sky patch group is 0 (no window) or a tuple of window names
+        if names == 0: return struct.pack("<i", -1)
+        parts = [struct.pack("<i", len(names))]
+        for name in names:
+            name = name.encode("utf-8")
+            parts.append(struct.pack("<H", len(name)) + name)
+        return "".join(parts)
+    
+    @staticmethod
+    def unpackNames(data, offset):
+        count = struct.unpack_from("<i", data, offset)[0]
+        offset += 4
+        if count == -1: return 0, offset
+        names = []
+        for i in xrange(count):
+            length = struct.unpack_from("<H", data, offset)[0]
+            names.append(data[offset + 2:offset + 2 + length].decode("utf-8"))
+            offset += 2 + length
+        return tuple(names), offset
+    
+    def pack(self, key, results):
+        """Return the results (testPtViewFactor, testPtSkyView, skyPatchStates) as a string."""
+        testPtViewFactor, testPtSkyView, skyPatchStates = results
+        parts = [self.magic, struct.pack("<H40sI", self.formatVersion, key, len(testPtViewFactor))]
+        for viewFactors, skyView, state in itertools.izip(testPtViewFactor, testPtSkyView, skyPatchStates):
+            # view factors of each point to the zone surfaces
+            parts.append(self.packArray('I', [len(ptViewFactors) for ptViewFactors in viewFactors]))
+            parts.append(self.packArray('d', itertools.chain.from_iterable(viewFactors)))
+            
+            # sky view of each point or 0 for zones without windows
+            if isinstance(skyView, list):
+                parts.append(struct.pack("<B", 1) + self.packArray('d', skyView))
+            else:
+                parts.append(struct.pack("<Bd", 0, skyView))
+            
+            # blocked sky patches of the zone (see SkyPatchMatrix.getState)
+            if state is None:
+                parts.append(struct.pack("<B", 0))
+            else:
+                patchCount, groupIds, groupTransmiss, groupNames = state
+                parts.append(struct.pack("<BI", 1, patchCount))
+                parts.append(self.packArray('I', groupIds))
+                parts.append(self.packArray('f', groupTransmiss))
+                parts.append(struct.pack("<I", len(groupNames)))
+                parts.extend(self.packNames(names) for names in groupNames)
+        return "".join(parts)
+    
+    def unpack(self, key, data):
+        """Return the results from a string of pack or None if it is for another key or format."""
+        if data[:4] != self.magic: return None
+        version, fileKey, zoneCount = struct.unpack_from("<H40sI", data, 4)
+        if version != self.formatVersion or fileKey != key: return None
+        offset = 4 + struct.calcsize("<H40sI")
+        
+        testPtViewFactor, testPtSkyView, skyPatchStates = [], [], []
+        for zone in xrange(zoneCount):
+            counts, offset = self.unpackArray('I', data, offset)
+            values, offset = self.unpackArray('d', data, offset)
+            viewFactors = []
+            start = 0
+            for count in counts:
+                viewFactors.append(values[start:start + count].tolist())
+                start += count
+            testPtViewFactor.append(viewFactors)
+            
+            isList = struct.unpack_from("<B", data, offset)[0]
+            offset += 1
+            if isList:
+                skyView, offset = self.unpackArray('d', data, offset)
+                testPtSkyView.append(skyView.tolist())
+            else:
+                skyView = struct.unpack_from("<d", data, offset)[0]
+                offset += 8
+                testPtSkyView.append(int(skyView) if skyView == int(skyView) else skyView)
+            
+            hasState = struct.unpack_from("<B", data, offset)[0]
+            offset += 1
+            if not hasState:
+                skyPatchStates.append(None)
+                continue
+            patchCount = struct.unpack_from("<I", data, offset)[0]
+            offset += 4
+            groupIds, offset = self.unpackArray('I', data, offset)
+            groupTransmiss, offset = self.unpackArray('f', data, offset)
+            nameCount = struct.unpack_from("<I", data, offset)[0]
+            offset += 4
+            groupNames = []
+            for i in xrange(nameCount):
+                names, offset = self.unpackNames(data, offset)
+                groupNames.append(names)
+            # SkyPatchMatrix keeps the group ids as 'H' while there are fewer than 65536 groups
+            if len(groupNames) <= 65536: groupIds = array.array('H', groupIds)
+            else: groupIds = array.array('l', groupIds)
+            skyPatchStates.append((patchCount, groupIds, groupTransmiss, groupNames))
+        
+        return testPtViewFactor, testPtSkyView, skyPatchStates
+    
+    def load(self, key):
+        """Return the cached results for the key or None if they are not in the cache."""
+        cacheFile = self.cacheFile(key)
+        try:
+            with open(cacheFile, "rb") as inf:
+                data = inf.read()
+            results = self.unpack(key, data)
+        except Exception:
+            # a missing, old or broken file is just a miss
+            results = None
+        
+        if results is None:
+            self.stats["misses"] += 1
+            return None
+        
+        # the modified time of the files is used to find the least recently used files
+        try: os.utime(cacheFile, None)
+        except OSError: pass
+        self.stats["hits"] += 1
+        self.stats["bytesLoaded"] += len(data)
+        return results
+    
+    def save(self, key, results):
+        """Save the results for the key. Failing to write the cache doesn't stop the calculation."""
+        cacheFile = self.cacheFile(key)
+        if os.path.isfile(cacheFile): return
+        # write to a temp file first so a half written file is never loaded
+        tempFile = "%s_%s.tmp" % (cacheFile, uuid.uuid4().hex[:8])
+        try:
+            data = self.pack(key, results)
+            with open(tempFile, "wb") as outf:
+                outf.write(data)
+            os.rename(tempFile, cacheFile)
+        except Exception:
+            try: os.remove(tempFile)
+            except OSError: pass
+            return
+        self.evict(keep = cacheFile)
+    
+    def evict(self, keep = None):
+        """Remove the least recently used files until the cache folder is under maxMB."""
+        if not self.maxMB: return
+        files = []
+        for fileName in os.listdir(self.cacheFolder):
+            if not fileName.endswith(".hbvf"): continue
+            filePath = os.path.join(self.cacheFolder, fileName)
+            try: files.append((os.path.getmtime(filePath), os.path.getsize(filePath), filePath))
+            except OSError: pass
+        
+        total = sum(size for modified, size, filePath in files)
+        for modified, size, filePath in sorted(files):
+            if total <= self.maxMB * 1048576: break
+            if filePath == keep: continue
+            try: os.remove(filePath)
+            except OSError: continue
+            total -= size
+            self.stats["evicted"] += 1
+    
+    @classmethod
+    def report(cls):
+        return "View factor cache: %d hits, %d misses, %.1f MB loaded, %d files evicted." % \
+               (cls.stats["hits"], cls.stats["misses"], cls.stats["bytesLoaded"] / 1048576.0, cls.stats["evicted"])
+
 class hb_WriteRAD(object):
     
+    # number of point files for each cpu in grid-based studies. Point files are
+    # fed to the cpus as they get free so an expensive part of the grid doesn't
+    # keep one cpu busy after the others are done.
+    chunksPerCPU = 4
+    
+    # reuse scene octrees of the previous grid-based and image-based studies
+    # in the same working directory
+    useSceneCache = True
+    
+    # reuse the ambient file of the previous run of the same grid-based study
+    # (same scene, sky, parameters and test points). The results of a run with
+    # a reused ambient file are close to but not the same as the first run.
+    reuseAmbientFiles = False
+    
     def __init__(self, component = ghenv.Component):
         
         self.component = component
@@ -1656,6 +2591,14 @@ class hb_WriteRAD(object):
         self.hb_DSCore = hb_folders["DSCorePath"]
         self.hb_DSLibPath = hb_folders["DSLibPath"]
         
+        # point files of the current study. Used to save the cost of the points after the run.
+        self.lenOfPts = []
+        self.testPtCosts = []
+        self.costFile = None
+        self.maxWorkers = None
+        
+        # RadianceSceneCache of the current study
+        self.sceneCache = None
         
     def writeRADAndMaterialFiles(self, originalHBObjects, subWorkingDir, radFileName, \
                                  analysisRecipe, meshParameters, exportInteriorWalls):
@@ -1931,7 +2874,16 @@ class hb_WriteRAD(object):
         return radFileFullName, materialFileName
     
     def writeTestPtFile(self, subWorkingDir, radFileName, numOfCPUs, analysisRecipe):
+        """Write the test points of a grid-based study to .pts files.
+        
+        Grid-based studies are split into up to numOfCPUs * chunksPerCPU files so
+        the number of files can be different from numOfCPUs. Use len(testPtsEachCPU)
+        as the number of CPUs for writeBatchFiles and collectResults.
         
+        Returns:
+            testPtsEachCPU: List of test points of each file.
+            lenOfPts: Number of test points in each file.
+        """
         if analysisRecipe.type == 0: return [], [] #image-based simulation
         
         testPoints = copy.deepcopy(analysisRecipe.testPts)
@@ -1959,23 +2911,18 @@ class hb_WriteRAD(object):
             for v in flattenPtsNormals: v.Transform(transform)    
     
         numOfPoints = len(flattenTestPoints)
-    
+        
+        # rtrace runs on numOfCPUs cpus but grid-based studies are split into more files
+        self.maxWorkers = numOfCPUs
+        if analysisRecipe.type != 2 and numOfCPUs > 1: numOfCPUs = numOfCPUs * self.chunksPerCPU
+        
         if numOfCPUs > numOfPoints: numOfCPUs = numOfPoints
-
-        if numOfCPUs > 1:
-            ptsEachCpu = int(numOfPoints/(numOfCPUs))
-            remainder = numOfPoints%numOfCPUs
-        else:		
-            ptsEachCpu = numOfPoints		
-            remainder = 0
-    
-        lenOfPts = []
         
-        for cpuCount in range(numOfCPUs):		
-            if cpuCount < remainder:		
-                lenOfPts.append(ptsEachCpu+1)		
-            else:		
-                lenOfPts.append(ptsEachCpu)
+        # split the points based on the cost of each point in the last run of this study
+        self.costFile = subWorkingDir.rstrip("\\/") + ".ptcost"
+        self.testPtCosts = self.readTestPtCosts(self.costFile, numOfPoints)
+        lenOfPts = self.partitionTestPoints(self.testPtCosts, numOfCPUs)
+        self.lenOfPts = lenOfPts
         
         testPtsEachCPU = []
         
@@ -1996,6 +2943,81 @@ class hb_WriteRAD(object):
             
         return testPtsEachCPU, lenOfPts
     
+    @staticmethod
+    def partitionTestPoints(costs, numOfChunks):
+        """Split the points to contiguous chunks with about the same total cost.
+        
+        Args:
+            costs: Estimated cost of each point.
+            numOfChunks: Number of chunks.
+        Returns:
+            Number of points in each chunk. Points keep their original order.
+        """
+        numOfPoints = len(costs)
+        numOfChunks = max(1, min(numOfChunks, numOfPoints))
+        
+        cumulativeCosts = []
+        totalCost = 0
+        for cost in costs:
+            totalCost += max(cost, 0)
+            cumulativeCosts.append(totalCost)
+        if totalCost <= 0:
+            cumulativeCosts = range(1, numOfPoints + 1)
+            totalCost = numOfPoints
+        
+        lenOfPts = []
+        start = 0
+        for chunkCount in range(numOfChunks - 1):
+            target = float(totalCost) * (chunkCount + 1) / numOfChunks
+            end = bisect.bisect_left(cumulativeCosts, target) + 1
+            # each chunk has at least one point
+            end = min(max(end, start + 1), numOfPoints - (numOfChunks - chunkCount - 1))
+            lenOfPts.append(end - start)
+            start = end
+        lenOfPts.append(numOfPoints - start)
+        
+        return lenOfPts
+    
+    @staticmethod
+    def readTestPtCosts(costFile, numOfPoints):
+        """Read the cost of the points from the last run. All the costs are 1 if not available."""
+        try:
+            with open(costFile, "r") as inf:
+                costs = [float(line) for line in inf if line.strip()]
+        except (IOError, OSError, ValueError):
+            costs = []
+        
+        if len(costs) != numOfPoints: costs = [1.0] * numOfPoints
+        return costs
+    
+    def writeTestPtCosts(self, scheduler, taskNames):
+        """Save the cost of each point based on the wall time of the batch file of its chunk.
+        
+        The wall time of each chunk is distributed between its points based on
+        the cost of the points in the last run.
+        
+        Args:
+            taskNames: Names of the tasks of the chunks in the order of the points.
+        """
+        if not self.costFile or len(self.lenOfPts) != len(taskNames): return
+        
+        costs = []
+        start = 0
+        for taskName, numOfPts in zip(taskNames, self.lenOfPts):
+            task = scheduler.tasks.get(taskName)
+            if task is None or task.status != "done": return
+            lastCosts = self.testPtCosts[start: start + numOfPts]
+            lastTotal = float(sum(lastCosts))
+            if lastTotal > 0: costs.extend([task.wallTime * cost / lastTotal for cost in lastCosts])
+            else: costs.extend([task.wallTime / numOfPts] * numOfPts)
+            start += numOfPts
+        
+        try:
+            with open(self.costFile, "w") as outf:
+                outf.write("\n".join("%.6g"%cost for cost in costs))
+        except (IOError, OSError):
+            pass
+    
     def writeBatchFiles(self, subWorkingDir, radFileName, radSkyFileName, \
                         radFileFullName, materialFileName, \
                         numOfCPUs, testPtsEachCPU, \
@@ -2006,6 +3028,9 @@ class hb_WriteRAD(object):
         fileNames = [] # list of only names of the files
         pcompFileName = ""
         
+        # grid-based studies are split into the files of writeTestPtFile
+        if len(testPtsEachCPU)!=0: numOfCPUs = len(testPtsEachCPU)
+        
         # initiate RAD Parameters
         if analysisRecipe.radParameters==None:
             quality = 0
@@ -2200,8 +3225,22 @@ class hb_WriteRAD(object):
                 for additionalFile in additionalRadFiles:
                     if additionalFile!=None:
                         sceneRadFiles.append(additionalFile)
-                
-            OCTLine = self.hb_writeRADAUX.oconvLine(OCTFileName, sceneRadFiles)
+            
+            sceneKey = None
+            if readyOCTFile == None and self.useSceneCache:
+                # the cache is kept next to the project folders as the study folder is cleaned for each run
+                cacheFolder = os.path.join(os.path.dirname(os.path.dirname(subWorkingDir.rstrip("\\/"))), "radianceCache")
+                try:
+                    self.sceneCache = RadianceSceneCache(cacheFolder)
+                    sceneFiles = [f for f in sceneRadFiles if f != radSkyFileName]
+                    sceneKey, OCTLine = self.sceneCache.oconvLines(OCTFileName, sceneFiles, radSkyFileName)
+                except (IOError, OSError), e:
+                    print "Failed to use Radiance scene cache: %s" % e
+                    self.sceneCache = None
+            
+            if sceneKey == None:
+                OCTLine = self.hb_writeRADAUX.oconvLine(OCTFileName, sceneRadFiles)
+            
             if readyOCTFile ==None: batchFile.write(OCTLine)
             
             if analysisRecipe.type == 0:
@@ -2299,6 +3338,14 @@ class hb_WriteRAD(object):
             return initBatchFileName, batchFiles, fileNames, pcompFileName, HDRFileAddress
                         
         else:
+            # share the ambient file with the previous runs of the same study
+            ambFile = None
+            if sceneKey != None and self.reuseAmbientFiles:
+                pointFiles = [os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.pts') \
+                              for cpuCount in range(numOfCPUs)]
+                ambFile = self.sceneCache.ambientFile(sceneKey, radSkyFileName, analysisRecipe.radParameters, \
+                                                      int(analysisRecipe.simulationType), pointFiles)
+            
             fileNames = []
             RADResultFilesAddress = []
             for cpuCount in range(numOfCPUs):
@@ -2316,7 +3363,7 @@ class hb_WriteRAD(object):
                 batchFile.write("cd " + subWorkingDir + "\n")
                 
                 # 3.4. add rtrace lin
-                RTRACELine = self.hb_writeRADAUX.rtraceLine(radFileName, OCTFileName, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount)
+                RTRACELine = self.hb_writeRADAUX.rtraceLine(radFileName, OCTFileName, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount, ambFile)
                 batchFile.write(RTRACELine)
                 
                 # close the file
@@ -2325,7 +3372,12 @@ class hb_WriteRAD(object):
             
             return initBatchFileName, batchFiles, fileNames, pcompFileName, RADResultFilesAddress
         
-    def executeBatchFiles(self, batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.5):
+    @staticmethod
+    def batchTaskName(count, batchFileName):
+        """Return a unique name for the task of a batch file. Batch files of different folders can have the same name."""
+        return "%d_%s" % (count, os.path.basename(batchFileName))
+    
+    def executeBatchFiles(self, batchFileNames, maxPRuns = None, shell = False):
     
         """Run a number of batch files in parallel and
             wait to end of the analysis.
@@ -2335,56 +3387,41 @@ class hb_WriteRAD(object):
                 maxPRuns: max number of files to be ran in parallel (default = 0)
                 shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
         """
-    
-        if not maxPRuns : maxPRuns = 1
-        maxPRuns = int(maxPRuns)
-        total = len(batchFileNames)
-        
-        if maxPRuns < 1: maxPRuns = 1
-        if maxPRuns > total: maxPRuns = total
-        
-        running = 0
-        done = False
-        jobs = []
-        pid = 0
         
-        try:
-            while not done:
-                if running < maxPRuns and pid < total:
-                    # execute the files
-                    jobs.append(subprocess.Popen(batchFileNames[pid].replace("\\", "/") , shell = shell))
-                    pid+=1
-                    time.sleep(waitingTime)
-                
-                # count how many jobs are running and how many are done
-                running = 0
-                finished = 0
-                for job in jobs:
-                    if job.poll() is None:
-                        #one job is still running
-                        running += 1
-                    else:
-                        finished += 1
-        
-                if running == maxPRuns:
-                    # wait for half a second
-                    #print "waiting..."
-                    time.sleep(waitingTime)
+        scheduler = JobScheduler()
+        for count, batchFileName in enumerate(batchFileNames):
+            scheduler.addTask(self.batchTaskName(count, batchFileName), batchFileName.replace("\\", "/"), shell = shell)
         
-                if finished ==  total:
-                    done = True
-        
-        except Exception, e:
-            print "Something went wrong: %s"%str(e) 
+        if not scheduler.run(maxPRuns or 1):
+            print "Something went wrong:\n" + scheduler.report()
+        return scheduler
     
     def runBatchFiles(self, initBatchFileName, batchFileNames, fileNames, \
-                      pcompBatchFile, waitingTime, runInBackground = False):
-        
-        self.executeBatchFiles([initBatchFileName], maxPRuns = 1, shell = runInBackground, waitingTime = waitingTime)
-        self.executeBatchFiles(batchFileNames, maxPRuns = len(batchFileNames), shell = runInBackground, waitingTime = waitingTime)
-        
+                      pcompBatchFile, runInBackground = False):
+        
+        # init (oconv) > rtrace for each cpu > pcomb to put all the files together
+        scheduler = JobScheduler()
+        initTask = scheduler.addTask("init", initBatchFileName.replace("\\", "/"), shell = runInBackground)
+        chunkTasks = []
+        for count, batchFileName in enumerate(batchFileNames):
+            chunkTasks.append(scheduler.addTask(self.batchTaskName(count, batchFileName), batchFileName.replace("\\", "/"), \
+                                                [initTask.name], shell = runInBackground).name)
         if pcompBatchFile!="":
-            os.system(pcompBatchFile) # put all the files together
+            scheduler.addTask("pcomb", pcompBatchFile.replace("\\", "/"), chunkTasks, shell = runInBackground)
+        
+        success = scheduler.run(self.maxWorkers or len(batchFileNames) + 1)
+        print scheduler.report()
+        if not success:
+            failedTasks = [name for name, task in scheduler.tasks.items() if task.status in ("failed", "skipped")]
+            msg = "Radiance failed to run all the batch files so the results are not complete.\n" + \
+                  "These tasks failed or were skipped: " + ", ".join(sorted(failedTasks))
+            if pcompBatchFile!="" and scheduler.tasks["pcomb"].status != "done":
+                msg += "\nThe images of the cpus are not merged since pcomb didn't run."
+            print msg
+            self.component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+        
+        self.writeTestPtCosts(scheduler, chunkTasks)
+        return scheduler
         
     def collectResults(self, subWorkingDir, radFileName, numOfCPUs, analysisRecipe, expectedResultFiles):
         
@@ -3174,7 +4211,7 @@ class hb_WriteRADAUX(object):
            "ra_gif " + projectName + "_" + viewName + "_FalseColored.pic " + projectName + "_" + viewName + "_FalseColored.gif\n"
         return line
 
-    def rtraceLine(self, projectName, octFileName, radParameters, simulationType = 0, cpuCount = 0):
+    def rtraceLine(self, projectName, octFileName, radParameters, simulationType = 0, cpuCount = 0, ambFile = None):
         ptsFile = projectName + "_" + str(cpuCount) + ".pts"
         outputFile = projectName + "_" + str(cpuCount) + ".res"
         if simulationType == 0:
@@ -3198,7 +4235,9 @@ class hb_WriteRADAUX(object):
             for par in radParameters["additional"]:
                 line1_2 += "-%s  "%par
             
-        line1_3 = " -af " + projectName + ".amb -e error.log " + octFileName + ".oct < " + ptsFile + \
+        if ambFile == None: ambFile = projectName + ".amb"
+        
+        line1_3 = " -af " + ambFile.replace("\\", "/") + " -e error.log " + octFileName + ".oct < " + ptsFile + \
                   " > " + outputFile + "\n"
         
         return line0 + line1_1 + line1_2 + line1_3
@@ -3619,6 +4658,340 @@ class hb_ReadAnnualResultsAux(object):
         
         return illFiles
 
+class DaysimIllIndex(object):
+    """Random access index for Daysim .ill files.
+    
+    Byte offset of each row of the ill file is saved next to the file in
+    illFile + ".hbidx" so reading the values of one hour is a single seek.
+    Optionally the values are also transposed to a point-major float32 file
+    (illFile + ".hbpts") so reading the annual values of one point is a single
+    contiguous read. Both files are keyed by modification time and size of the
+    ill file and are rebuilt as soon as Daysim rewrites the ill file.
+    
+    Use DaysimIllIndex.get(illFile) to reuse the indexes that are already loaded.
+    
+    Args:
+        illFile: Path to a Daysim .ill file.
+        transpose: Set to True to also write the point-major copy of the values.
+    """
+    
+    formatVersion = 1
+    
+    # maximum number of float32 values that are kept in memory while transposing
+    transposeBlockSize = 16777216
+    
+    # loaded indexes by path of the ill file
+    indexes = {}
+    
+    def __init__(self, illFile, transpose = False):
+        self.illFile = os.path.abspath(illFile)
+        self.indexFile = self.illFile + ".hbidx"
+        self.pointsFile = self.illFile + ".hbpts"
+        
+        fileStat = os.stat(self.illFile)
+        self.signature = {"version": self.formatVersion, "source": self.illFile, \
+                          "mtime": fileStat.st_mtime, "size": fileStat.st_size}
+        
+        # offsets are stored as doubles which are exact for files up to 2**53 bytes
+        self.offsets = array.array("d")
+        self.pointCount = 0
+        self.transposed = False
+        
+        if not self.loadIndex() or (transpose and not self.transposed):
+            self.buildIndex(transpose)
+    
+    @classmethod
+    def get(cls, illFile, transpose = False):
+        """Return the index of an ill file. The index is only built if it's missing or out of date."""
+        illFile = os.path.abspath(illFile)
+        index = cls.indexes.get(illFile)
+        if index is not None:
+            fileStat = os.stat(illFile)
+            if index.signature["mtime"] != fileStat.st_mtime or index.signature["size"] != fileStat.st_size:
+                index = None
+        
+        if index is None or (transpose and not index.transposed):
+            index = cls(illFile, transpose)
+            cls.indexes[illFile] = index
+        
+        return index
+    
+    @property
+    def rowCount(self):
+        return len(self.offsets)
+    
+    def loadIndex(self):
+        """Load row offsets from the index file. Return False if it's missing or out of date."""
+        try:
+            with open(self.indexFile, "rb") as indexFile:
+                header = json.loads(indexFile.readline())
+                if header.get("signature") != self.signature: return False
+                offsets = array.array("d")
+                offsets.fromfile(indexFile, header["rowCount"])
+        except (IOError, OSError, EOFError, ValueError, KeyError):
+            return False
+        
+        self.offsets = offsets
+        self.pointCount = header["pointCount"]
+        self.transposed = header["transposed"] and os.path.isfile(self.pointsFile) and \
+                          os.path.getsize(self.pointsFile) == 4 * self.pointCount * self.rowCount
+        return True
+    
+    def saveIndex(self):
+        header = {"signature": self.signature, "rowCount": self.rowCount, \
+                  "pointCount": self.pointCount, "transposed": self.transposed}
+        try:
+            with open(self.indexFile, "wb") as indexFile:
+                indexFile.write(json.dumps(header) + "\n")
+                self.offsets.tofile(indexFile)
+        except (IOError, OSError):
+            # the folder is read only. the index will be kept in memory.
+            pass
+    
+    def buildIndex(self, transpose = False):
+        """Read the ill file once and write the row offsets and the point-major values."""
+        self.offsets = array.array("d")
+        self.pointCount = 0
+        self.transposed = False
+        
+        rowsFile = self.pointsFile + ".tmp"
+        rowValues = None
+        try:
+            if transpose: rowValues = open(rowsFile, "wb")
+            with open(self.illFile, "rb") as illFile:
+                offset = 0
+                for line in illFile:
+                    self.offsets.append(offset)
+                    offset += len(line)
+                    if not self.pointCount and not line.startswith("#"):
+                        self.pointCount = len(line.split()) - 3
+                    
+                    if rowValues is not None:
+                        values = line.split()[3:]
+                        if len(values) != self.pointCount:
+                            # comment or broken line. The file can't be transposed.
+                            rowValues.close()
+                            rowValues = None
+                            continue
+                        array.array("f", map(float, values)).tofile(rowValues)
+            
+            if rowValues is not None:
+                rowValues.close()
+                rowValues = None
+                self.transposeRows(rowsFile)
+                self.transposed = True
+        except (IOError, OSError, ValueError):
+            self.transposed = False
+        finally:
+            if rowValues is not None: rowValues.close()
+            if os.path.isfile(rowsFile):
+                try: os.remove(rowsFile)
+                except OSError: pass
+        
+        self.saveIndex()
+    
+    def transposeRows(self, rowsFile):
+        """Write the row-major float32 values in rowsFile to the point-major pointsFile."""
+        rowCount, pointCount = self.rowCount, self.pointCount
+        pointsPerBlock = max(1, self.transposeBlockSize // max(rowCount, 1))
+        with open(rowsFile, "rb") as rows, open(self.pointsFile, "wb") as points:
+            for firstPoint in xrange(0, pointCount, pointsPerBlock):
+                blockPoints = min(pointsPerBlock, pointCount - firstPoint)
+                block = array.array("f")
+                for row in xrange(rowCount):
+                    rows.seek(4 * (row * pointCount + firstPoint))
+                    block.fromfile(rows, blockPoints)
+                for point in xrange(blockPoints):
+                    block[point::blockPoints].tofile(points)
+    
+    def readRow(self, row):
+        """Return the values of all the points for a row (HOY - 1) of the ill file."""
+        if row < 0 or row >= self.rowCount: return []
+        with open(self.illFile, "rb") as illFile:
+            illFile.seek(int(self.offsets[row]))
+            return map(float, illFile.readline().split()[3:])
+    
+    def readPoint(self, point):
+        """Return the values of all the rows for a point of the ill file."""
+        if self.transposed:
+            values = array.array("f")
+            with open(self.pointsFile, "rb") as pointsFile:
+                pointsFile.seek(4 * point * self.rowCount)
+                values.fromfile(pointsFile, self.rowCount)
+            return values.tolist()
+        
+        with open(self.illFile, "rb") as illFile:
+            return [float(line.split()[point + 3]) for line in illFile]
+
+class AnnualDaylightMetrics(object):
+    """Calculate annual daylight metrics from Daysim .ill files inside Grasshopper.
+    
+    The values of the .ill files are read as a point-major float32 matrix (see
+    DaysimIllIndex) and DA, cDA, UDI, sDA and ASE are calculated for a group of
+    points (e.g. a space) in a single pass. For each point the values of the
+    occupied hours are picked, sorted and counted with bisect so the heavy work
+    happens in builtin functions and not in python loops.
+    
+    Args:
+        illFiles: List of .ill files for a single shading state. Points are
+            numbered in the order of the files (e.g. one file for each cpu).
+    """
+    
+    def __init__(self, illFiles):
+        self.illIndexes = []
+        self.hourCount = 0
+        self.pointCount = 0
+        for illFile in illFiles:
+            illIndex = DaysimIllIndex.get(illFile, transpose = True)
+            if not illIndex.transposed:
+                raise ValueError("Failed to read the values of %s."%illFile)
+            if self.hourCount and illIndex.rowCount != self.hourCount:
+                raise ValueError("%s has %d hours while the other files have %d hours."% \
+                                 (illFile, illIndex.rowCount, self.hourCount))
+            self.hourCount = illIndex.rowCount
+            self.pointCount += illIndex.pointCount
+            self.illIndexes.append(illIndex)
+    
+    def readPoints(self, firstPoint, count):
+        """Return the values for a range of points as a point-major array('f')."""
+        values = array.array("f")
+        lastPoint = firstPoint + count
+        fileFirstPoint = 0
+        for illIndex in self.illIndexes:
+            fileLastPoint = fileFirstPoint + illIndex.pointCount
+            start, end = max(firstPoint, fileFirstPoint), min(lastPoint, fileLastPoint)
+            if start < end:
+                with open(illIndex.pointsFile, "rb") as pointsFile:
+                    pointsFile.seek(4 * (start - fileFirstPoint) * self.hourCount)
+                    values.fromfile(pointsFile, (end - start) * self.hourCount)
+            fileFirstPoint = fileLastPoint
+        return values
+    
+    @staticmethod
+    def occupancyMask(occFile, hourCount = 8760):
+        """Return a bytearray with 1 for occupied hours from a Daysim occupancy csv file."""
+        mask = bytearray(hourCount)
+        hour = 0
+        with open(occFile, "r") as occ:
+            for line in occ:
+                if hour == hourCount: break
+                if line.startswith("#") or not line.strip(): continue
+                try: mask[hour] = float(line.split(",")[-1]) > 0
+                except ValueError: continue
+                hour += 1
+        return mask
+    
+    @staticmethod
+    def readShadingProfiles(annualProfile):
+        """Return the blind profiles of a Daysim *_intgain.csv file as lists of floats."""
+        with open(annualProfile, "r") as inf:
+            lines = inf.readlines()
+        
+        headings = lines[3].strip().split(",")[3:]
+        blindColumns = [count + 3 for count, heading in enumerate(headings) if heading.strip().startswith("blind")]
+        profiles = [[] for column in blindColumns]
+        for line in lines[4:]:
+            values = line.strip().split(",")
+            for count, column in enumerate(blindColumns):
+                profiles[count].append(float(values[column]))
+        return profiles
+    
+    @staticmethod
+    def stateHours(occupancy, shadingProfile = None, stateCount = 0):
+        """Split occupied hours by the shading state in effect.
+        
+        Returns:
+            A list of hours for each state. Index 0 is for no shading and index i
+            is for the i-th state of the shading group.
+        """
+        hours = [[] for state in range(stateCount + 1)]
+        for hour, occupied in enumerate(occupancy):
+            if not occupied: continue
+            state = 0
+            if shadingProfile and stateCount and shadingProfile[hour] > 0:
+                state = min(max(int(round(stateCount * shadingProfile[hour])), 1), stateCount)
+            hours[state].append(hour)
+        return hours
+    
+    def occupiedValues(self, blocks, stateHours, point):
+        """Return the values of the occupied hours of a point from the state matrices."""
+        values = []
+        start = point * self.hourCount
+        for block, hours in zip(blocks, stateHours):
+            if not hours: continue
+            pointValues = block[start: start + self.hourCount]
+            if len(hours) == 1: values.append(pointValues[hours[0]])
+            else: values.extend(operator.itemgetter(*hours)(pointValues))
+        return values
+    
+    def calculate(self, firstPoint, count, occupancy, threshold = 300, shadingStates = None, shadingProfile = None):
+        """Calculate DA, cDA and UDI for a range of points.
+        
+        Args:
+            firstPoint: Index of the first point.
+            count: Number of points.
+            occupancy: A bytearray of occupied hours (see occupancyMask).
+            threshold: Illuminance threshold for DA and cDA in lux.
+            shadingStates: Optional list of AnnualDaylightMetrics for the states
+                of a dynamic shading group.
+            shadingProfile: Blind profile of the shading group for each hour of
+                the year (see readShadingProfiles).
+        Returns:
+            A dictionary of lists for DA, cDA, UDI_Less_100, UDI_100_2000 and
+            UDI_More_2000. Values are percentage of occupied hours.
+        """
+        shadingStates = shadingStates or []
+        stateHours = self.stateHours(occupancy, shadingProfile, len(shadingStates))
+        blocks = [self.readPoints(firstPoint, count)]
+        for state, hours in zip(shadingStates, stateHours[1:]):
+            blocks.append(state.readPoints(firstPoint, count) if hours else None)
+        
+        results = dict((key, []) for key in ("DA", "cDA", "UDI_Less_100", "UDI_100_2000", "UDI_More_2000"))
+        for point in xrange(count):
+            values = self.occupiedValues(blocks, stateHours, point)
+            values.sort()
+            hourCount = float(len(values))
+            if not hourCount:
+                for key in results: results[key].append(0)
+                continue
+            
+            below = bisect.bisect_left(values, threshold)
+            less100 = bisect.bisect_left(values, 100)
+            upTo2000 = bisect.bisect_right(values, 2000)
+            results["DA"].append(100 * (hourCount - below) / hourCount)
+            results["cDA"].append(100 * ((hourCount - below) + sum(values[:below]) / threshold) / hourCount)
+            results["UDI_Less_100"].append(100 * less100 / hourCount)
+            results["UDI_100_2000"].append(100 * (upTo2000 - less100) / hourCount)
+            results["UDI_More_2000"].append(100 * (hourCount - upTo2000) / hourCount)
+        
+        return results
+    
+    @staticmethod
+    def sDA(DA, target = 50):
+        """Percentage of the points that meet the threshold for at least target percent of the hours."""
+        if not DA: return 0
+        return 100.0 * sum(1 for value in DA if value >= target) / len(DA)
+    
+    def ASE(self, firstPoint, count, occupancy, illuminance = 1000, hours = 250):
+        """Annual Sunlight Exposure for a range of points.
+        
+        The ill files should be the result of a direct sunlight only study.
+        
+        Returns:
+            Percentage of the points that receive more than illuminance for more
+            than hours of the occupied hours.
+        """
+        if not count: return 0
+        stateHours = self.stateHours(occupancy)
+        blocks = [self.readPoints(firstPoint, count)]
+        exposedPoints = 0
+        for point in xrange(count):
+            values = self.occupiedValues(blocks, stateHours, point)
+            values.sort()
+            if len(values) - bisect.bisect_right(values, illuminance) > hours:
+                exposedPoints += 1
+        return 100.0 * exposedPoints / count
+
 class hb_EnergySimulatioParameters(object):
     
     def readEPParams(self, EPParameters):
@@ -3651,6 +5024,576 @@ class hb_EnergySimulatioParameters(object):
         
         return timestep, shadowPar, solarDistribution, simulationControl, ddyFile, terrain, grndTemps, holidays, startDay, heatSizing, coolSizing
 
+class EPResultCache(object):
+    """Binary sidecar cache for EnergyPlus result files.
+    
+    The cache is saved next to the result file in a folder named resultFile +
+    ".hbcache". Each variable is stored in a separate binary file of float64
+    values and index.json maps each column to its file, offset and length. The
+    cache is keyed by path, modification time and size of the result file so it
+    is discarded as soon as EnergyPlus rewrites the file.
+    
+    Columns are identified by string keys that are provided by the reader
+    (e.g. column index in a csv file).
+    """
+    
+    formatVersion = 1
+    
+    # shared between all the instances to report the performance of the cache
+    stats = {"hits": 0, "misses": 0, "bytesRead": 0}
+    
+    def __init__(self, resultFile):
+        self.resultFile = os.path.abspath(resultFile)
+        self.cacheFolder = self.resultFile + ".hbcache"
+        self.indexFile = os.path.join(self.cacheFolder, "index.json")
+        
+        fileStat = os.stat(self.resultFile)
+        self.signature = {"version": self.formatVersion, "source": self.resultFile, \
+                          "mtime": fileStat.st_mtime, "size": fileStat.st_size}
+        self.index = self.loadIndex()
+    
+    def loadIndex(self):
+        """Load the index of the cache and clean it if it's out of date."""
+        try:
+            with open(self.indexFile, "r") as indexFile:
+                index = json.load(indexFile)
+        except (IOError, OSError, ValueError):
+            index = None
+        
+        if index is None or index.get("signature") != self.signature:
+            # the result file has been changed since the cache is written
+            self.clear()
+            index = {"signature": self.signature, "header": None, "rowCount": 0, "columns": {}}
+        
+        return index
+    
+    def saveIndex(self):
+        if not os.path.isdir(self.cacheFolder): os.mkdir(self.cacheFolder)
+        # write to a temp file first so a half written index is never loaded
+        tempFile = "%s_%s.tmp" % (self.indexFile, uuid.uuid4().hex[:8])
+        try:
+            with open(tempFile, "w") as indexFile:
+                json.dump(self.index, indexFile)
+            if os.path.isfile(self.indexFile):
+                # os.rename doesn't overwrite an existing file on Windows
+                System.IO.File.Replace(tempFile, self.indexFile, None)
+            else:
+                os.rename(tempFile, self.indexFile)
+        except Exception:
+            try: os.remove(tempFile)
+            except OSError: pass
+            raise IOError("Failed to write %s." % self.indexFile)
+    
+    def clear(self):
+        """Remove all the cached files for this result file."""
+        if not os.path.isdir(self.cacheFolder): return
+        for fileName in os.listdir(self.cacheFolder):
+            try: os.remove(os.path.join(self.cacheFolder, fileName))
+            except OSError: pass
+    
+    @property
+    def header(self):
+        return self.index["header"]
+    
+    @property
+    def rowCount(self):
+        return self.index["rowCount"]
+    
+    def setHeader(self, header):
+        self.index["header"] = list(header)
+        try: self.saveIndex()
+        except (IOError, OSError): pass
+    
+    def hasColumn(self, columnKey):
+        return columnKey in self.index["columns"]
+    
+    def readColumns(self, columnKeys):
+        """Return a dictionary of columnKey: (array('d'), badCells) for cached columns."""
+        # group columns by the file that they are stored in
+        fileColumns = {}
+        for columnKey in columnKeys:
+            if self.hasColumn(columnKey):
+                fileName, offset, count, badCells = self.index["columns"][columnKey]
+                fileColumns.setdefault(fileName, []).append((columnKey, offset, count, badCells))
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+        
+        columns = {}
+        for fileName, fileColumnList in fileColumns.items():
+            filePath = os.path.join(self.cacheFolder, fileName)
+            try:
+                with open(filePath, "rb") as binFile:
+                    fileSize = os.path.getsize(filePath)
+                    mappedFile = mmap.mmap(binFile.fileno(), 0, access=mmap.ACCESS_READ) \
+                                 if mmap and fileSize else None
+                    try:
+                        for columnKey, offset, count, badCells in fileColumnList:
+                            values = array.array("d")
+                            if mappedFile is not None:
+                                values.fromstring(mappedFile[offset: offset + count * values.itemsize])
+                            else:
+                                binFile.seek(offset)
+                                values.fromfile(binFile, count)
+                            self.stats["bytesRead"] += count * values.itemsize
+                            columns[columnKey] = values, badCells
+                    finally:
+                        if mappedFile is not None: mappedFile.close()
+            except (IOError, OSError, EOFError, ValueError):
+                # the binary file is missing or broken. read the columns from the source.
+                for columnKey, offset, count, badCells in fileColumnList:
+                    del(self.index["columns"][columnKey])
+                    columns.pop(columnKey, None)
+        
+        return columns
+    
+    def writeColumns(self, columns, rowCount):
+        """Add columns to cache.
+        
+        Args:
+            columns: A list of (columnKey, variable, array('d'), badCells). All the
+                columns of the same variable are written to the same file.
+            rowCount: Number of data rows in the result file.
+        """
+        try:
+            if not os.path.isdir(self.cacheFolder): os.mkdir(self.cacheFolder)
+            for columnKey, variable, values, badCells in columns:
+                fileName = re.sub(r"[^\w\-]+", "_", variable or "unknown") + ".bin"
+                with open(os.path.join(self.cacheFolder, fileName), "ab") as binFile:
+                    binFile.seek(0, 2)
+                    offset = binFile.tell()
+                    values.tofile(binFile)
+                self.index["columns"][columnKey] = [fileName, offset, len(values), badCells]
+            self.index["rowCount"] = rowCount
+            self.saveIndex()
+        except (IOError, OSError):
+            # the folder is read only. the results will be read from source file.
+            pass
+    
+    @classmethod
+    def report(cls):
+        return "EnergyPlus result cache: %d hits, %d misses, %.1f MB read." % \
+               (cls.stats["hits"], cls.stats["misses"], cls.stats["bytesRead"] / 1048576.0)
+
+class EPResultReader(object):
+    """Read EnergyPlus result csv files column by column.
+    
+    The header is classified once against a precompiled pattern table and
+    each column is indexed as (dataType, key, variable, units, frequency).
+    Data rows are then streamed in large blocks and only the selected columns
+    are converted to floats and stored in typed array('d') columns.
+    
+    Args:
+        resultFile: Path to EnergyPlus result csv file (e.g. eplusout.csv).
+        patternTable: Optional list of (dataType, [variable names]). A column
+            is classified as the first dataType that one of its variable names
+            can be found in. Default is EPResultReader.zoneVariables.
+        blockSize: Approximate number of bytes that will be read from the file
+            in each block.
+        useCache: Set to False to not use the binary EPResultCache of the file.
+    """
+    
+    # variables that are read by Read EP Result component
+    zoneVariables = (
+        ("cooling", ("Zone Ideal Loads Supply Air Total Cooling Energy", "Zone Ideal Loads Supply Air Sensible Cooling Energy",
+            "Zone Ideal Loads Supply Air Latent Cooling Energy", "Chiller Electric Energy", "Cooling Coil Electric Energy",
+            "Zone VRF Air Terminal Cooling Electric Energy", "VRF Heat Pump Cooling Electric Energy",
+            "Chiller Heater System Cooling Electric Energy")),
+        ("heating", ("Zone Ideal Loads Supply Air Total Heating Energy", "Zone Ideal Loads Supply Air Sensible Heating Energy",
+            "Zone Ideal Loads Supply Air Latent Heating Energy", "Boiler Heating Energy", "Boiler Gas Energy",
+            "Heating Coil Total Heating Energy", "Heating Coil Gas Energy", "Heating Coil Electric Energy",
+            "Humidifier Electric Energy", "Zone VRF Air Terminal Heating Electric Energy",
+            "VRF Heat Pump Heating Electric Energy", "Chiller Heater System Heating Electric Energy")),
+        ("electricLight", ("Zone Lights Electric Energy",)),
+        ("electricEquip", ("Zone Electric Equipment Electric Energy",)),
+        ("fanElectric", ("Fan Electric Energy",)),
+        ("pumpElectric", ("Pump Electric Energy",)),
+        ("peopleGains", ("Zone People Total Heating Energy", "Zone People Sensible Heating Energy", "Zone People Latent Gain Energy")),
+        ("totalSolarGain", ("Zone Windows Total Transmitted Solar Radiation Energy",)),
+        ("natVentLoss", ("Zone Ventilation Sensible Heat Loss Energy",)),
+        ("natVentGain", ("Zone Ventilation Sensible Heat Gain Energy",)),
+        ("zoneHeating", ("Zone Ideal Loads Zone Total Heating Energy", "Zone Ideal Loads Zone Sensible Heating Energy",
+            "Zone Ideal Loads Zone Latent Heating Energy")),
+        ("zoneCooling", ("Zone Ideal Loads Zone Total Cooling Energy", "Zone Ideal Loads Zone Sensible Cooling Energy",
+            "Zone Ideal Loads Zone Latent Cooling Energy")),
+        ("infiltrationLoss", ("Zone Infiltration Total Heat Loss Energy", "Zone Infiltration Sensible Heat Loss Energy",
+            "Zone Infiltration Latent Heat Loss Energy")),
+        ("infiltrationGain", ("Zone Infiltration Total Heat Gain Energy", "Zone Infiltration Sensible Heat Gain Energy",
+            "Zone Infiltration Latent Heat Gain Energy")),
+        ("operativeTemperature", ("Zone Operative Temperature",)),
+        ("airTemperature", ("Zone Mean Air Temperature",)),
+        ("meanRadTemperature", ("Zone Mean Radiant Temperature",)),
+        ("relativeHumidity", ("Zone Air Relative Humidity",)),
+        ("natVentFlow", ("Zone Ventilation Standard Density Volume Flow Rate",)),
+        ("infiltrationFlow", ("Zone Infiltration Standard Density Volume Flow Rate",)),
+        ("mechVentFlow", ("Zone Mechanical Ventilation Standard Density Volume Flow Rate",)),
+        ("earthTubeFlow", ("Earth Tube Air Flow Volume",)),
+        ("internalAirGain", ("Zone Air Heat Balance Internal Convective Heat Gain Rate",)),
+        ("surfaceAirGain", ("Zone Air Heat Balance Surface Convection Rate",)),
+        ("systemAirGain", ("Zone Air Heat Balance System Air Transfer Rate",))
+        )
+    
+    # variables that are read by Read EP Surface Result component
+    surfaceVariables = (
+        ("surfaceIndoorTemp", ("Surface Inside Face Temperature",)),
+        ("surfaceOutdoorTemp", ("Surface Outside Face Temperature",)),
+        ("opaqueEnergyFlow", ("Surface Average Face Conduction Heat Transfer Energy",)),
+        ("glazHeatGain", ("Surface Window Heat Gain Energy",)),
+        ("glazHeatLoss", ("Surface Window Heat Loss Energy",)),
+        ("windowBeamEnergy", ("Surface Window Transmitted Beam Solar Radiation Energy",)),
+        ("windowDiffEnergy", ("Surface Window Transmitted Diffuse Solar Radiation Energy",)),
+        ("windowTotalSolarEnergy", ("Surface Window Transmitted Solar Radiation Energy",)),
+        ("windowTransmissivity", ("Surface Window System Solar Transmittance",))
+        )
+    
+    # KEY NAME:Variable Name [Units](Frequency)
+    headerPattern = re.compile(r"^(?P<key>.*):(?P<variable>[^:\[\(]*?)\s*(?:\[(?P<units>[^\]]*)\])?\s*(?:\((?P<frequency>[^\)]*)\))?\s*$")
+    
+    def __init__(self, resultFile, patternTable = None, blockSize = 8388608, useCache = True):
+        self.resultFile = resultFile
+        self.blockSize = blockSize
+        
+        self.cache = None
+        if useCache:
+            try: self.cache = EPResultCache(resultFile)
+            except (IOError, OSError): self.cache = None
+        
+        if patternTable is None: patternTable = self.zoneVariables
+        self.patterns = [(dataType, re.compile("|".join(re.escape(name) for name in names))) \
+                         for dataType, names in patternTable]
+        
+        self.header = []
+        self.columns = []
+        self.badCells = {}
+        self.rowCount = 0
+        self.readHeader()
+    
+    @classmethod
+    def fromFile(cls, resultFile, patternTable = None):
+        """Return a result reader based on the extension of the result file.
+        
+        eplusout.sql files are read with EPSqlResultReader and all the other
+        files are read as csv files.
+        """
+        if resultFile.lower().endswith(".sql"):
+            return EPSqlResultReader(resultFile, patternTable)
+        return EPResultReader(resultFile, patternTable)
+    
+    def classify(self, variable):
+        """Return dataType for a variable name or None if it's not in pattern table."""
+        for dataType, pattern in self.patterns:
+            if pattern.search(variable):
+                return dataType
+        return None
+    
+    def readHeader(self):
+        """Read the first line of the file and index all the columns."""
+        if self.cache is not None and self.cache.header is not None:
+            self.header = self.cache.header
+        else:
+            with open(self.resultFile, "r") as resultFile:
+                self.header = resultFile.readline().rstrip("\r\n").split(",")
+            if self.cache is not None: self.cache.setHeader(self.header)
+        
+        return self.indexHeader()
+    
+    def indexHeader(self):
+        """Classify the columns of self.header against the pattern table."""
+        # many keys share the same variable so each variable is only classified once
+        dataTypes = {}
+        self.columns = []
+        for column in self.header:
+            match = self.headerPattern.match(column.strip())
+            if not match:
+                self.columns.append((None, None, column, None, None))
+                continue
+            
+            variable = match.group("variable")
+            if variable not in dataTypes:
+                dataTypes[variable] = self.classify(variable)
+            
+            self.columns.append((dataTypes[variable], match.group("key"), variable, \
+                                 match.group("units"), match.group("frequency")))
+        
+        return self.columns
+    
+    def select(self, dataTypes = None, keys = None):
+        """Return index of columns for input dataTypes and keys (e.g. zone names).
+        
+        Args:
+            dataTypes: A list of dataTypes from the pattern table. Default is all
+                the classified columns.
+            keys: A list of key names. Keys are not case sensitive. Default is all
+                the keys.
+        """
+        if keys is not None: keys = set(k.strip().upper() for k in keys)
+        
+        selected = []
+        for count, (dataType, key, variable, units, frequency) in enumerate(self.columns):
+            if dataType is None: continue
+            if dataTypes is not None and dataType not in dataTypes: continue
+            if keys is not None and key.strip().upper() not in keys: continue
+            selected.append(count)
+        return selected
+    
+    def readColumns(self, columnIndexes):
+        """Stream the data rows and return the values for input columns.
+        
+        Columns that are already in the binary cache are loaded from the cache
+        and only the rest of the columns are parsed from the result file.
+        
+        Returns:
+            A dictionary with column index as key and an array('d') of values as
+            value. Cells that can't be converted to float are skipped and counted
+            in self.badCells.
+        """
+        values = {}
+        self.badCells = {}
+        self.rowCount = 0
+        
+        if self.cache is not None:
+            cachedColumns = self.cache.readColumns([str(c) for c in columnIndexes])
+            for c in columnIndexes:
+                if str(c) in cachedColumns:
+                    values[c], self.badCells[c] = cachedColumns[str(c)]
+            self.rowCount = self.cache.rowCount
+        
+        columnIndexes = [c for c in columnIndexes if c not in values]
+        if not columnIndexes: return values
+        
+        values.update(self.parseColumns(columnIndexes))
+        
+        if self.cache is not None:
+            self.cache.writeColumns([(str(c), self.columns[c][2], values[c], self.badCells[c]) \
+                                     for c in columnIndexes], self.rowCount)
+        
+        return values
+    
+    def parseColumns(self, columnIndexes):
+        """Parse input columns from the result file and set self.rowCount."""
+        values = {}
+        for c in columnIndexes:
+            values[c] = array.array("d")
+            self.badCells[c] = 0
+        self.rowCount = 0
+        
+        with open(self.resultFile, "r") as resultFile:
+            resultFile.readline()
+            while True:
+                lines = resultFile.readlines(self.blockSize)
+                if not lines: break
+                self.rowCount += len(lines)
+                rows = [line.split(",") for line in lines]
+                for c in columnIndexes:
+                    try:
+                        values[c].extend(map(float, [row[c] for row in rows]))
+                    except (ValueError, IndexError):
+                        # empty cells for mismatched frequencies or a broken line
+                        for row in rows:
+                            try: values[c].append(float(row[c]))
+                            except (ValueError, IndexError): self.badCells[c] += 1
+        
+        return values
+
+class EPSqlResultReader(EPResultReader):
+    """Read EnergyPlus eplusout.sql files with the same interface as EPResultReader.
+    
+    The header is generated from ReportDataDictionary in the same format as the
+    csv files that are written by ReadVarsESO so the columns are classified and
+    selected the same way. Values of all the selected columns are read from
+    ReportData in a single query for the run period timesteps (warmup days are
+    excluded). Since the sql file has no 255 columns limit there is no need to
+    run ReadVarsESO. The sql file is only read and never changed.
+    
+    The file is read with sqlite3 if it is available or otherwise with
+    System.Data.SQLite (IronPython doesn't ship sqlite3). System.Data.SQLite.dll
+    should be in a folder that Rhino can load assemblies from.
+    
+    Args:
+        resultFile: Path to EnergyPlus sql file (e.g. eplusout.sql). The file
+            should be written by EnergyPlus 8.2 or newer.
+        patternTable: Optional list of (dataType, [variable names]). Default is
+            EPResultReader.zoneVariables.
+        useCache: Set to False to not use the binary EPResultCache of the file.
+    """
+    
+    # ReportingFrequency in the sql file > frequency in the csv header
+    frequencies = {
+        "Zone Timestep": "TimeStep",
+        "HVAC System Timestep": "TimeStep",
+        "Detailed": "Each Call",
+        "Run Period": "RunPeriod"
+        }
+    
+    dataQuery = "SELECT ReportData.ReportDataDictionaryIndex, ReportData.Value FROM ReportData " + \
+                "INNER JOIN Time ON ReportData.TimeIndex = Time.TimeIndex " + \
+                "WHERE ReportData.ReportDataDictionaryIndex IN (%s) " + \
+                "AND (Time.WarmupFlag IS NULL OR Time.WarmupFlag = 0) " + \
+                "ORDER BY ReportData.TimeIndex"
+    
+    def __init__(self, resultFile, patternTable = None, useCache = True):
+        if self.backend() is None:
+            raise ImportError("Neither sqlite3 nor System.Data.SQLite is available to read the sql file.\n" + \
+                              "Use the csv result file instead of the sql file.")
+        if not os.path.isfile(resultFile):
+            raise IOError("Can't find %s."%resultFile)
+        
+        self.dictionaryIndexes = []
+        EPResultReader.__init__(self, resultFile, patternTable, useCache = useCache)
+    
+    @staticmethod
+    def backend():
+        """Return "sqlite3" or "System.Data.SQLite" based on the library that is available or None."""
+        if sqlite3 is not None: return "sqlite3"
+        try:
+            clr.AddReference("System.Data.SQLite")
+            return "System.Data.SQLite"
+        except Exception:
+            return None
+    
+    def query(self, sql):
+        """Return the rows of a read-only query as a list of tuples."""
+        if sqlite3 is not None:
+            connection = sqlite3.connect(self.resultFile)
+            try:
+                return connection.execute(sql).fetchall()
+            finally:
+                connection.close()
+        
+        import System.Data.SQLite
+        connection = System.Data.SQLite.SQLiteConnection(
+            "Data Source=%s;Read Only=True;FailIfMissing=True" % self.resultFile)
+        connection.Open()
+        try:
+            command = connection.CreateCommand()
+            command.CommandText = sql
+            reader = command.ExecuteReader()
+            rows = []
+            try:
+                while reader.Read():
+                    rows.append(tuple(None if reader.IsDBNull(i) else reader.GetValue(i) \
+                                      for i in range(reader.FieldCount)))
+            finally:
+                reader.Close()
+            return rows
+        finally:
+            connection.Close()
+    
+    def readHeader(self):
+        """Generate the header from ReportDataDictionary and index all the columns."""
+        tables = [t[0] for t in self.query("SELECT name FROM sqlite_master WHERE type='table'")]
+        if "ReportDataDictionary" not in tables:
+            raise ValueError("%s has no ReportDataDictionary table.\n"%self.resultFile + \
+                             "The sql file should be written by EnergyPlus 8.2 or newer.")
+        
+        dictionary = self.query("SELECT ReportDataDictionaryIndex, KeyValue, Name, " + \
+                                "Units, ReportingFrequency FROM ReportDataDictionary " + \
+                                "ORDER BY ReportDataDictionaryIndex")
+        
+        self.header = ["Date/Time"]
+        self.dictionaryIndexes = [None]
+        for index, keyValue, name, units, frequency in dictionary:
+            frequency = self.frequencies.get(frequency, frequency)
+            if keyValue: column = "%s:%s [%s](%s)"%(keyValue, name, units, frequency)
+            else: column = "%s [%s](%s)"%(name, units, frequency)
+            self.header.append(column)
+            self.dictionaryIndexes.append(int(index))
+        
+        return self.indexHeader()
+    
+    def parseColumns(self, columnIndexes):
+        """Query input columns from the sql file and set self.rowCount."""
+        values = {}
+        rowCounts = {}
+        columnsByIndex = {}
+        for c in columnIndexes:
+            values[c] = array.array("d")
+            self.badCells[c] = 0
+            rowCounts[c] = 0
+            if self.dictionaryIndexes[c] is not None:
+                columnsByIndex.setdefault(self.dictionaryIndexes[c], []).append(c)
+        
+        if columnsByIndex:
+            # indexes are integers from the file so they can be written in the query
+            sql = self.dataQuery % ", ".join(str(index) for index in columnsByIndex)
+            for index, value in self.query(sql):
+                for c in columnsByIndex[int(index)]:
+                    rowCounts[c] += 1
+                    if value is None: self.badCells[c] += 1
+                    else: values[c].append(value)
+        
+        self.rowCount = max(rowCounts.values()) if rowCounts else 0
+        return values
+
+class IDFBlockCache(object):
+    """Cache of the IDF object strings that are written by Run Energy Simulation.
+    
+    Each block is saved under its kind (e.g. "Zone", "BuildingSurface") and a
+    fingerprint of the values that the block is generated from, so in a
+    parametric run only the zones, surfaces and library objects that have been
+    changed are written again. Fingerprints should be hashable tuples of the
+    inputs of the writer. The blocks are shared between all the instances and
+    are kept until Honeybee is flown again.
+    
+    Args:
+        component: The component that writes the file. Blocks that add a
+            warning to the component are not cached so the warning will be
+            shown again in the next run.
+    """
+    
+    blocks = {}
+    
+    # the blocks that are not used in the last write are removed when the
+    # cache is larger than this number. A block is a few hundred bytes so this
+    # keeps the cache to a few MB.
+    maxBlocks = 20000
+    
+    # shared between all the instances to report the performance of the cache
+    stats = {"hits": 0, "misses": 0}
+    
+    def __init__(self, component = ghenv.Component):
+        self.component = component
+        self.usedKeys = set()
+    
+    def warningCount(self):
+        try: return len(self.component.RuntimeMessages(gh.GH_RuntimeMessageLevel.Warning))
+        except: return 0
+    
+    def get(self, kind, fingerprint, writer, *args):
+        """Return the cached block or write the block using writer(*args)."""
+        key = kind, fingerprint
+        try:
+            self.usedKeys.add(key)
+            block = self.blocks[key]
+            self.stats["hits"] += 1
+            return block
+        except KeyError:
+            pass
+        except TypeError:
+            # fingerprint is not hashable
+            return writer(*args)
+        
+        self.stats["misses"] += 1
+        warningCount = self.warningCount()
+        block = writer(*args)
+        if self.warningCount() == warningCount: self.blocks[key] = block
+        return block
+    
+    def prune(self):
+        """Remove the blocks that are not used by this instance if the cache is too large."""
+        if len(self.blocks) <= self.maxBlocks: return
+        for key in self.blocks.keys():
+            if key not in self.usedKeys: del(self.blocks[key])
+    
+    @classmethod
+    def clear(cls):
+        cls.blocks.clear()
+    
+    @classmethod
+    def report(cls):
+        return "IDF block cache: %d hits, %d misses, %d blocks." % \
+               (cls.stats["hits"], cls.stats["misses"], len(cls.blocks))
+
 class EPMaterialAux(object):
     
     def __init__(self):
@@ -4967,6 +6910,94 @@ class EPHvac(object):
         self.heatingDetails = heatingDetails
         self.coolingDetails = coolingDetails
 
+class SurfaceVertexStore(object):
+    """Vertices of the surfaces of a zone in flat arrays.
+    
+    Every surface that has coordinates (see hb_reEvaluateHBZones) gets a slot in
+    the store of its zone. The coordinates are kept as doubles in a single array
+    instead of Rhino points so copying and pickling a zone copies a few arrays.
+    Rhino points are only created when the coordinates are asked for.
+    """
+    
+    __slots__ = ("xyz", "offsets")
+    
+    def __init__(self):
+        self.xyz = array.array("d")
+        # start of each slot in xyz. slot n is xyz[offsets[n]:offsets[n + 1]]
+        self.offsets = array.array("l", [0])
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def __getstate__(self):
+        return self.xyz, self.offsets
+    
+    def __setstate__(self, state):
+        self.xyz, self.offsets = state
+    
+    def add(self, points):
+        """Add a list of points (Point3d or (x, y, z)) and return the slot."""
+        for pt in points: self.xyz.extend((pt[0], pt[1], pt[2]))
+        self.offsets.append(len(self.xyz))
+        return len(self.offsets) - 2
+    
+    def replace(self, slot, points):
+        """Replace the points of a slot and return the slot.
+        
+        The points are overwritten in place if the number of points has not changed.
+        Otherwise they are added as a new slot and the new slot is returned.
+        """
+        start, end = self.offsets[slot], self.offsets[slot + 1]
+        xyz = array.array("d")
+        for pt in points: xyz.extend((pt[0], pt[1], pt[2]))
+        if len(xyz) != end - start:
+            self.xyz.extend(xyz)
+            self.offsets.append(len(self.xyz))
+            return len(self.offsets) - 2
+        self.xyz[start:end] = xyz
+        return slot
+    
+    def compact(self, surfaces):
+        """Remove the slots that none of the surfaces use and renumber the slots of the surfaces.
+        
+        surfaces should be all the surfaces that use this store (see EPZone.compactVertexStore).
+        """
+        xyz = array.array("d")
+        offsets = array.array("l", [0])
+        newSlots = {}
+        slotSurfaces = {}
+        for surface in surfaces:
+            if surface.__dict__.get("vertexStore") is not self: continue
+            slot = surface.__dict__.get("vertexSlot")
+            if slot is None: continue
+            if slot not in newSlots:
+                xyz.extend(self.xyz[self.offsets[slot]:self.offsets[slot + 1]])
+                offsets.append(len(xyz))
+                newSlots[slot] = len(offsets) - 2
+            surface.vertexSlot = newSlots[slot]
+            slotSurfaces.setdefault(slot, []).append(surface)
+        
+        # only the surfaces that still share a slot need to move to a new slot when they change
+        for sharingSurfaces in slotSurfaces.values():
+            for surface in sharingSurfaces:
+                if len(sharingSurfaces) > 1: surface.sharedVertexSlot = True
+                else: surface.__dict__.pop("sharedVertexSlot", None)
+        
+        self.xyz, self.offsets = xyz, offsets
+    
+    def tuples(self, slot):
+        """Return the points of a slot as (x, y, z) tuples."""
+        xyz = self.xyz[self.offsets[slot]:self.offsets[slot + 1]]
+        return tuple(zip(xyz[0::3], xyz[1::3], xyz[2::3]))
+    
+    def points(self, slot):
+        """Return the points of a slot as a new list of Rhino points."""
+        return [rc.Geometry.Point3d(x, y, z) for x, y, z in self.tuples(slot)]
+    
+    def nbytes(self):
+        return self.xyz.itemsize * len(self.xyz) + self.offsets.itemsize * len(self.offsets)
+
+
 class EPZone(object):
     """This calss represents a honeybee zone that will be used for energy and daylighting
     simulatios"""
@@ -5114,6 +7145,7 @@ class EPZone(object):
         #Transform the geometry.
         self.geometry.Transform(transform)
         self.cenPt.Transform(transform)
+        self.outputGeometryCache = None
         if flip == True:
             self.geometry.Flip()
         for surface in self.surfaces:
@@ -5242,6 +7274,8 @@ class EPZone(object):
         return joinedMesh
     
     def checkZoneNormalsDir(self):
+        # surfaces might be flipped in place
+        self.outputGeometryCache = None
         
         def checkSrfNormal(HBSrf, anchorPts, nVecs, planarTrigger):
             #Find the corresponding surface in the closed zone geometry.
@@ -5254,6 +7288,7 @@ class EPZone(object):
                         HBSrf.geometry.Flip()
                         HBSrf.normalVector.Reverse()
                         HBSrf.basePlane.Flip()
+                        HBSrf.outputGeometryCache = None
                         # change the surface type if need be.
                         if HBSrf.srfTypeByUser == False:
                             if int(HBSrf.type) == 2:
@@ -5541,6 +7576,16 @@ class EPZone(object):
     def setName(self, newName):
         self.name = newName
     
+    def compactVertexStore(self):
+        """Remove the coordinates that none of the surfaces of the zone use from the vertex store of the zone."""
+        store = getattr(self, "vertexStore", None)
+        if store is None: return
+        surfaces = []
+        for surface in self.surfaces:
+            surfaces.append(surface)
+            surfaces.extend(getattr(surface, "childSrfs", []))
+        store.compact(surfaces)
+    
     def __str__(self):
         try:
             return 'Zone name: ' + self.name + \
@@ -6019,6 +8064,91 @@ class hb_reEvaluateHBZones(object):
 
 class hb_EPSurface(object):
     
+    # lookup tables that are shared by all the surfaces
+    # 4 represents an Air Wall
+    srfType = {0:'WALL',
+       0.5: 'UndergroundWall',
+       1:'ROOF',
+       1.5: 'UndergroundCeiling',
+       2:'FLOOR',
+       2.25: 'UndergroundSlab',
+       2.5: 'SlabOnGrade',
+       2.75: 'ExposedFloor',
+       3:'CEILING',
+       4:'AIRWALL',
+       5:'WINDOW',
+       6:'SHADING',
+       'WALL': 'WALL',
+       'ROOF':'ROOF',
+       'FLOOR': 'FLOOR',
+       'CEILING': 'CEILING',
+       'WINDOW':'WINDOW',
+       'SHADING': 'SHADING'}
+       
+    cnstrSet = {0:'Exterior Wall',
+            0.5: 'Exterior Wall',
+            1: 'Exterior Roof',
+            1.5: 'Exterior Roof',
+            2:'Interior Floor',
+            2.25: 'Exterior Floor',
+            2.5: 'Exterior Floor',
+            2.75: 'Exterior Floor',
+            3:'Interior Ceiling',
+            4:'Air Wall',
+            5:'Exterior Window',
+            6:'Interior Wall'}
+    
+    intCnstrSet = {
+            0:'Interior Wall',
+            0.5: 'Exterior Wall',
+            1:'Exterior Roof',
+            1.5:'Exterior Roof',
+            2:'Interior Floor',
+            2.25: 'Exterior Floor',
+            2.5: 'Exterior Floor',
+            2.75: 'Exterior Floor',
+            3:'Interior Ceiling',
+            4:'Air Wall',
+            5:'Interior Window',
+            6:'Interior Wall'}
+    
+    srfBC = {0:'Outdoors',
+                 0.5: 'ground',
+                 1:'Outdoors',
+                 1.5: 'ground',
+                 2: 'outdoors', # this will be changed to surface once solveAdjacency is used 
+                 2.25: 'ground',
+                 2.5: 'ground',
+                 2.75: 'outdoors',
+                 3: 'outdoors', # this will be changed to surface once solveAdjacency is used 
+                 4: 'surface',
+                 5: 'Outdoors',
+                 6: 'surface'}
+     
+    srfSunExposure = {0:'SunExposed',
+                 0.5:'NoSun',
+                 1:'SunExposed',
+                 1.5:'NoSun', 
+                 2:'NoSun',
+                 2.25: 'NoSun',
+                 2.5: 'NoSun',
+                 2.75: 'SunExposed',
+                 3:'NoSun',
+                 4:'NoSun',
+                 6: 'NoSun'}
+         
+    srfWindExposure = {0:'WindExposed',
+                 0.5:'NoWind',
+                 1:'WindExposed',
+                 1.5:'NoWind',
+                 2:'NoWind',
+                 2.25:'NoWind',
+                 2.5:'NoWind',
+                 2.75:'WindExposed',
+                 3:'NoWind',
+                 4:'NoWind',
+                 6:'NoWind'}
+    
     def __init__(self, surface, srfNumber, srfID, *arg):
         """EP surface Class
             surface: surface geometry as a Brep
@@ -6061,90 +8191,6 @@ class hb_EPSurface(object):
         
         self.containsPVgen = False
         
-        # 4 represents an Air Wall
-        self.srfType = {0:'WALL',
-           0.5: 'UndergroundWall',
-           1:'ROOF',
-           1.5: 'UndergroundCeiling',
-           2:'FLOOR',
-           2.25: 'UndergroundSlab',
-           2.5: 'SlabOnGrade',
-           2.75: 'ExposedFloor',
-           3:'CEILING',
-           4:'AIRWALL',
-           5:'WINDOW',
-           6:'SHADING',
-           'WALL': 'WALL',
-           'ROOF':'ROOF',
-           'FLOOR': 'FLOOR',
-           'CEILING': 'CEILING',
-           'WINDOW':'WINDOW',
-           'SHADING': 'SHADING'}
-           
-        self.cnstrSet = {0:'Exterior Wall',
-                0.5: 'Exterior Wall',
-                1: 'Exterior Roof',
-                1.5: 'Exterior Roof',
-                2:'Interior Floor',
-                2.25: 'Exterior Floor',
-                2.5: 'Exterior Floor',
-                2.75: 'Exterior Floor',
-                3:'Interior Ceiling',
-                4:'Air Wall',
-                5:'Exterior Window',
-                6:'Interior Wall'}
-        
-        self.intCnstrSet = {
-                0:'Interior Wall',
-                0.5: 'Exterior Wall',
-                1:'Exterior Roof',
-                1.5:'Exterior Roof',
-                2:'Interior Floor',
-                2.25: 'Exterior Floor',
-                2.5: 'Exterior Floor',
-                2.75: 'Exterior Floor',
-                3:'Interior Ceiling',
-                4:'Air Wall',
-                5:'Interior Window',
-                6:'Interior Wall'}
-        
-        self.srfBC = {0:'Outdoors',
-                     0.5: 'ground',
-                     1:'Outdoors',
-                     1.5: 'ground',
-                     2: 'outdoors', # this will be changed to surface once solveAdjacency is used 
-                     2.25: 'ground',
-                     2.5: 'ground',
-                     2.75: 'outdoors',
-                     3: 'outdoors', # this will be changed to surface once solveAdjacency is used 
-                     4: 'surface',
-                     5: 'Outdoors',
-                     6: 'surface'}
-         
-        self.srfSunExposure = {0:'SunExposed',
-                     0.5:'NoSun',
-                     1:'SunExposed',
-                     1.5:'NoSun', 
-                     2:'NoSun',
-                     2.25: 'NoSun',
-                     2.5: 'NoSun',
-                     2.75: 'SunExposed',
-                     3:'NoSun',
-                     4:'NoSun',
-                     6: 'NoSun'}
-             
-        self.srfWindExposure = {0:'WindExposed',
-                     0.5:'NoWind',
-                     1:'WindExposed',
-                     1.5:'NoWind',
-                     2:'NoWind',
-                     2.25:'NoWind',
-                     2.5:'NoWind',
-                     2.75:'WindExposed',
-                     3:'NoWind',
-                     4:'NoWind',
-                     6:'NoWind'}
-        
         self.numOfVertices = 'autocalculate'
         
         if len(arg) == 0:
@@ -6181,7 +8227,68 @@ class hb_EPSurface(object):
     
     def resetID(self):
         self.ID = str(uuid.uuid4())
-        
+    
+    def getVertexStore(self):
+        """Return the vertex store of the zone of this surface."""
+        store = self.__dict__.get("vertexStore")
+        if store is None:
+            zone = getattr(self, "parent", None)
+            if getattr(self, "isChild", False): zone = getattr(zone, "parent", None)
+            
+            if getattr(zone, "objectType", None) == "HBZone":
+                store = getattr(zone, "vertexStore", None)
+                if store is None: store = zone.vertexStore = SurfaceVertexStore()
+            else:
+                # surface is not part of a zone
+                store = SurfaceVertexStore()
+            self.vertexStore = store
+        return store
+    
+    def _getCoordinates(self):
+        try:
+            return self.vertexStore.points(self.vertexSlot)
+        except AttributeError:
+            # surfaces from older versions keep their coordinates as a list
+            try: return self.__dict__["coordinates"]
+            except KeyError: raise AttributeError("coordinates")
+    
+    def _setCoordinates(self, coordinates):
+        self.__dict__.pop("coordinates", None)
+        if "vertexSlot" in self.__dict__ and not self.__dict__.pop("sharedVertexSlot", False):
+            self.vertexSlot = self.vertexStore.replace(self.vertexSlot, coordinates)
+        else:
+            # a slot that is shared with a copy of the surface (see __copy__) can't be overwritten
+            self.__dict__.pop("sharedVertexSlot", None)
+            self.vertexSlot = self.getVertexStore().add(coordinates)
+    
+    def _delCoordinates(self):
+        self.__dict__.pop("coordinates", None)
+        self.__dict__.pop("vertexSlot", None)
+    
+    # coordinates are stored in the vertex store of the zone and are
+    # returned as a new list of Rhino points. Changing the list in place
+    # doesn't change the surface. Set the coordinates again to change them:
+    #   coordinates = surface.coordinates
+    #   coordinates.reverse()
+    #   surface.coordinates = coordinates
+    coordinates = property(_getCoordinates, _setCoordinates, _delCoordinates)
+    
+    def __copy__(self):
+        # copy.copy shares the slot of the surface in the vertex store of the zone.
+        # mark both surfaces so the first one that sets its coordinates moves to a new slot
+        newSurface = self.__class__.__new__(self.__class__)
+        newSurface.__dict__.update(self.__dict__)
+        if "vertexSlot" in self.__dict__:
+            self.sharedVertexSlot = newSurface.sharedVertexSlot = True
+        return newSurface
+    
+    def vertexTuples(self):
+        """Return the coordinates as (x, y, z) tuples without creating Rhino points."""
+        try:
+            return self.vertexStore.tuples(self.vertexSlot)
+        except AttributeError:
+            return tuple((pt.X, pt.Y, pt.Z) for pt in self.coordinates)
+    
     def checkPlanarity(self):
         # planarity tolerance should change for different 
         return self.geometry.Faces[0].IsPlanar(1e-3)
@@ -6623,6 +8730,7 @@ class hb_EPSurface(object):
             pass
         self.geometry.Transform(transform)
         self.meshedFace.Transform(transform)
+        self.outputGeometryCache = None
         # move center point and normal
         self.cenPt.Transform(transform)
         self.normalVector.Transform(transform)
@@ -8196,6 +10304,154 @@ class thermBC(object):
                '\nFilm Coefficient: ' + str(self.BCProperties['H']) + ' W/m2-K' + \
                '\n-------------------------------------'
 
+class SkyPatchMatrix(object):
+    """Compact storage of the sky patches that the test points of a zone can see.
+    
+    For every point and sky patch the Indoor View Factor Calculator finds either
+    0 (blocked), a transmissivity or the list of window names that the ray passes
+    through. Most of the patches share a handful of these outcomes so each one is
+    stored once in a group table and the points only keep a 2 byte group id per
+    patch. Group 0 is always the blocked group.
+    
+    blockedVec() and blockNames() return list-like views of the matrix that can
+    be indexed as testPtBlockedVec[zone][point][patch] and
+    testPtBlockName[zone][point][patch] by the comfort recipes without expanding
+    the matrix.
+    
+    Args:
+        patchCount: Number of sky patches for each point.
+    """
+    
+    def __init__(self, patchCount):
+        self.patchCount = patchCount
+        self.groupIds = array.array('H')
+        # transmissivities are kept as float32 and the window names as tuples
+        self.groupTransmiss = array.array('f', [0])
+        self.groupNames = [0]
+        self.groupIndex = {(0, 0): 0}
+    
+    def __len__(self):
+        return len(self.groupIds) // self.patchCount
+    
+    def groupId(self, transmiss, names):
+        if transmiss == 0: return 0
+        if isinstance(names, list): names = tuple(names)
+        key = (transmiss, names)
+        try:
+            return self.groupIndex[key]
+        except KeyError:
+            groupId = len(self.groupNames)
+            if groupId > 65535 and self.groupIds.typecode == 'H':
+                self.groupIds = array.array('l', self.groupIds)
+            self.groupIndex[key] = groupId
+            self.groupTransmiss.append(transmiss)
+            self.groupNames.append(names)
+            return groupId
+    
+    def append(self, transmissList, nameList):
+        """Add a point from the transmissivity and the window name lists of its sky patches."""
+        assert len(transmissList) == self.patchCount, \
+            "Expected %d sky patches but got %d." % (self.patchCount, len(transmissList))
+        self.groupIds.extend(self.groupId(transmiss, names) for transmiss, names in zip(transmissList, nameList))
+    
+    def extend(self, transmissLists, nameLists):
+        for transmissList, nameList in zip(transmissLists, nameLists):
+            self.append(transmissList, nameList)
+    
+    def rowIds(self, pointCount):
+        start = pointCount * self.patchCount
+        return self.groupIds[start:start + self.patchCount]
+    
+    def column(self, patchCount, values=None):
+        """Return the value of a sky patch for all the points. Values default to the transmissivities."""
+        if values == None: values = self.groupTransmiss
+        return [values[groupId] for groupId in self.groupIds[patchCount::self.patchCount]]
+    
+    def blockedVec(self):
+        return SkyPatchView(self, self.groupTransmiss)
+    
+    def blockNames(self):
+        return SkyPatchView(self, self.groupNames)
+    
+    def getState(self):
+        """Return the matrix as plain lists and arrays so it can be saved without this class."""
+        return (self.patchCount, self.groupIds, self.groupTransmiss, self.groupNames)
+    
+    @classmethod
+    def fromState(cls, state):
+        patchCount, groupIds, groupTransmiss, groupNames = state
+        matrix = cls(patchCount)
+        matrix.groupIds = groupIds
+        matrix.groupTransmiss = groupTransmiss
+        matrix.groupNames = groupNames
+        matrix.groupIndex = dict(((groupTransmiss[groupId], names), groupId) for groupId, names in enumerate(groupNames))
+        return matrix
+    
+    def __str__(self):
+        return "Sky Patch Matrix: %d points, %d sky patches, %d groups" % \
+               (len(self), self.patchCount, len(self.groupNames))
+
+
+class SkyPatchView(object):
+    """List-like view of a SkyPatchMatrix that maps the group ids to one value per group.
+    
+    view[point] is a SkyPatchRow and view[point][patch] is the value of the
+    group. Mapping the same matrix to other values (e.g. the transmissivity of
+    the windows for one hour of a shade schedule) doesn't copy the matrix.
+    """
+    
+    def __init__(self, matrix, values):
+        self.matrix = matrix
+        self.values = values
+    
+    def __len__(self):
+        return len(self.matrix)
+    
+    def __getitem__(self, pointCount):
+        if isinstance(pointCount, slice):
+            return [self[count] for count in xrange(*pointCount.indices(len(self)))]
+        if pointCount < 0: pointCount += len(self)
+        if not 0 <= pointCount < len(self): raise IndexError("point index out of range")
+        return SkyPatchRow(self, pointCount)
+    
+    def __iter__(self):
+        for pointCount in xrange(len(self)):
+            yield SkyPatchRow(self, pointCount)
+    
+    def value(self, pointCount, patchCount):
+        return self.values[self.matrix.groupIds[pointCount * self.matrix.patchCount + patchCount]]
+    
+    def column(self, patchCount):
+        return self.matrix.column(patchCount, self.values)
+    
+    def withValues(self, values):
+        return SkyPatchView(self.matrix, values)
+
+
+class SkyPatchRow(object):
+    """The sky patches of one point of a SkyPatchView."""
+    
+    __slots__ = ("view", "pointCount")
+    
+    def __init__(self, view, pointCount):
+        self.view = view
+        self.pointCount = pointCount
+    
+    def __len__(self):
+        return self.view.matrix.patchCount
+    
+    def __getitem__(self, patchCount):
+        if isinstance(patchCount, slice): return list(self)[patchCount]
+        if patchCount < 0: patchCount += len(self)
+        if not 0 <= patchCount < len(self): raise IndexError("sky patch index out of range")
+        return self.view.value(self.pointCount, patchCount)
+    
+    def __iter__(self):
+        values = self.view.values
+        for groupId in self.view.matrix.rowIds(self.pointCount):
+            yield values[groupId]
+
+
 class viewFactorInfo(object):
     
     def __init__(self, testPtViewFactor=None, zoneSrfNames=None, testPtSkyView=None, testPtBlockedVec=None, testPtZoneWeights=None, \
@@ -8256,8 +10512,466 @@ class viewFactorInfo(object):
         return 'View Factor Info' + '\nNumber of Points: ' + str(self.NumPts)
 
 
+class HBObjectProxy(object):
+    """Copy-on-write handle to a Honeybee object that is stored in the hive.
+    
+    Reading an attribute reads the object in the hive so read-only components
+    (e.g. readers and test point generators) don't copy the whole model. Lists,
+    dictionaries and nested objects (e.g. proxy.surfaces[0]) are returned as
+    HBAttributeProxy and Rhino geometries are returned as duplicates so they
+    can't be changed in the hive either. The first change (setting or deleting
+    an attribute or an item) and the first method call on the proxy or any of
+    its nested proxies makes a private copy of the whole object and the proxy
+    works on the copy from then on. Methods in readOnlyHBMethods don't make a copy.
+    """
+    
+    __slots__ = ("_hbObject", "_hbCopy", "_hbCopier", "_hbStats")
+    
+    # read-only methods of lists and dictionaries that don't need a copy
+    readOnlyMethods = set(("get", "has_key", "keys", "iterkeys", "values", "itervalues",
+                           "items", "iteritems", "index", "count"))
+    
+    # methods of Honeybee objects that don't change the object and return new values.
+    # they run on the object in the hive.
+    readOnlyHBMethods = set(("getFloorArea", "getZoneVolume", "getExposedArea", "getFloorZLevel",
+                             "getArea", "getTotalArea", "getGlazingArea", "getWWR", "vertexTuples",
+                             "checkPlanarity", "getSrfCenPtandNormalAlternate"))
+    
+    def __init__(self, HBObject, copier, stats = None):
+        object.__setattr__(self, "_hbObject", HBObject)
+        object.__setattr__(self, "_hbCopy", None)
+        object.__setattr__(self, "_hbCopier", copier)
+        object.__setattr__(self, "_hbStats", stats)
+    
+    def target(self):
+        """Return the private copy if there is one or otherwise the object in the hive."""
+        if self._hbCopy is not None: return self._hbCopy
+        return self._hbObject
+    
+    def isMaterialized(self):
+        return self._hbCopy is not None
+    
+    def materialize(self):
+        """Make a private copy of the object if there isn't one already and return it."""
+        if self._hbCopy is None:
+            object.__setattr__(self, "_hbCopy", self._hbCopier(self._hbObject))
+            if self._hbStats is not None: self._hbStats["copies"] += 1
+        return self._hbCopy
+    
+    def wrap(self, value, path):
+        """Return a value of the object that is safe to read.
+        
+        path is a tuple of (isItem, key) from the object to the value.
+        """
+        if value is None or isinstance(value, (bool, int, long, float, str, unicode)):
+            return value
+        if isinstance(value, rc.Runtime.CommonObject):
+            return value.Duplicate()
+        if isinstance(value, System.ValueType):
+            # points, vectors and planes can be changed in place
+            try: return type(value)(value)
+            except Exception: return value
+        if isinstance(value, tuple):
+            return tuple(self.wrap(item, path + ((True, count),)) for count, item in enumerate(value))
+        if callable(value) and not isinstance(value, type):
+            return self.method(path)
+        if isinstance(value, (list, dict, set)) or hasattr(value, "__dict__"):
+            return HBAttributeProxy(self, path)
+        return value
+    
+    def resolve(self, path, obj = None):
+        """Return the value at the end of a path from the object."""
+        if obj is None: obj = self.target()
+        for isItem, key in path:
+            obj = obj[key] if isItem else getattr(obj, key)
+        return obj
+    
+    def method(self, path):
+        """Return a method at the end of a path that runs on the private copy."""
+        container = self.resolve(path[:-1])
+        name = path[-1][1]
+        if isinstance(container, (list, dict, set)) and name in self.readOnlyMethods:
+            return self.readOnlyMethod(path[:-1], container, name)
+        if name in self.readOnlyHBMethods and hasattr(container, "objectType"):
+            return getattr(container, name)
+        
+        def callOnCopy(*args, **kwargs):
+            return getattr(self.resolve(path[:-1], self.materialize()), name)(*args, **kwargs)
+        return callOnCopy
+    
+    def readOnlyMethod(self, path, container, name):
+        if name in ("values", "itervalues"):
+            return lambda: [self.wrap(container[key], path + ((True, key),)) for key in container.keys()]
+        if name in ("items", "iteritems"):
+            return lambda: [(key, self.wrap(container[key], path + ((True, key),))) for key in container.keys()]
+        if name == "get":
+            return lambda key, default = None: \
+                self.wrap(container[key], path + ((True, key),)) if key in container else default
+        return getattr(container, name)
+    
+    @property
+    def __class__(self):
+        # so isinstance checks see the Honeybee object
+        return self.target().__class__
+    
+    def __getattr__(self, name):
+        return self.wrap(getattr(self.target(), name), ((False, name),))
+    
+    def __setattr__(self, name, value):
+        setattr(self.materialize(), name, value)
+    
+    def __delattr__(self, name):
+        delattr(self.materialize(), name)
+    
+    def __str__(self):
+        return str(self.target())
+    
+    def __repr__(self):
+        return "<HBObjectProxy of %r>" % self.target()
+
+
+class HBAttributeProxy(object):
+    """Copy-on-write handle to a list, dictionary or object inside an HBObjectProxy.
+    
+    The values are read from the object of the HBObjectProxy and any change
+    makes a private copy of the whole Honeybee object and is applied to the
+    copy (see HBObjectProxy).
+    """
+    
+    __slots__ = ("_hbRoot", "_hbPath")
+    
+    def __init__(self, root, path):
+        object.__setattr__(self, "_hbRoot", root)
+        object.__setattr__(self, "_hbPath", path)
+    
+    def target(self):
+        return self._hbRoot.resolve(self._hbPath)
+    
+    def materialize(self):
+        """Make a private copy of the Honeybee object and return this value of the copy."""
+        return self._hbRoot.resolve(self._hbPath, self._hbRoot.materialize())
+    
+    @property
+    def __class__(self):
+        return self.target().__class__
+    
+    def __getattr__(self, name):
+        return self._hbRoot.wrap(getattr(self.target(), name), self._hbPath + ((False, name),))
+    
+    def __setattr__(self, name, value):
+        setattr(self.materialize(), name, value)
+    
+    def __delattr__(self, name):
+        delattr(self.materialize(), name)
+    
+    def __getitem__(self, key):
+        value = self.target()[key]
+        if isinstance(key, slice):
+            return [self._hbRoot.wrap(item, self._hbPath + ((True, index),)) \
+                    for item, index in itertools.izip(value, range(*key.indices(len(self.target()))))]
+        return self._hbRoot.wrap(value, self._hbPath + ((True, key),))
+    
+    def __setitem__(self, key, value):
+        self.materialize()[key] = value
+    
+    def __delitem__(self, key):
+        del self.materialize()[key]
+    
+    def __iter__(self):
+        target = self.target()
+        if isinstance(target, (dict, set)):
+            return iter(list(target))
+        return (self[index] for index in range(len(target)))
+    
+    def __len__(self):
+        return len(self.target())
+    
+    def __contains__(self, item):
+        return item in self.target()
+    
+    def __nonzero__(self):
+        return bool(self.target())
+    
+    def __eq__(self, other):
+        if type(other) is HBAttributeProxy: other = other.target()
+        return self.target() == other
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    def __hash__(self):
+        return hash(self.target())
+    
+    def __str__(self):
+        return str(self.target())
+    
+    def __repr__(self):
+        return "<HBAttributeProxy of %r>" % self.target()
+
+
+def estimateObjectBytes(obj, seen = None, skipAttributes = ("parent", "BCObject")):
+    """Estimate the memory of an object and everything that it references.
+    
+    Rhino geometry uses its own MemoryEstimate and the Python objects are walked
+    through their dictionaries, lists and tuples. Every object is only counted once.
+    Attributes in skipAttributes are not followed so the size of a zone doesn't
+    include its adjacent zones (BCObject) and a surface doesn't include its zone.
+    """
+    if seen is None: seen = set()
+    if id(obj) in seen: return 0
+    seen.add(id(obj))
+    
+    if isinstance(obj, rc.Runtime.CommonObject):
+        try: return int(obj.MemoryEstimate())
+        except: return 0
+    
+    try: size = sys.getsizeof(obj)
+    except (AttributeError, TypeError): size = 64
+    
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimateObjectBytes(key, seen, skipAttributes) + \
+                    estimateObjectBytes(value, seen, skipAttributes)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj: size += estimateObjectBytes(item, seen, skipAttributes)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        for key, value in obj.__dict__.items():
+            if key in skipAttributes: continue
+            size += estimateObjectBytes(value, seen, skipAttributes)
+    elif hasattr(obj, "__slots__") and not isinstance(obj, type):
+        for key in obj.__slots__:
+            size += estimateObjectBytes(getattr(obj, key, None), seen, skipAttributes)
+    
+    return size
+
+
+class HiveStore(dict):
+    """Managed dictionary of sc.sticky['HBHive'].
+    
+    The store works like the dictionary that it replaces (baseKey -> {key: HBObject})
+    and keeps track of the component that owns each baseKey, the size of its
+    objects and when they were last used. collect removes the objects of deleted
+    components and closed documents and evicts the least recently used
+    components once the estimated size is over the budget. Components that are
+    connected to other components are never evicted since their recipients
+    would fail to call the objects from the hive.
+    
+    collect runs when a Grasshopper document is closed (see removeDocument), when
+    Honeybee flies and at most once every collectInterval seconds when objects
+    are added to the hive.
+    
+    Args:
+        budgetMB: Memory budget for the objects in MB. Set to 0 for no budget.
+    """
+    
+    collectInterval = 60
+    
+    def __init__(self, items = None, budgetMB = 4096):
+        dict.__init__(self, items or {})
+        self.budgetMB = budgetMB
+        # a store of an older Honeybee_Honeybee keeps its accounting
+        self.lastCollect = getattr(items, "lastCollect", 0)
+        oldInfo = getattr(items, "info", {})
+        now = time.time()
+        # baseKey -> [component name, object count, estimated bytes, last used, top level document id]
+        self.info = {}
+        for baseKey, objects in self.items():
+            if baseKey in oldInfo:
+                self.info[baseKey] = (list(oldInfo[baseKey]) + [None])[:5]
+            else:
+                seen = set()
+                size = sum(estimateObjectBytes(HBObject, seen) for HBObject in objects.values())
+                self.info[baseKey] = ["unknown", len(objects), size, now, None]
+        # baseKey -> reason for the components that have been removed by collect
+        self.removed = dict(getattr(items, "removed", {}))
+    
+    def __getitem__(self, baseKey):
+        try: self.info[baseKey][3] = time.time()
+        except KeyError: pass
+        return dict.__getitem__(self, baseKey)
+    
+    def __delitem__(self, baseKey):
+        dict.__delitem__(self, baseKey)
+        self.info.pop(baseKey, None)
+    
+    def track(self, baseKey, Component, HBObjects):
+        """Add the size of new objects of a component to the accounting."""
+        seen = set()
+        size = sum(estimateObjectBytes(HBObject, seen) for HBObject in HBObjects)
+        info = self.info.get(baseKey)
+        if info is None:
+            info = self.info[baseKey] = [Component.Name, 0, 0, time.time(), None]
+            info[4] = self.ownerDocumentId(Component)
+        info[0] = Component.Name
+        info[1] = len(dict.__getitem__(self, baseKey))
+        info[2] += size
+        info[3] = time.time()
+        self.removed.pop(baseKey, None)
+    
+    def reset(self, baseKey):
+        """Remove the objects of a component before it adds its new objects."""
+        if baseKey in self: del self[baseKey]
+        dict.__setitem__(self, baseKey, {})
+    
+    @staticmethod
+    def documentTree(document):
+        """Return the document and the documents of its clusters (and their clusters).
+        
+        Returns:
+            documents: List of documents.
+            locked: True if the document of one of the clusters can't be opened.
+        """
+        documents = [document]
+        locked = False
+        for doc in documents:
+            for docObject in doc.Objects:
+                if not isinstance(docObject, Grasshopper.Kernel.Special.GH_Cluster): continue
+                try: clusterDoc = docObject.Document("")
+                except Exception: clusterDoc = None
+                if clusterDoc is None: locked = True
+                else: documents.append(clusterDoc)
+        return documents, locked
+    
+    @staticmethod
+    def ownerDocumentId(Component):
+        """Return the id of the open document that has the component or the cluster of the component."""
+        docId = Component.OnPingDocument().DocumentID
+        documents = list(Grasshopper.Instances.DocumentServer)
+        for doc in documents:
+            if doc.DocumentID == docId: return str(docId)
+        for doc in documents:
+            for clusterDoc in HiveStore.documentTree(doc)[0][1:]:
+                if clusterDoc.DocumentID == docId: return str(doc.DocumentID)
+        return None
+    
+    def findComponent(self, baseKey):
+        """Find the component of a baseKey in the open documents and their clusters.
+        
+        Returns:
+            alive: False only if the component is deleted or its document is closed.
+            component: The component or None if it can't be found.
+        """
+        try:
+            docId, componentId = baseKey.split('_')
+            componentId = System.Guid(componentId)
+        except Exception:
+            # not a component key. keep it.
+            return True, None
+        
+        ownerId = self.info[baseKey][4] if baseKey in self.info else None
+        owners = list(Grasshopper.Instances.DocumentServer)
+        if ownerId is not None:
+            owners = [doc for doc in owners if str(doc.DocumentID) == ownerId]
+            if not owners: return False, None
+        
+        anyLocked = False
+        for owner in owners:
+            documents, locked = self.documentTree(owner)
+            anyLocked = anyLocked or locked
+            for doc in documents:
+                if str(doc.DocumentID) == docId:
+                    component = doc.FindObject(componentId, True)
+                    return component is not None, component
+        
+        # the component isn't in any of the documents that can be opened
+        return anyLocked, None
+    
+    def isAlive(self, baseKey):
+        """Check if the component of a baseKey is still in an open document."""
+        return self.findComponent(baseKey)[0]
+    
+    @staticmethod
+    def hasRecipients(component):
+        """Check if any of the outputs of a component is connected to another component."""
+        try:
+            return any(param.Recipients.Count for param in component.Params.Output)
+        except Exception:
+            # not a component with outputs. keep its objects.
+            return True
+    
+    def totalBytes(self):
+        return sum(info[2] for info in self.info.values())
+    
+    def isOverBudget(self):
+        return bool(self.budgetMB) and self.totalBytes() > self.budgetMB * 1048576
+    
+    def collect(self, keep = None):
+        """Remove the objects of deleted components and closed documents and
+        evict the least recently used components if the store is over the budget.
+        
+        Only the components that aren't connected to other components are evicted.
+        
+        Args:
+            keep: A baseKey that shouldn't be evicted (e.g. the running component).
+        
+        Returns:
+            A list of removed baseKeys.
+        """
+        self.lastCollect = time.time()
+        removedKeys = []
+        components = {}
+        for baseKey in self.keys():
+            if baseKey == keep: continue
+            alive, component = self.findComponent(baseKey)
+            if not alive:
+                del self[baseKey]
+                self.removed[baseKey] = "the component is deleted or its document is closed"
+                removedKeys.append(baseKey)
+            else:
+                components[baseKey] = component
+        
+        if self.budgetMB:
+            budget = self.budgetMB * 1048576
+            total = self.totalBytes()
+            for lastUsed, baseKey in sorted((info[3], baseKey) for baseKey, info in self.info.items()):
+                if total <= budget: break
+                component = components.get(baseKey)
+                if component is None or self.hasRecipients(component): continue
+                total -= self.info[baseKey][2]
+                del self[baseKey]
+                self.removed[baseKey] = "it was evicted to keep the hive under %d MB" % self.budgetMB
+                removedKeys.append(baseKey)
+        
+        return removedKeys
+    
+    def collectIfDue(self, keep = None):
+        """Run collect if it hasn't run in the last collectInterval seconds."""
+        if time.time() - self.lastCollect < self.collectInterval: return []
+        return self.collect(keep)
+    
+    def removeDocument(self, document):
+        """Remove the objects of the components of a document that is closed.
+        
+        Honeybee calls this method from DocumentServer.DocumentRemoved.
+        """
+        docId = str(document.DocumentID)
+        for baseKey in self.keys():
+            if baseKey.split('_')[0] == docId or self.info.get(baseKey, [None] * 5)[4] == docId:
+                del self[baseKey]
+                self.removed[baseKey] = "its document is closed"
+        return self.collect()
+    
+    def report(self):
+        """Return a line for each component with its object count and estimated size, most recently used first."""
+        now = time.time()
+        lines = ["HBHive: %d components, ~%.1f MB of %s" % (len(self), self.totalBytes() / 1048576.0,
+                 "%d MB budget" % self.budgetMB if self.budgetMB else "no budget")]
+        if self.isOverBudget():
+            lines.append("Warning: HBHive is over its budget. The components that are connected to other " + \
+                         "components can't be evicted. Increase hiveBudgetMB_ or remove unused components.")
+        for baseKey, info in sorted(self.info.items(), key = lambda item: -item[1][3]):
+            lines.append("%s (%s): %d objects, ~%.1f MB, used %d s ago" % \
+                         (info[0], baseKey.split('_')[-1], info[1], info[2] / 1048576.0, now - info[3]))
+        return lines
+
+
 class hb_Hive(object):
     
+    # set to True to keep and print the private copies and shared objects of
+    # each component that reads the hive through proxies (see proxyReport)
+    reportProxies = False
+    proxyStats = {}
+    
     class CopyClass(object):
         pass
     def checkifTransformed(self, brep, HBO):
@@ -8281,6 +10995,72 @@ class hb_Hive(object):
         elif bb1.Max.DistanceTo(bb2.Max) > 5 * sc.doc.ModelAbsoluteTolerance:
             raise Exception(msg)
     
+    @staticmethod
+    def getHiveStore():
+        """Return sc.sticky['HBHive'] as a HiveStore.
+        
+        A hive from an older session (a dictionary or a HiveStore of an older
+        Honeybee_Honeybee) is converted and keeps its objects, budget and accounting.
+        """
+        hive = sc.sticky.get('HBHive')
+        if type(hive) is not HiveStore:
+            budgetMB = getattr(hive, 'budgetMB', 4096)
+            hive = HiveStore(hive, budgetMB)
+            sc.sticky['HBHive'] = hive
+        return hive
+    
+    @staticmethod
+    def keyMismatchMessage(baseKey):
+        msg = 'HoneybeeKeyMismatch: Failed to call the object from Honeybee hive.'
+        removed = getattr(sc.sticky.get('HBHive'), 'removed', {})
+        if baseKey in removed:
+            msg += '\nThe objects were removed from the hive because %s. ' % removed[baseKey] + \
+                   'Recompute the component that has generated them.'
+        return msg
+    
+    @staticmethod
+    def outputGeometry(HBObject):
+        """Return the geometry that carries the ID of a Honeybee object out of a component.
+        
+        Surfaces and zones with child surfaces are joined to their punched geometry.
+        The joined brep is cached on the object (outputGeometryCache) with the breps
+        that it is made of so it is only joined again once one of them is replaced.
+        Methods that change these breps in place should set the cache to None.
+        """
+        if HBObject.objectType == "HBZone":
+            sources = []
+            zoneHasChildSrf = False
+            for HBSrf in HBObject.surfaces:
+                if HBSrf.hasChild:
+                    zoneHasChildSrf = True
+                    sources.append(HBSrf.punchedGeometry)
+                    for childObject in HBSrf.childSrfs:
+                        sources.append(childObject.geometry)
+                else:
+                    sources.append(HBSrf.geometry)
+            if not zoneHasChildSrf: return HBObject.geometry
+            
+        elif HBObject.hasChild:
+            # Honeybee surface with openings
+            if HBObject.punchedGeometry == None:
+                HBObject.calculatePunchedSurface()
+            sources = [childObject.geometry for childObject in HBObject.childSrfs]
+            sources.append(HBObject.punchedGeometry)
+            
+        else:
+            # if there is not child object use the geometry as it is
+            return HBObject.geometry
+        
+        cache = getattr(HBObject, "outputGeometryCache", None)
+        if cache is not None and len(cache[0]) == len(sources) and \
+           all(cached is source for cached, source in itertools.izip(cache[0], sources)):
+            return cache[1]
+        
+        # join geometries into a single surface
+        geometry = rc.Geometry.Brep.JoinBreps(sources, sc.doc.ModelAbsoluteTolerance)[0]
+        HBObject.outputGeometryCache = (sources, geometry)
+        return geometry
+    
     @staticmethod
     def addToHoneybeeHive(HBObjects, Component, removeCurrent=True):
         """Add honeybee objects to memory so they can be passed between the components.
@@ -8288,8 +11068,7 @@ class hb_Hive(object):
         removeCurrent: Set false if the same component generates honeybee objects
             multiple times in the same component, except for the first time.
         """
-        if not sc.sticky.has_key('HBHive'):
-            sc.sticky['HBHive'] = {}
+        hive = hb_Hive.getHiveStore()
         
         try:
             # get document ID
@@ -8305,69 +11084,111 @@ class hb_Hive(object):
         
         # clean the dictionary if it's the first run
         if removeCurrent and Component.RunCount == 1:
-            if baseKey in sc.sticky['HBHive']:
-                del(sc.sticky['HBHive'][baseKey])
-            sc.sticky['HBHive'][baseKey] = {}
+            hive.reset(baseKey)
     
         # create an empty dictionary for this component
         outGeometry = []
+        addedObjects = []
         for HBObject in HBObjects:
             
+            # a proxy shares the object of another component so add a copy of it
+            if type(HBObject) is HBObjectProxy: HBObject = HBObject.materialize()
+            
             HBObject.resetID()
             
             key = '{}'.format(HBObject.ID)
-            sc.sticky['HBHive'][baseKey][key] = HBObject
+            hive[baseKey][key] = HBObject
+            addedObjects.append(HBObject)
             
-            # calculate punched geometry if HBobject has a child surface
             try:
-                if HBObject.objectType != "HBZone" and HBObject.hasChild:
-                    # Honeybee surface with openings
-                    if HBObject.punchedGeometry == None:
-                        HBObject.calculatePunchedSurface()
-                    
-                    geometries = [childObject.geometry for childObject in HBObject.childSrfs]
-                    geometries.append(HBObject.punchedGeometry)
-                    # join geometries into a single surface
-                    geometry = rc.Geometry.Brep.JoinBreps(geometries, sc.doc.ModelAbsoluteTolerance)[0]
-                
-                elif HBObject.objectType == "HBZone":
-                    srfs = []
-                    zoneHasChildSrf = False
-                    for HBSrf in HBObject.surfaces:
-                        if HBSrf.hasChild:
-                            zoneHasChildSrf = True
-                            srfs.append(HBSrf.punchedGeometry)
-                            for childObject in HBSrf.childSrfs:
-                                srfs.append(childObject.geometry)
-                        else:
-                            srfs.append(HBSrf.geometry)
-                            
-                    if zoneHasChildSrf:
-                        geometry = rc.Geometry.Brep.JoinBreps(srfs, sc.doc.ModelAbsoluteTolerance)[0]
-                    else:
-                        geometry = HBObject.geometry
-                else:
-                    # if there is not child object use the geometry as it is
-                    geometry = HBObject.geometry
-                
+                geometry = hb_Hive.outputGeometry(HBObject)
+                # the joined geometry is cached on the object so the key goes to a copy of it
+                if geometry is not HBObject.geometry: geometry = geometry.Duplicate()
                 # assign the key to surface
                 geometry.UserDictionary.Set('HBID', '{}#{}'.format(baseKey, key))
                 outGeometry.append(geometry)
             except Exception as e:
                 print `e`
-                    
+        
+        # keep track of the size of the hive and remove the objects that are not needed anymore
+        hive.track(baseKey, Component, addedObjects)
+        hive.collectIfDue(keep = baseKey)
+        
         # return geometry with the ID
         return outGeometry
     
     def addNonGeoObjToHive(self, HBObject, Component):
         docId = Component.OnPingDocument().DocumentID
         baseKey = '{}_{}'.format(docId, Component.InstanceGuid)
-        sc.sticky['HBHive'][baseKey] = {}
+        hive = hb_Hive.getHiveStore()
+        hive.reset(baseKey)
         key = '{}'.format(HBObject.ID)
-        sc.sticky['HBHive'][baseKey][key] = HBObject
+        hive[baseKey][key] = HBObject
+        hive.track(baseKey, Component, [HBObject])
         HBID = '{}#{}'.format(baseKey, key)
         return 'Honeybee View Factor Info - ' + HBID
     
+    def copyHBObject(self, HBObject):
+        """Return a deep copy of a Honeybee object that is safe to change."""
+        # after the first round meshedFace makes copy.deepcopy crash
+        # so I need to regenerate meshFaces
+        bc = []
+        if HBObject.objectType == "HBZone":
+            for surface in HBObject.surfaces:
+                newMesh = rc.Geometry.Mesh()
+                newMesh.Append(surface.meshedFace)
+                surface.meshedFace = newMesh
+                
+                # keep track of boundary conditions
+                # and then set them to None not to create
+                # memory issues for large models.
+                bc.append(copy.copy(surface.BCObject))
+                surface.BCObject = None
+                for csrf in surface.childSrfs:
+                    bc.append(copy.copy(csrf.BCObject))
+                    csrf.BCObject = None
+                    
+        elif HBObject.objectType == "HBSurface": 
+            newMesh = rc.Geometry.Mesh()
+            newMesh.Append(HBObject.meshedFace)
+            HBObject.meshedFace = newMesh
+            # keep track of boundary conditions
+            # and then set them to None not to create
+            # memory issues for large models.
+            bc.append(copy.copy(HBObject.BCObject))
+            HBObject.BCObject = None
+            for csrf in HBObject.childSrfs:
+                bc.append(copy.copy(csrf.BCObject))
+                csrf.BCObject = None                    
+        
+        newObject = copy.deepcopy(HBObject)
+        
+        # the copy is the only user of its vertex store so the slots of old coordinates can be removed
+        if newObject.objectType == "HBZone": newObject.compactVertexStore()
+        
+        # put the boundary condition objects back
+        count = 0
+        if HBObject.objectType == "HBZone":
+            for c, surface in enumerate(newObject.surfaces):
+                surface.BCObject = bc[count]
+                HBObject.surfaces[c].BCObject = bc[count]
+                count += 1
+                for cc, csrf in enumerate(surface.childSrfs):
+                    csrf.BCObject = bc[count]
+                    HBObject.surfaces[c].childSrfs[cc].BCObject = bc[count]
+                    count += 1
+                    
+        elif HBObject.objectType == "HBSurface": 
+            newObject.BCObject = bc[count]
+            HBObject.BCObject = bc[count]
+            count += 1
+            for cc, csrf in enumerate(newObject.childSrfs):
+                csrf.BCObject = bc[count]
+                HBObject.childSrfs[cc].BCObject = bc[count]
+                count += 1
+        
+        return newObject
+    
     def callFromHoneybeeHive(self, geometryList):
         HBObjects = []
         for geometry in geometryList:
@@ -8391,72 +11212,85 @@ class hb_Hive(object):
                     pass
                 
                 try:
-                    # after the first round meshedFace makes copy.deepcopy crash
-                    # so I need to regenerate meshFaces
-                    bc = []
-                    if HBObject.objectType == "HBZone":
-                        for surface in HBObject.surfaces:
-                            newMesh = rc.Geometry.Mesh()
-                            newMesh.Append(surface.meshedFace)
-                            surface.meshedFace = newMesh
-                            
-                            # keep track of boundary conditions
-                            # and then set them to None not to create
-                            # memory issues for large models.
-                            bc.append(copy.copy(surface.BCObject))
-                            surface.BCObject = None
-                            for csrf in surface.childSrfs:
-                                bc.append(copy.copy(csrf.BCObject))
-                                csrf.BCObject = None
-                                
-                    elif HBObject.objectType == "HBSurface": 
-                        newMesh = rc.Geometry.Mesh()
-                        newMesh.Append(HBObject.meshedFace)
-                        HBObject.meshedFace = newMesh
-                        # keep track of boundary conditions
-                        # and then set them to None not to create
-                        # memory issues for large models.
-                        bc.append(copy.copy(HBObject.BCObject))
-                        HBObject.BCObject = None
-                        for csrf in HBObject.childSrfs:
-                            bc.append(copy.copy(csrf.BCObject))
-                            csrf.BCObject = None                    
-                    
-                    newObject = copy.deepcopy(HBObject)
-                    
-                    # put the boundary condition objects back
-                    count = 0
-                    if HBObject.objectType == "HBZone":
-                        for c, surface in enumerate(newObject.surfaces):
-                            surface.BCObject = bc[count]
-                            HBObject.surfaces[c].BCObject = bc[count]
-                            count += 1
-                            for cc, csrf in enumerate(surface.childSrfs):
-                                csrf.BCObject = bc[count]
-                                HBObject.surfaces[c].childSrfs[cc].BCObject = bc[count]
-                                count += 1
-                                
-                    elif HBObject.objectType == "HBSurface": 
-                        newObject.BCObject = bc[count]
-                        HBObject.BCObject = bc[count]
-                        count += 1
-                        for cc, csrf in enumerate(newObject.childSrfs):
-                            csrf.BCObject = bc[count]
-                            HBObject.childSrfs[cc].BCObject = bc[count]
-                            count += 1
-                    
+                    newObject = self.copyHBObject(HBObject)
                     HBObjects.append(newObject)
-                    del(bc)
                 except Exception, e:
                     print `e`
                     print "Failed to copy the object. Returning the original objects...\n" +\
                     "This can cause strange behaviour!"
                     HBObjects.append(sc.sticky['HBHive'][baseKey][key])
             else:
-                raise Exception('HoneybeeKeyMismatch: Failed to call the object from Honeybee hive.')
+                raise Exception(hb_Hive.keyMismatchMessage(baseKey))
+                
+        return HBObjects
+    
+    def proxyFromHoneybeeHive(self, geometryList, Component = None):
+        """Return copy-on-write proxies of the Honeybee objects for components that only read them.
+        
+        The objects are only copied when a proxy is changed (see HBObjectProxy)
+        so reading a model doesn't duplicate it in memory. Pass the component to
+        keep track of the objects that it shares and copies when reportProxies
+        is True (see proxyReport).
+        """
+        stats = None
+        if Component is not None and hb_Hive.reportProxies:
+            componentKey = '{}_{}'.format(Component.OnPingDocument().DocumentID, Component.InstanceGuid)
+            # the stats add up until the component reports them (see proxyReport)
+            stats = hb_Hive.proxyStats.setdefault(componentKey, {"name": Component.Name, "keys": set(), "copies": 0})
+        
+        HBObjects = []
+        for geometry in geometryList:
+            try:
+                hbkey = geometry.UserDictionary['HBID']
+            except:
+                hbkey = geometry.split(' ')[-1]
+            
+            if '#' not in hbkey:
+                raise Exception('Honeybee version mismatch! Update the input component.')
+                
+            baseKey, key = hbkey.split('#')[0], '#'.join(hbkey.split('#')[1:])
+            
+            if sc.sticky['HBHive'].has_key(baseKey):
+                HBObject = sc.sticky['HBHive'][baseKey][key]
                 
+                # make sure Honeybee object is not moved or rotated
+                try:
+                    self.checkifTransformed(geometry, HBObject)
+                except:
+                    pass
+                
+                HBObjects.append(HBObjectProxy(HBObject, self.copyHBObject, stats))
+                if stats is not None: stats["keys"].add((baseKey, key))
+            else:
+                raise Exception(hb_Hive.keyMismatchMessage(baseKey))
+        
         return HBObjects
     
+    @staticmethod
+    def proxyReport(Component = None, clear = False):
+        """Return a line for each component with the number of shared objects, their estimated size and the private copies.
+        
+        Pass a component to only report that component. Set clear to True to
+        start the stats of the reported components over (e.g. at the end of a run).
+        """
+        lines = []
+        for componentKey, stats in hb_Hive.proxyStats.items():
+            if Component is not None and \
+               componentKey != '{}_{}'.format(Component.OnPingDocument().DocumentID, Component.InstanceGuid):
+                continue
+            seen = set()
+            sharedBytes = 0
+            sharedCount = 0
+            for baseKey, key in stats["keys"]:
+                try: HBObject = sc.sticky['HBHive'].get(baseKey, {})[key]
+                except KeyError: continue
+                sharedCount += 1
+                sharedBytes += estimateObjectBytes(HBObject, seen)
+            lines.append("%s: %d objects shared (~%.1f MB not copied), %d private copies" % \
+                         (stats["name"], sharedCount, sharedBytes / 1048576.0, stats["copies"]))
+            if clear: del hb_Hive.proxyStats[componentKey]
+        return lines
+    
     def visualizeFromHoneybeeHive(self, geometryList):
         HBObjects = []
         for geometry in geometryList:
@@ -8473,7 +11307,7 @@ class hb_Hive(object):
             if sc.sticky['HBHive'].has_key(baseKey):
                 HBObjects.append(sc.sticky['HBHive'][baseKey][key])
             else:
-                raise Exception('HoneybeeKeyMismatch: Failed to call the object from Honeybee hive.')
+                raise Exception(hb_Hive.keyMismatchMessage(baseKey))
         
         return HBObjects
 
@@ -8617,6 +11451,385 @@ class SerializeObjects(object):
             self.data = pickle.load(inf)
 
 
+class HBObjectsWriter(object):
+    """Streaming writer of the versioned binary container for dumped Honeybee objects (.HBX).
+    
+    The container holds the same {'ids', 'objs'} data as the pickled .HB files
+    of Dump Honeybee Objects (objects with their links replaced by IDs) but every
+    object is a separate record so the file can be written and read one object
+    at a time and single zones can be loaded without reading the whole file.
+    
+    Layout (little-endian, version 2):
+        header: "HBOF" | uint16 version | uint16 flags (1: zlib compressed records)
+        records: uint32 length | payload. Written in the order they are added.
+        index: a record with the pickled index (see below).
+        footer: uint64 offset of the index | "HBOF"
+    
+    Object records are rows of an attribute table. The attribute names of each
+    objectType are kept once in the index (schemas) and the payload is the
+    pickled tuple of the values in the order of the names. Attributes that an
+    object doesn't have are written as the persistent id "m".
+    
+    Vertex stores (SurfaceVertexStore) and meshes are written once as geometry
+    records of packed arrays and are referenced from the rows by the persistent
+    id "g:<number>". Meshes keep double precision vertices, normals, vertex
+    colors and texture coordinates (version 1 files have single precision
+    vertices only). Other Rhino geometry (e.g. breps) is pickled in the row.
+    
+    Library objects (constructions, materials, schedules, shading controls and
+    Radiance materials) are flagged in the index so they are always read with
+    the selected objects.
+    
+    The index is a dictionary with version, ids (the dumped objects), schemas
+    ({objectType: [names]}), records ([(id, objectType, name, offset, refs, isLibrary)]
+    where refs are the IDs of the linked objects) and geometry (offsets).
+    """
+    
+    magic = "HBOF"
+    version = 2
+    libraryTypes = ("HBConstr", "HBMat", "HBsched", "HBShdCntrl", "HBRadMat")
+    # attributes that hold the IDs of other objects after dumping
+    linkFields = ("surfaces", "childSrfs", "parent", "HVACSystem", "airDetails", "heatingDetails", "coolingDetails")
+    
+    # marker for the attributes that an object doesn't have
+    missing = object()
+    
+    def __init__(self, filePath, compress = True):
+        self.filePath = filePath
+        self.compress = compress
+        self.tempFile = "%s_%s.tmp" % (filePath, uuid.uuid4().hex[:8])
+        self.file = open(self.tempFile, "wb")
+        self.file.write(self.magic + struct.pack("<HH", self.version, 1 if compress else 0))
+        
+        self.schemas = {}
+        self.schemaIndex = {}
+        self.records = []
+        self.geometry = []
+        self.geometryIds = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, excType, excValue, traceback):
+        if excType is not None: self.abort()
+    
+    def writeRecord(self, payload):
+        offset = self.file.tell()
+        if self.compress: payload = zlib.compress(payload, 1)
+        self.file.write(struct.pack("<I", len(payload)))
+        self.file.write(payload)
+        return offset
+    
+    def writeGeometry(self, geometry):
+        if isinstance(geometry, SurfaceVertexStore):
+            offsets = array.array("I", geometry.offsets)
+            parts = [struct.pack("<BII", 1, len(geometry.xyz), len(offsets)), geometry.xyz, offsets]
+        else:
+            vertices = array.array("d")
+            try:
+                for i in xrange(geometry.Vertices.Count):
+                    v = geometry.Vertices.Point3dAt(i)
+                    vertices.extend((v.X, v.Y, v.Z))
+            except AttributeError:
+                # Rhino 5 meshes only have single precision vertices
+                for v in geometry.Vertices: vertices.extend((v.X, v.Y, v.Z))
+            faces = array.array("i")
+            for f in geometry.Faces: faces.extend((f.A, f.B, f.C, f.D))
+            normals = array.array("f")
+            for n in geometry.Normals: normals.extend((n.X, n.Y, n.Z))
+            colors = array.array("i", (c.ToArgb() for c in geometry.VertexColors))
+            textureCoordinates = array.array("f")
+            for t in geometry.TextureCoordinates: textureCoordinates.extend((t.X, t.Y))
+            parts = [struct.pack("<BIIIII", 3, len(vertices), len(faces), len(normals), len(colors),
+                                 len(textureCoordinates)), vertices, faces, normals, colors, textureCoordinates]
+        
+        payload = [parts[0]]
+        for values in parts[1:]:
+            if sys.byteorder != "little":
+                values = array.array(values.typecode, values)
+                values.byteswap()
+            payload.append(values.tostring())
+        
+        self.geometry.append(self.writeRecord("".join(payload)))
+        return len(self.geometry) - 1
+    
+    def persistentId(self, obj):
+        if obj is self.missing: return "m"
+        if isinstance(obj, SurfaceVertexStore) or isinstance(obj, rc.Geometry.Mesh):
+            # geometry that is shared between objects is only written once
+            key = id(obj)
+            if key not in self.geometryIds:
+                self.geometryIds[key] = (self.writeGeometry(obj), obj)
+            return "g:%d" % self.geometryIds[key][0]
+        return None
+    
+    def add(self, ID, obj):
+        """Write an object.
+        
+        Args:
+            ID: ID of the object (the key of the object in objs).
+            obj: Dictionary of the attributes of the object as it is dumped.
+        """
+        objectType = obj.get("objectType")
+        isLibrary = objectType in self.libraryTypes
+        name = obj.get("name", "")
+        
+        # add the new attributes to the table of this objectType
+        schema = self.schemas.setdefault(objectType, [])
+        schemaIndex = self.schemaIndex.setdefault(objectType, {})
+        for key in obj:
+            if key not in schemaIndex:
+                schemaIndex[key] = len(schema)
+                schema.append(key)
+        row = tuple(obj.get(key, self.missing) for key in schema)
+        
+        refs = []
+        for field in self.linkFields:
+            value = obj.get(field)
+            if isinstance(value, basestring): refs.append(value)
+            elif isinstance(value, list): refs.extend(v for v in value if isinstance(v, basestring))
+        
+        data = cStringIO.StringIO()
+        pickler = pickle.Pickler(data, 2)
+        try:
+            # only called for the objects that are not built-in types
+            pickler.inst_persistent_id = self.persistentId
+        except AttributeError:
+            pickler.persistent_id = self.persistentId
+        pickler.dump(row)
+        offset = self.writeRecord(data.getvalue())
+        self.records.append((ID, objectType, name, offset, tuple(refs), isLibrary))
+    
+    def close(self, ids):
+        """Write the index and move the file to its place.
+        
+        Args:
+            ids: IDs of the dumped objects in the order that they should be loaded.
+        """
+        index = {"version": self.version, "ids": list(ids), "schemas": self.schemas,
+                 "records": self.records, "geometry": self.geometry}
+        indexOffset = self.writeRecord(pickle.dumps(index, 2))
+        self.file.write(struct.pack("<Q", indexOffset) + self.magic)
+        self.file.close()
+        self.geometryIds = {}
+        
+        if os.path.isfile(self.filePath): os.remove(self.filePath)
+        os.rename(self.tempFile, self.filePath)
+        return self.filePath
+    
+    def abort(self):
+        self.file.close()
+        try: os.remove(self.tempFile)
+        except OSError: pass
+    
+    @classmethod
+    def write(cls, filePath, HBData, compress = True):
+        """Write the {'ids', 'objs'} data of Dump Honeybee Objects to a container."""
+        with cls(filePath, compress) as writer:
+            for ID, obj in HBData["objs"].iteritems():
+                writer.add(ID, obj)
+            return writer.close(HBData["ids"])
+    
+    @classmethod
+    def benchmark(cls, HBData, folder):
+        """Write and read the data as a pickled .HB file and as a container and compare them.
+        
+        Returns:
+            A dictionary with the size (bytes) and the write and read times (seconds)
+            of each format under "pickle" and "container".
+        """
+        results = {}
+        pickleFile = os.path.join(folder, "benchmark_%s.HB" % uuid.uuid4().hex[:8])
+        containerFile = pickleFile[:-3] + ".HBX"
+        try:
+            startTime = time.time()
+            with open(pickleFile, "wb") as outf:
+                pickle.dump(HBData, outf)
+            writeTime = time.time() - startTime
+            startTime = time.time()
+            with open(pickleFile, "rb") as inf:
+                pickle.load(inf)
+            results["pickle"] = {"size": os.path.getsize(pickleFile), "write": writeTime,
+                                 "read": time.time() - startTime}
+            
+            startTime = time.time()
+            cls.write(containerFile, HBData)
+            writeTime = time.time() - startTime
+            startTime = time.time()
+            with HBObjectsReader(containerFile) as reader:
+                reader.read()
+            results["container"] = {"size": os.path.getsize(containerFile), "write": writeTime,
+                                    "read": time.time() - startTime}
+        finally:
+            for filePath in (pickleFile, containerFile):
+                if os.path.isfile(filePath): os.remove(filePath)
+        
+        return results
+
+
+class HBObjectsReader(object):
+    """Reader of the containers that are written by HBObjectsWriter (.HBX).
+    
+    Only the index is read when the reader is opened. The objects are read one
+    record at a time so a zone (with its surfaces, windows and HVAC system) can
+    be loaded without reading the rest of the file.
+    
+    Args:
+        filePath: Path to the container.
+    """
+    
+    def __init__(self, filePath):
+        self.file = open(filePath, "rb")
+        header = self.file.read(8)
+        if header[:4] != HBObjectsWriter.magic:
+            self.file.close()
+            raise ValueError("%s is not a Honeybee objects container." % filePath)
+        version, flags = struct.unpack("<HH", header[4:])
+        if version > HBObjectsWriter.version:
+            self.file.close()
+            raise ValueError("%s is written by a newer version of Honeybee (format version %d)." % (filePath, version))
+        self.compressed = bool(flags & 1)
+        
+        self.file.seek(-12, 2)
+        indexOffset = struct.unpack("<Q", self.file.read(8))[0]
+        index = pickle.loads(self.readRecord(indexOffset))
+        self.ids = index["ids"]
+        self.schemas = index["schemas"]
+        self.records = index["records"]
+        self.geometryOffsets = index["geometry"]
+        self.recordIndex = dict((record[0], count) for count, record in enumerate(self.records))
+        self.geometry = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+    
+    def close(self):
+        self.file.close()
+    
+    @staticmethod
+    def isContainer(filePath):
+        with open(filePath, "rb") as inf:
+            return inf.read(4) == HBObjectsWriter.magic
+    
+    def readRecord(self, offset):
+        self.file.seek(offset)
+        length = struct.unpack("<I", self.file.read(4))[0]
+        payload = self.file.read(length)
+        if self.compressed: payload = zlib.decompress(payload)
+        return payload
+    
+    # geometry record kind > typecodes of its arrays
+    geometryTypecodes = {
+        1: ("d", "I"),  # vertex store: coordinates, offsets
+        2: ("f", "i"),  # version 1 mesh: vertices, faces
+        3: ("d", "i", "f", "i", "f")  # mesh: vertices, faces, normals, colors, texture coordinates
+        }
+    
+    def readGeometry(self, number):
+        payload = self.readRecord(self.geometryOffsets[number])
+        kind = struct.unpack("<B", payload[:1])[0]
+        typecodes = self.geometryTypecodes[kind]
+        headerFormat = "<B" + "I" * len(typecodes)
+        start = struct.calcsize(headerFormat)
+        counts = struct.unpack(headerFormat, payload[:start])[1:]
+        arrays = []
+        for typecode, count in itertools.izip(typecodes, counts):
+            values = array.array(typecode)
+            end = start + count * values.itemsize
+            values.fromstring(payload[start:end])
+            if sys.byteorder != "little": values.byteswap()
+            arrays.append(values)
+            start = end
+        
+        if kind == 1:
+            geometry = SurfaceVertexStore()
+            geometry.xyz = arrays[0]
+            geometry.offsets = array.array("l", arrays[1])
+            return geometry
+        
+        vertices, faces = arrays[:2]
+        geometry = rc.Geometry.Mesh()
+        if kind == 3:
+            try: geometry.Vertices.UseDoublePrecisionVertices = True
+            except AttributeError: pass
+        for i in xrange(0, len(vertices), 3):
+            geometry.Vertices.Add(vertices[i], vertices[i + 1], vertices[i + 2])
+        for i in xrange(0, len(faces), 4):
+            if faces[i + 2] == faces[i + 3]:
+                geometry.Faces.AddFace(faces[i], faces[i + 1], faces[i + 2])
+            else:
+                geometry.Faces.AddFace(faces[i], faces[i + 1], faces[i + 2], faces[i + 3])
+        
+        if kind == 2 or not arrays[2]:
+            geometry.Normals.ComputeNormals()
+            return geometry
+        
+        normals, colors, textureCoordinates = arrays[2:]
+        for i in xrange(0, len(normals), 3):
+            geometry.Normals.Add(normals[i], normals[i + 1], normals[i + 2])
+        for argb in colors:
+            geometry.VertexColors.Add(System.Drawing.Color.FromArgb(argb))
+        for i in xrange(0, len(textureCoordinates), 2):
+            geometry.TextureCoordinates.Add(textureCoordinates[i], textureCoordinates[i + 1])
+        return geometry
+    
+    def persistentLoad(self, pid):
+        if pid == "m": return HBObjectsWriter.missing
+        number = int(pid[2:])
+        if number not in self.geometry:
+            self.geometry[number] = self.readGeometry(number)
+        return self.geometry[number]
+    
+    def readObject(self, recordNumber):
+        ID, objectType, name, offset, refs, isLibrary = self.records[recordNumber]
+        unpickler = pickle.Unpickler(cStringIO.StringIO(self.readRecord(offset)))
+        unpickler.persistent_load = self.persistentLoad
+        row = unpickler.load()
+        return dict((key, value) for key, value in itertools.izip(self.schemas[objectType], row)
+                    if value is not HBObjectsWriter.missing)
+    
+    def names(self):
+        """Return a dictionary of {name: ID} for the zones in the file."""
+        return dict((record[2], record[0]) for record in self.records if record[1] == "HBZone")
+    
+    def iterObjects(self, ids = None):
+        """Read the objects one by one.
+        
+        Args:
+            ids: IDs of the objects to be read. The objects that they are linked
+                to (surfaces, windows, HVAC) and the library objects are read with
+                them but adjacent surfaces of other zones are not so their BCObject
+                is the ID of a surface that isn't read (Load Honeybee Objects sets
+                these surfaces to adiabatic). Default is all the objects.
+        
+        Yields:
+            (ID, attributes) for each object in the order that they are stored.
+        """
+        if ids is None:
+            recordNumbers = range(len(self.records))
+        else:
+            selected = set()
+            toBeChecked = list(ids)
+            while toBeChecked:
+                ID = toBeChecked.pop()
+                if ID in selected or ID not in self.recordIndex: continue
+                selected.add(ID)
+                toBeChecked.extend(self.records[self.recordIndex[ID]][4])
+            recordNumbers = sorted(count for count, record in enumerate(self.records)
+                                   if record[5] or record[0] in selected)
+        
+        for recordNumber in recordNumbers:
+            yield self.records[recordNumber][0], self.readObject(recordNumber)
+    
+    def read(self, ids = None):
+        """Return the {'ids', 'objs'} data of Dump Honeybee Objects for all or some of the objects."""
+        return {"ids": list(ids) if ids is not None else self.ids,
+                "objs": dict(self.iterObjects(ids))}
+
+
 
 class hb_hvacProperties(object):
     def __init__(self):
@@ -9420,6 +12633,10 @@ class hb_NonConvexChecking(object):
 
 checkIn = CheckIn(defaultFolder_)
 
+# the input is optional and older versions of this component don't have it
+try: hiveBudgetMB_
+except NameError: hiveBudgetMB_ = None
+
 letItFly = True
 
 def checkGHPythonVersion(target = "0.6.0.3"):
@@ -9763,6 +12980,9 @@ if checkIn.letItFly:
         
         
         sc.sticky["honeybee_Hive"] = hb_Hive
+        sc.sticky["honeybee_HBObjectProxy"] = HBObjectProxy
+        sc.sticky["honeybee_HBAttributeProxy"] = HBAttributeProxy
+        sc.sticky["honeybee_HiveStore"] = HiveStore
         sc.sticky["honeybee_generationHive"] = generationhb_hive
         sc.sticky["honeybee_GetEPLibs"] = HB_GetEPLibraries
         sc.sticky["honeybee_DefaultMaterialLib"] = materialLibrary
@@ -9801,13 +13021,29 @@ if checkIn.letItFly:
         sc.sticky["honeybee_DLAnalysisRecipe"] = DLAnalysisRecipe
         sc.sticky["honeybee_MeshToRAD"] = hb_MSHToRAD
         sc.sticky["honeybee_WriteRAD"] = hb_WriteRAD
+        sc.sticky["honeybee_JobScheduler"] = JobScheduler
+        sc.sticky["honeybee_EPBatchRunner"] = EPBatchRunner
+        sc.sticky["honeybee_HourBlockPool"] = HourBlockPool
+        sc.sticky["honeybee_HourBlockError"] = HourBlockError
+        sc.sticky["honeybee_ZoneRayTracer"] = ZoneRayTracer
+        sc.sticky["honeybee_ViewFactorCache"] = ViewFactorCache
+        sc.sticky["honeybee_SkyPatchMatrix"] = SkyPatchMatrix
+        sc.sticky["honeybee_RadianceSceneCache"] = RadianceSceneCache
         sc.sticky["honeybee_WriteRADAUX"] = hb_WriteRADAUX
         sc.sticky["honeybee_WriteDS"] = hb_WriteDS
         sc.sticky["honeybee_RADParameters"] = hb_RADParameters
         sc.sticky["honeybee_DSParameters"] = hb_DSParameters
         sc.sticky["honeybee_ReadAnnualResultsAux"] = hb_ReadAnnualResultsAux
+        sc.sticky["honeybee_DaysimIllIndex"] = DaysimIllIndex
+        sc.sticky["honeybee_AnnualDaylightMetrics"] = AnnualDaylightMetrics
         sc.sticky["honeybee_EPParameters"] = hb_EnergySimulatioParameters
+        sc.sticky["honeybee_EPResultReader"] = EPResultReader
+        sc.sticky["honeybee_EPSqlResultReader"] = EPSqlResultReader
+        sc.sticky["honeybee_IDFBlockCache"] = IDFBlockCache
+        sc.sticky["honeybee_EPResultCache"] = EPResultCache
         sc.sticky["honeybee_SerializeObjects"] = SerializeObjects
+        sc.sticky["honeybee_HBObjectsWriter"] = HBObjectsWriter
+        sc.sticky["honeybee_HBObjectsReader"] = HBObjectsReader
         sc.sticky["honeybee_GridBasedDLResults"] = CalculateGridBasedDLAnalysisResults
         sc.sticky["honeybee_DLAnalaysisTypes"] = {0: ["0: illuminance" , "lux"],
                                                   1: ["1: radiation" , "wh/m2"],
@@ -9819,6 +13055,26 @@ if checkIn.letItFly:
         sc.sticky["honeybee_NonConvexChecking"] = hb_NonConvexChecking
         sc.sticky["honeybee_ConversionFactor"] = checkUnits()
         
+        # set the memory budget of the hive and clean up the objects that are left from deleted components
+        hive = hb_Hive.getHiveStore()
+        if hiveBudgetMB_ is not None: hive.budgetMB = max(0, int(hiveBudgetMB_))
+        hive.collect()
+        print "\n".join(hive.report()) + "\n"
+        if hive.isOverBudget():
+            ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, \
+                "HBHive is over its %d MB budget and its objects can't be evicted. See the output for details." % hive.budgetMB)
+        
+        # remove the objects of the documents that are closed
+        def removeDocumentFromHive(sender, document):
+            try: hb_Hive.getHiveStore().removeDocument(document)
+            except Exception as e: print `e`
+        
+        if "honeybee_HiveDocumentHandler" in sc.sticky:
+            try: Grasshopper.Instances.DocumentServer.DocumentRemoved -= sc.sticky["honeybee_HiveDocumentHandler"]
+            except Exception: pass
+        Grasshopper.Instances.DocumentServer.DocumentRemoved += removeDocumentFromHive
+        sc.sticky["honeybee_HiveDocumentHandler"] = removeDocumentFromHive
+        
         # done! sharing the happiness.
         print "Hooohooho...Flying!!\nVviiiiiiizzz..."
         
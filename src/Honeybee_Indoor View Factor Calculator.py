@@ -58,11 +58,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Indoor View Factor Calculator"
 ghenv.Component.NickName = 'IndoorViewFactor'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "10 | Energy | Energy"
-#compatibleHBVersion = VER 0.0.56\nDEC_15_2017
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nJUN_25_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "6"
 except: pass
@@ -76,7 +76,6 @@ from Grasshopper.Kernel.Data import GH_Path
 import Rhino as rc
 import rhinoscriptsyntax as rs
 import scriptcontext as sc
-import operator
 import System.Threading.Tasks as tasks
 import time
 
@@ -1257,45 +1256,44 @@ def checkViewResolution(viewResolution, lb_preparation):
     
     return newVecs, skyViewVecs, newVecsAreas, skyViewVecsAreas
 
-def allSame(items):
-    return all(x == items[0] for x in items)
+def pointSkyView(tracer, point, skyViewVecs, zoneWindowMesh, zoneWindowTransmiss, zoneHasWindows, zoneWindowNames):
+    finalViewCount = []
+    finalWindowNameCount = []
+    for vec in skyViewVecs:
+        ray = rc.Geometry.Ray3d(point, vec)
+        if not tracer.isBlocked(ray):
+            if zoneHasWindows == 2:
+                finalViewCount.append(1) #This is the code to indicate that the point is outside and there is no need to calculate a window transmissivity.
+                finalWindowNameCount.append(0)
+            else:
+                #The ray is not blocked but it is hitting a window and so we need to factor in the window transmissivity.
+                transmiss = 1
+                winNameList = []
+                for winCount, winMesh in enumerate(zoneWindowMesh):
+                    intersect = rc.Geometry.Intersect.Intersection.MeshRay(winMesh, ray)
+                    if intersect == -1: pass
+                    else:
+                        transmiss = transmiss * zoneWindowTransmiss[winCount]
+                        winNameList.append(zoneWindowNames[winCount].upper())
+                finalViewCount.append(transmiss)
+                finalWindowNameCount.append(winNameList)
+        else:
+            #The ray has been blocked by an opaque surface.
+            finalViewCount.append(0)
+            finalWindowNameCount.append(0)
+    
+    return finalViewCount, finalWindowNameCount
 
 def parallel_projection(zoneSrfsMesh, viewVectors, pointList):
     #Placeholder for the outcome of the parallel projection.
     pointIntList = []
     for point in pointList: pointIntList.append([])
     
-    #Keep track of the divisor.
-    divisor = len(viewVectors)
+    #Trace each ray against all of the surfaces of the zone at once.
+    tracer = hb_zoneRayTracer(zoneSrfsMesh)
     
     def intersect(i):
-        point = pointList[i]
-        #Create the rays to be projected from each point.
-        pointRays = []
-        for vec in viewVectors: pointRays.append(rc.Geometry.Ray3d(point, vec))
-        
-        #Create a list that will hold the intersection hits of each surface
-        srfHits = []
-        for srf in zoneSrfsMesh: srfHits.append([])
-        
-        #Perform the intersection of the rays with the mesh.
-        pointIntersectList = []
-        for rayCount, ray in enumerate(pointRays):
-            pointIntersectList.append([])
-            for srf in zoneSrfsMesh:
-                intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                if intersect == -1: intersect = "N"
-                pointIntersectList[rayCount].append(intersect)
-        
-        #Find the intersection that was the closest for each ray.
-        for list in pointIntersectList:
-            if allSame(list) == False:
-                minIndex, minValue = min(enumerate(list), key=operator.itemgetter(1))
-                srfHits[minIndex].append(1)
-        
-        #Sum up the lists and divide by the total rays to get the view factor.
-        for hitList in srfHits:
-            pointIntList[i].append(sum(hitList)/divisor)
+        pointIntList[i] = tracer.viewFactors(pointList[i], viewVectors)
     
     tasks.Parallel.ForEach(range(len(pointList)), intersect)
     
@@ -1315,50 +1313,11 @@ def parallel_skyProjection(zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, pointL
     #Keep track of the divisor.
     divisor = len(skyViewVecs)
     
+    #Check if the rays are blocked by any of the opaque surfaces at once.
+    tracer = hb_zoneRayTracer(zoneOpaqueMesh)
+    
     def intersect(i):
-        point = pointList[i]
-        #Create the rays to be projected from each point.
-        pointRays = []
-        for vec in skyViewVecs: pointRays.append(rc.Geometry.Ray3d(point, vec))
-        
-        #Perform the intersection of the rays with the opaque mesh.
-        pointIntersectList = []
-        for rayCount, ray in enumerate(pointRays):
-            pointIntersectList.append([])
-            for srf in zoneOpaqueMesh:
-                intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                if intersect == -1: pass
-                else: pointIntersectList[rayCount].append(1)
-        
-        #See if the ray passed all of the context meshes.
-        finalIntersectList = []
-        for ray in pointRays:
-            finalIntersectList.append([])
-        for listCt, rayList in enumerate(pointIntersectList):
-            for intersect in rayList:
-                finalIntersectList[listCt].append(intersect)
-        
-        finalViewCount = []
-        finalWindowNameCount = []
-        for rayListCount, rayList in enumerate(finalIntersectList):
-            if sum(rayList) == 0:
-                if zoneHasWindows == 2:
-                    finalViewCount.append(1)
-                    finalWindowNameCount.append(0)
-                else:
-                    transmiss = 1
-                    winNameList = []
-                    for winCount, winMesh in enumerate(zoneWindowMesh):
-                        intersect = rc.Geometry.Intersect.Intersection.MeshRay(winMesh, pointRays[rayListCount])
-                        if intersect == -1: pass
-                        else:
-                            transmiss = transmiss * zoneWindowTransmiss[winCount]
-                            winNameList.append(zoneWindowNames[winCount].upper())
-                    finalViewCount.append(transmiss)
-                    finalWindowNameCount.append(winNameList)
-            else:
-                finalViewCount.append(0)
-                finalWindowNameCount.append(0)
+        finalViewCount, finalWindowNameCount = pointSkyView(tracer, pointList[i], skyViewVecs, zoneWindowMesh, zoneWindowTransmiss, zoneHasWindows, zoneWindowNames)
         
         #Sum up the lists and divide by the total rays to get the view factor.
         skyBlockedList[i] = finalViewCount
@@ -1378,79 +1337,49 @@ def checkOutdoorViewFac(outdoorTestPtViewFactor, testPtSkyView):
 
 def skyViewCalc(testPts, zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, zoneHasWindows, zoneWindowMesh, zoneWindowTransmiss, zoneWindowNames):
     testPtSkyView = []
-    testPtSkyBlockedList = []
-    testPtBlockName = []
+    testPtSkyPatches = []
     
     for zoneCount, pointList in enumerate(testPts):
         if zoneHasWindows[zoneCount] > 0:
+            #Keep the blocked sky patches and the window names of the points in a compact matrix.
+            skyPatches = hb_skyPatchMatrix(len(skyViewVecs))
             if parallel_ == True or parallel_ == None:
                 skyViewFactors, skyBlockedList, finalWindowNameCount = parallel_skyProjection(zoneOpaqueMesh[zoneCount], skyViewVecs, skyViewVecsAreas, testPts[zoneCount], zoneWindowMesh[zoneCount], zoneWindowTransmiss[zoneCount], zoneHasWindows[zoneCount], zoneWindowNames[zoneCount])
                 testPtSkyView.append(skyViewFactors)
-                testPtSkyBlockedList.append(skyBlockedList)
-                testPtBlockName.append(finalWindowNameCount)
+                skyPatches.extend(skyBlockedList, finalWindowNameCount)
             else:
                 testPtSkyView.append([])
-                testPtSkyBlockedList.append([])
-                testPtBlockName.append([])
+                tracer = hb_zoneRayTracer(zoneOpaqueMesh[zoneCount])
+                divisor = len(skyViewVecs)
                 for pointCount, point in enumerate(pointList):
-                    #Make the list that will eventually hold the view factors of each surface.
-                    divisor = len(skyViewVecs)
-                    
-                    #Create the rays to be projected from each point.
-                    pointRays = []
-                    for vec in skyViewVecs: pointRays.append(rc.Geometry.Ray3d(point, vec))
-                    
-                    #Perform the intersection of the rays with the opaque mesh.
-                    pointIntersectList = []
-                    for rayCount, ray in enumerate(pointRays):
-                        pointIntersectList.append([])
-                        for srf in zoneOpaqueMesh[zoneCount]:
-                            intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                            if intersect == -1: pointIntersectList[rayCount].append(0)
-                            else: pointIntersectList[rayCount].append(1)
-                    
-                    #See if the ray passed all of the context meshes.
-                    finalIntersectList = []
-                    for ray in pointRays:
-                        finalIntersectList.append([])
-                    for listCt, rayList in enumerate(pointIntersectList):
-                        for intersect in rayList:
-                            finalIntersectList[listCt].append(intersect)
-                    
-                    finalViewCount = []
-                    finalWindowNameCount = []
-                    for rayListCount, rayList in enumerate(finalIntersectList):
-                        if sum(rayList) == 0:
-                            if zoneHasWindows[zoneCount] == 2:
-                                finalViewCount.append(1) #This is the code to indicate that the point is outside and there is no need to calculate a window transmissivity.
-                                finalWindowNameCount.append(0)
-                            else:
-                                #The ray is not blocked but it is hitting a window and so we need to factor in the window transmissivity.
-                                transmiss = 1
-                                winNameList = []
-                                for winCount, winMesh in enumerate(zoneWindowMesh[zoneCount]):
-                                    intersect = rc.Geometry.Intersect.Intersection.MeshRay(winMesh, pointRays[rayListCount])
-                                    if intersect == -1: pass
-                                    else:
-                                        transmiss = transmiss * zoneWindowTransmiss[zoneCount][winCount]
-                                        winNameList.append(zoneWindowNames[zoneCount][winCount].upper())
-                                finalViewCount.append(transmiss)
-                                finalWindowNameCount.append(winNameList)
-                        else:
-                            #The ray has been blocked by an opaque surface.
-                            finalViewCount.append(0)
-                            finalWindowNameCount.append(0)
+                    finalViewCount, finalWindowNameCount = pointSkyView(tracer, point, skyViewVecs, zoneWindowMesh[zoneCount], zoneWindowTransmiss[zoneCount], zoneHasWindows[zoneCount], zoneWindowNames[zoneCount])
                     
                     #Sum up the lists and divide by the total rays to get the view factor.
-                    testPtSkyBlockedList[zoneCount].append(finalViewCount)
+                    skyPatches.append(finalViewCount, finalWindowNameCount)
                     testPtSkyView[zoneCount].append(sum(finalViewCount)/divisor)
-                    testPtBlockName[zoneCount].append(finalWindowNameCount)
+            testPtSkyPatches.append(skyPatches)
         else:
             testPtSkyView.append(0)
-            testPtSkyBlockedList.append([range(len(skyViewVecs))])
-            testPtBlockName.append([range(len(skyViewVecs))])
+            testPtSkyPatches.append(None)
     
-    return testPtSkyView, testPtSkyBlockedList, testPtBlockName
+    return testPtSkyView, testPtSkyPatches
+
+def skyPatchViews(testPtSkyPatches, patchCount):
+    #Get the testPtBlockedVec and testPtBlockName lists that the comfort recipes index as [zone][point][skyPatch].
+    testPtBlockedVec = []
+    testPtBlockName = []
+    for skyPatches in testPtSkyPatches:
+        if skyPatches == None:
+            testPtBlockedVec.append([range(patchCount)])
+            testPtBlockName.append([range(patchCount)])
+        elif len(skyPatches) == 0:
+            testPtBlockedVec.append([])
+            testPtBlockName.append([])
+        else:
+            testPtBlockedVec.append(skyPatches.blockedVec())
+            testPtBlockName.append(skyPatches.blockNames())
+    
+    return testPtBlockedVec, testPtBlockName
 
 
 def main(testPts, zoneSrfsMesh, viewVectors, includeOutdoor):
@@ -1461,40 +1390,10 @@ def main(testPts, zoneSrfsMesh, viewVectors, includeOutdoor):
             viewFactors = parallel_projection(zoneSrfsMesh[zoneCount], viewVectors, testPts[zoneCount])
             testPtViewFactor.append(viewFactors)
         else:
+            tracer = hb_zoneRayTracer(zoneSrfsMesh[zoneCount])
             testPtViewFactor.append([])
             for pointCount, point in enumerate(pointList):
-                #Make the list that will eventually hold the view factors of each surface.
-                testPtViewFactor[zoneCount].append([])
-                divisor = len(viewVectors)
-                
-                #Create the rays to be projected from each point.
-                pointRays = []
-                for vec in viewVectors: pointRays.append(rc.Geometry.Ray3d(point, vec))
-                
-                #Create a list that will hold the intersection hits of each surface
-                srfHits = []
-                for srf in zoneSrfsMesh[zoneCount]: srfHits.append([])
-                
-                #Perform the intersection of the rays with the mesh.
-                pointIntersectList = []
-                for rayCount, ray in enumerate(pointRays):
-                    pointIntersectList.append([])
-                    for srf in zoneSrfsMesh[zoneCount]:
-                        intersect = rc.Geometry.Intersect.Intersection.MeshRay(srf, ray)
-                        if intersect == -1: intersect = "N"
-                        pointIntersectList[rayCount].append(intersect)
-                
-                #Find the intersection that was the closest for each ray.
-                for list in pointIntersectList:
-                    try:
-                        if allSame(list) == False:
-                            minIndex, minValue = min(enumerate(list), key=operator.itemgetter(1))
-                            srfHits[minIndex].append(1)
-                    except: pass
-                
-                #Sum up the lists and divide by the total rays to get the view factor.
-                for hitList in srfHits:
-                    testPtViewFactor[zoneCount][pointCount].append(sum(hitList)/divisor)
+                testPtViewFactor[zoneCount].append(tracer.viewFactors(point, viewVectors))
     
     
     return testPtViewFactor
@@ -1605,6 +1504,9 @@ if initCheck == True:
     if hb_zoneData[10] == True:
         lb_preparation = sc.sticky["ladybug_Preparation"]()
         hb_viewFactor = sc.sticky["honeybee_ViewFactors"]
+        hb_zoneRayTracer = sc.sticky["honeybee_ZoneRayTracer"]
+        hb_viewFactorCache = sc.sticky["honeybee_ViewFactorCache"]
+        hb_skyPatchMatrix = sc.sticky["honeybee_SkyPatchMatrix"]
         hb_hive = sc.sticky["honeybee_Hive"]()
         checkData, gridSize, distFromFloor, viewResolution, removeInt, sectionMethod, sectionBreps, includeOutdoor, constantTransmis, addShdTransmiss = checkTheInputs()
 
@@ -1638,8 +1540,22 @@ if checkData == True and buildMesh == True:
 if checkData == True and _runIt == True and geoCheck == True and buildMesh == True:
     start = time.clock()
     viewVectors, skyViewVecs, newVecsAreas, skyViewVecsAreas = checkViewResolution(viewResolution, lb_preparation)
-    testPtViewFactor = main(testPtsInit, zoneSrfsMesh, viewVectors, includeOutdoor)
-    testPtSkyView, testPtBlockedVec, testPtBlockName = skyViewCalc(testPtsInit, zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, zoneHasWindows, zoneWindowMesh, zoneWindowTransmiss, zoneWindowNames)
+    
+    #The ray traced results only depend on the prepared geometry and the view resolution so they can be re-used from the disk cache.
+    vfCache = hb_viewFactorCache()
+    vfCacheKey = hb_viewFactorCache.key(testPtsInit, zoneSrfsMesh, zoneOpaqueMesh, zoneHasWindows, zoneWindowMesh, \
+    zoneWindowTransmiss, zoneWindowNames, viewResolution, includeOutdoor)
+    cachedResults = vfCache.load(vfCacheKey)
+    if cachedResults != None:
+        testPtViewFactor, testPtSkyView, skyPatchStates = cachedResults
+        testPtSkyPatches = [hb_skyPatchMatrix.fromState(state) if state != None else None for state in skyPatchStates]
+    else:
+        testPtViewFactor = main(testPtsInit, zoneSrfsMesh, viewVectors, includeOutdoor)
+        testPtSkyView, testPtSkyPatches = skyViewCalc(testPtsInit, zoneOpaqueMesh, skyViewVecs, skyViewVecsAreas, zoneHasWindows, zoneWindowMesh, zoneWindowTransmiss, zoneWindowNames)
+        skyPatchStates = [skyPatches.getState() if skyPatches != None else None for skyPatches in testPtSkyPatches]
+        vfCache.save(vfCacheKey, (testPtViewFactor, testPtSkyView, skyPatchStates))
+    print hb_viewFactorCache.report()
+    testPtBlockedVec, testPtBlockName = skyPatchViews(testPtSkyPatches, len(skyViewVecs))
     
     outdoorNonSrfViewFac = []
     if sectionMethod != 0 and includeOutdoor == True:
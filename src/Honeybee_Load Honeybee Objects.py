@@ -30,7 +30,9 @@ Provided by Honeybee 0.0.65
 
     Args:
         _HBObjects: A list of Honeybee objects
-        _filePath: A valid path to a file on your drive (e.g. c:\ladybug\20ZonesExample.HB)
+        _filePath: A valid path to a file on your drive (e.g. c:\ladybug\20ZonesExample.HB or c:\ladybug\20ZonesExample.HBX)
+        zoneNames_: Optional list of zone names to only load these zones from an .HBX file. Surfaces that
+            are adjacent to a zone that isn't loaded are loaded as adiabatic surfaces. Default is all the objects.
         _load: Set to True to load the objects from the file
     Returns:
         readMe!: ...
@@ -38,11 +40,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Load Honeybee Objects"
 ghenv.Component.NickName = 'loadHBObjects'
-ghenv.Component.Message = 'VER 0.0.65\nFEB_06_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = 'HB-Legacy'
 ghenv.Component.SubCategory = "00 | Honeybee"
-#compatibleHBVersion = VER 0.0.59\nDEC_15_2017
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "6"
 except: pass
@@ -55,6 +57,8 @@ import uuid
 from Rhino.Geometry import *
 import Rhino as rc
 
+w = gh.GH_RuntimeMessageLevel.Warning
+
 class outdoorBCObject(object):
     """
     BCObject for surfaces with outdoor BC
@@ -83,6 +87,7 @@ def loadHBObjects(HBData):
     ids = HBData["ids"]
     objs = HBData["objs"]
     HBObjects = {}
+    adiabaticSurfaces = []
     
     def loadHBviewFac(HBViewFacInfo):
         # programs is set to default but will be overwritten
@@ -189,8 +194,14 @@ def loadHBObjects(HBData):
                 HBObject.BCObject = outdoorBCObject()
                 
             if HBObject.type!=6 and HBObject.BC.lower() == "surface":
-                # replace parent object with ID
-                HBObject.BCObject = HBObjects[HBObject.BCObject]
+                if HBObject.BCObject in HBObjects:
+                    # replace parent object with ID
+                    HBObject.BCObject = HBObjects[HBObject.BCObject]
+                else:
+                    # the adjacent zone is not loaded
+                    HBObject.setBC("Adiabatic", True)
+                    HBObject.BCObject = outdoorBCObject()
+                    adiabaticSurfaces.append(HBObject.name)
     
     for id, HBO in objs.iteritems():
         if HBO['objectType'] == 'HBSurface' and HBO['type'] == 5: continue
@@ -223,6 +234,9 @@ def loadHBObjects(HBData):
     
     #replace ids with objects in surfaces
     updateHoneybeeObjects()
+    if adiabaticSurfaces:
+        print "These surfaces are set to adiabatic since their adjacent zones are not loaded:\n" + \
+              "\n".join(adiabaticSurfaces)
     
     #Scale everything if units are not meters.
     if sc.sticky["honeybee_ConversionFactor"] != 1:
@@ -242,10 +256,31 @@ def loadHBObjects(HBData):
         return hb_hive.addNonGeoObjToHive([HBObjects[id] for id in HBData["ids"]][0], ghenv.Component)
 
 
-def main(filePath):
+def main(filePath, zoneNames):
     if not os.path.isfile(filePath):
         raise ValueError("Can't find %s"%filePath)
     
+    hb_HBObjectsReader = sc.sticky["honeybee_HBObjectsReader"]
+    if hb_HBObjectsReader.isContainer(filePath):
+        with hb_HBObjectsReader(filePath) as reader:
+            if not zoneNames:
+                return loadHBObjects(reader.read())
+            
+            zoneIds = dict((name.upper(), ID) for name, ID in reader.names().iteritems())
+            missingNames = [name for name in zoneNames if name.upper() not in zoneIds]
+            if missingNames:
+                warning = "Can't find these zones in %s:\n%s"%(filePath, "\n".join(missingNames))
+                print warning
+                ghenv.Component.AddRuntimeMessage(w, warning)
+            ids = [zoneIds[name.upper()] for name in zoneNames if name.upper() in zoneIds]
+            if not ids: return -1
+            return loadHBObjects(reader.read(ids))
+    
+    if zoneNames:
+        warning = "zoneNames_ only works with .HBX files. All the objects in %s are loaded."%filePath
+        print warning
+        ghenv.Component.AddRuntimeMessage(w, warning)
+    
     with open(filePath, "rb") as inf:
         return loadHBObjects(pickle.load(inf))
 
@@ -269,6 +304,12 @@ else:
         "into canvas and try again."
         ghenv.Component.AddRuntimeMessage(w, warning)
 
+# the input is optional and older versions of this component don't have it
+try: zoneNames_
+except NameError: zoneNames_ = []
+if zoneNames_ is None: zoneNames_ = []
+elif isinstance(zoneNames_, basestring): zoneNames_ = [zoneNames_]
+
 if initCheck == True and _filePath != None and _load == True:
-    results = main(_filePath)
+    results = main(_filePath, [name for name in zoneNames_ if name])
     HBObjects = results if results!= -1 else None
@@ -35,8 +35,8 @@ Provided by Honeybee 0.0.65
         =============: ...
         analysisPeriodOrHOY_: An analysis period from the 'Ladybug Analysis Period' component or an hour of the analysis between 1 and 8760 for which you want to conduct the analysis. If no value is connected here, the component will run for only noon on the winter solstice.  A single HOY is used by default as longer analysis periods can take a very long time.
         =============: ...
-        writeResultFile_: Set to 1 or 'True' to have the component write all results into CSV result files and set to 0 or 'False' to not have the component write these files.  The default is set to 'True' as these simulations can be long and you usually want a copy of your results.  You may want to set it to 'False' if you are just scrolling through key hours and want the fastest run possible.  Set to 2 if you want the component to only write the results of the last two matrices (comfort results and degFromTarget).
-        parallel_: Set to "True" to run the component using multiple CPUs.  This can dramatically decrease calculation time but can interfere with other intense computational processes that might be running on your machine.  For this reason, the default is set to 'False.'
+        writeResultFile_: Set to 1 or 'True' to have the component write all results into CSV result files and set to 0 or 'False' to not have the component write these files.  The default is set to 'True' as these simulations can be long and you usually want a copy of your results.  You may want to set it to 'False' if you are just scrolling through key hours and want the fastest run possible.  Set to 2 if you want the component to only write the results of the last two matrices (comfort results and degFromTarget).  Set to 3 to stream the results into the CSV result files a week at a time as they are computed, which keeps long annual studies from running out of memory.  In this case, the matrix outputs only contain the average of each point over the analysis period (the fraction of comfortable hours for the comfort matrices).
+        parallel_: Set to "True" to run the component using multiple CPUs.  The hours of the analysis are split into blocks that are computed by a pool of workers and merged back in order.  If an hour fails, the hour and the zone are reported.  This can dramatically decrease calculation time but can interfere with other intense computational processes that might be running on your machine.  For this reason, the default is set to 'False.'
         _runIt: Set boolean to "True" to run the component and generate files for an annual indoor comfort assessment.
     Returns:
         readMe!: ...
@@ -57,11 +57,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Microclimate Map Analysis"
 ghenv.Component.NickName = 'MicroclimateMap'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "10 | Energy | Energy"
-#compatibleHBVersion = VER 0.0.56\nFEB_01_2015
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nJUN_07_2016
 try: ghenv.Component.AdditionalHelpFromDocStrings = "6"
 except: pass
@@ -77,7 +77,7 @@ import Rhino as rc
 import scriptcontext as sc
 import math
 import os
-import System.Threading.Tasks as tasks
+import array
 
 
 w = gh.GH_RuntimeMessageLevel.Warning
@@ -282,42 +282,95 @@ def processPrevailOutdoorTemp(prevailingOutdoorTemp, avgMonthOrRunMean):
     return prevailTemp, coldTimes
 
 
-def calculatePointMRT(srfTempDict, testPtsViewFactor, hour, originalHour, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp):
+def buildMRTMatrix(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac):
+    #Build a sparse view factor matrix (points x surfaces) and a matrix of (T+273.15)^4 values (surfaces x hours).
+    #The MRT of all points for an hour is then a single product of the view factor matrix and a column of the temperature matrix.
+    srfT4 = []
+    srfColumns = {}
+    ptRows = []
+    for zoneCount, pointList in enumerate(testPtsViewFactor):
+        isOutdoor = outdoorClac == True and zoneCount == len(testPtsViewFactor)-1
+        if isOutdoor: tempDict = outSrfTempDict
+        else: tempDict = srfTempDict
+        zoneRows = []
+        for ptCount, pointViewFactor in enumerate(pointList):
+            columns = []
+            factors = []
+            for srfCount, srfView in enumerate(pointViewFactor):
+                if srfView == 0: continue
+                key = (isOutdoor, zoneCount, srfCount)
+                if not srfColumns.has_key(key):
+                    srfColumns[key] = len(srfT4)
+                    srfTemps = tempDict[str([zoneCount,srfCount])]["srfTemp"]
+                    srfT4.append(array.array('d', [math.pow(srfTemp + 273.15, 4) for srfTemp in srfTemps]))
+                columns.append(srfColumns[key])
+                factors.append(srfView)
+            if isOutdoor:
+                # the rest of the view is the ground and the sky at the outdoor temperature.
+                nonSrfView = outdoorNonSrfViewFac[ptCount]
+                zoneRows.append((columns, factors, nonSrfView, sum(pointViewFactor) + nonSrfView))
+            else:
+                zoneRows.append((columns, factors, 0, None))
+        ptRows.append(zoneRows)
+    
+    return ptRows, srfT4
+
+def calculatePointMRT(mrtMatrix, hour, originalHour, prevailingOutdoorTemp):
     #Calculate the MRT for each point.
+    ptRows, srfT4 = mrtMatrix
+    hourSrfT4 = [srfTemps[hour] for srfTemps in srfT4]
+    outdoorT4 = None
     pointMRTValues = []
-    for zoneCount, pointList in enumerate(testPtsViewFactor):
-        if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1:
-            pointMRTValues.append([])
-            for pointViewFactor in pointList:
-                pointMRT = 0
-                for srfCount, srfView in enumerate(pointViewFactor):
-                    path  = str([zoneCount,srfCount])
-                    weightedSrfTemp = srfView*(math.pow((srfTempDict[path]["srfTemp"][hour] + 273.15),4))
-                    pointMRT = pointMRT+weightedSrfTemp
-                pointMRT = math.pow(pointMRT,0.25) - 273.15
-                pointMRTValues[zoneCount].append(round(pointMRT, 3))
-        else:
-            pointMRTValues.append([])
-            for ptCount, pointViewFactor in enumerate(pointList):
+    for zoneCount, zoneRows in enumerate(ptRows):
+        try:
+            zoneMRTValues = [0] * len(zoneRows)
+            for ptCount, (columns, factors, nonSrfView, viewSum) in enumerate(zoneRows):
                 pointMRT = 0
-                for srfCount, srfView in enumerate(pointViewFactor):
-                    path  = str([zoneCount,srfCount])
-                    weightedSrfTemp = srfView*(math.pow((outSrfTempDict[path]["srfTemp"][hour]+273.15),4))
-                    pointMRT = pointMRT+weightedSrfTemp
-                
-                weightedSrfTemp = outdoorNonSrfViewFac[ptCount]*(math.pow((prevailingOutdoorTemp[originalHour]+273.15),4))
-                pointMRT = pointMRT+weightedSrfTemp
-                pointMRT = pointMRT / (sum(pointViewFactor) + outdoorNonSrfViewFac[ptCount])
-                pointMRT = math.pow(pointMRT,0.25) - 273.15
-                pointMRTValues[zoneCount].append(round(pointMRT, 3))
+                for column, srfView in zip(columns, factors):
+                    pointMRT += srfView * hourSrfT4[column]
+                if viewSum != None:
+                    if outdoorT4 == None: outdoorT4 = math.pow(prevailingOutdoorTemp[originalHour]+273.15, 4)
+                    pointMRT = (pointMRT + nonSrfView*outdoorT4) / viewSum
+                zoneMRTValues[ptCount] = round(math.pow(pointMRT,0.25) - 273.15, 3)
+            pointMRTValues.append(zoneMRTValues)
+        except Exception, e:
+            hb_HourBlockPool.tagZone(e, zoneCount)
+            raise
     
     return pointMRTValues
 
-def computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac):
+def createShadeStateCache(winShdDict, maxStates=48):
+    #Shade schedules usually only have a few combinations of window states over the year so the sky view of each combination is kept here.
+    #Each state holds a copy of the sky view of all of the points so only the first maxStates states are kept. The others are computed every hour.
+    return {"windows": sorted(winShdDict.keys()), "states": {}, "maxStates": maxStates, "distinctStates": set()}
+
+def shadeTransFactor(hour, windowNames, winShdDict):
+    transFactor = 1
+    try:
+        for window in windowNames:
+            transFactor = transFactor * winShdDict[window][hour-1]
+    except: pass
+    return transFactor
+
+def computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac, shadeStateCache=None):
+    #Re-use the sky view of an earlier hour that had the same window shade states.
+    if shadeStateCache != None:
+        shadeState = tuple([winShdDict[window][hour-1] for window in shadeStateCache["windows"]])
+        shadeStateCache["distinctStates"].add(shadeState)
+        try: return shadeStateCache["states"][shadeState]
+        except KeyError: pass
+    
     #Build a new testPtBlockedVec that checks with the window transmissivity status.
     newTestPtBlockedVec = []
     newTestPtSkyView = []
     for zoneCount, zone in enumerate(testPtBlockedVec):
+        if hasattr(zone, "withValues"):
+            #The sky patches are stored as groups of windows so only the transmissivity of each group needs to be computed.
+            groupNames = testPtBlockName[zoneCount].values
+            groupFactors = [0] + [shadeTransFactor(hour, windowNames, winShdDict) for windowNames in groupNames[1:]]
+            newTestPtBlockedVec.append(zone.withValues(groupFactors))
+            newTestPtSkyView.append([sum(vecList)/len(vecList) for vecList in newTestPtBlockedVec[zoneCount]])
+            continue
         newTestPtBlockedVec.append([])
         newTestPtSkyView.append([])
         for ptCount, vecList in enumerate(zone):
@@ -326,42 +379,98 @@ def computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, t
                 if transmiss == 0: newVecList.append(transmiss)
                 else:
                     newTransmissWinList = testPtBlockName[zoneCount][ptCount][vecCount]
-                    transFactor = 1
-                    try:
-                        for window in newTransmissWinList:
-                            transFactor = transFactor * winShdDict[window][hour-1]
-                    except: pass
-                    newVecList.append(transFactor)
+                    newVecList.append(shadeTransFactor(hour, newTransmissWinList, winShdDict))
             newTestPtBlockedVec[zoneCount].append(newVecList)
             newTestPtSkyView[zoneCount].append(sum(newVecList)/len(newVecList))
     
+    if shadeStateCache != None and len(shadeStateCache["states"]) < shadeStateCache["maxStates"]:
+        shadeStateCache["states"][shadeState] = (newTestPtSkyView, newTestPtBlockedVec)
+    
     return newTestPtSkyView, newTestPtBlockedVec
 
+def reportShadeStates(shadeStateCache, hourCount):
+    if shadeStateCache != None and len(shadeStateCache["distinctStates"]) != 0:
+        print str(len(shadeStateCache["distinctStates"])) + " distinct window shade states were found for " + str(hourCount) + " hours. " + \
+            str(len(shadeStateCache["states"])) + " of them were kept in memory (maximum " + str(shadeStateCache["maxStates"]) + ")."
+
 def computeSkyTemp(La):
     # formula by Man-ENvironment heat EXchange model (MENEX_2005)
     skyTemp = (((La) / (0.95*5.667*(10**(-8))))**(0.25)) - 273
     
     return skyTemp
 
-def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, diffSolarRad, directSolarRad, globHorizRadList, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels):
+def skyAltAz(vec):
+    #Get the altitude and the azimuth (clockwise from the Y axis) of a vector in degrees.
+    length = math.sqrt(vec.X*vec.X + vec.Y*vec.Y + vec.Z*vec.Z)
+    altitude = math.degrees(math.asin(max(-1, min(1, vec.Z/length))))
+    azimuth = math.degrees(math.atan2(vec.X, vec.Y)) % 360
+    return altitude, azimuth
+
+def buildSunPatchTable(skyPatches, numSkyPatchDivs, sunVecs):
+    #The rows of the Tregenza/Reinhart sky have the same height and the patches of each row have the same width.
+    #So the sky patch of a sun vector can be found from its altitude and azimuth without intersecting every patch.
+    rowCount = 7*(numSkyPatchDivs+1)
+    rowHeight = 90/(rowCount+0.5)
+    
+    #Use the patch centers to get the starting azimuth and the order of the patches in each row.
+    patchCenters = []
+    rowPatches = {}
+    for patchCount, patch in enumerate(skyPatches):
+        center = rc.Geometry.Vector3d(rc.Geometry.AreaMassProperties.Compute(patch).Centroid)
+        patchCenters.append(center)
+        altitude, azimuth = skyAltAz(center)
+        row = min(int(altitude/rowHeight), rowCount)
+        if row not in rowPatches: rowPatches[row] = []
+        rowPatches[row].append((azimuth, patchCount))
+    
+    rowBins = {}
+    for row, patches in rowPatches.items():
+        width = 360.0/len(patches)
+        startAz = (patches[0][0] - width/2) % width
+        bins = {}
+        for azimuth, patchCount in patches:
+            bins[int(((azimuth - startAz) % 360)/width) % len(patches)] = patchCount
+        rowBins[row] = [width, startAz, len(patches), bins]
+    
+    #Only use the rows if the sky has the patches of a Tregenza/Reinhart sky with this subdivision
+    #and no two patches of a row fall in the same bin. Otherwise, the table would point to the wrong patches.
+    expectedPatchCount = 144*(numSkyPatchDivs+1)**2 + 1
+    skyMatchesRows = len(patchCenters) == expectedPatchCount and len(rowBins) == rowCount+1 \
+        and all(len(bins) == numPatches for width, startAz, numPatches, bins in rowBins.values())
+    if not skyMatchesRows: rowBins = {}
+    
+    #Assign each sun vector to a sky patch that aligns with the testPtBlockedVec list.
+    sunPatchTable = []
+    for sunVec in sunVecs:
+        if sunVec == None:
+            sunPatchTable.append(None)
+            continue
+        altitude, azimuth = skyAltAz(sunVec)
+        row = min(int(max(altitude, 0)/rowHeight), rowCount)
+        try:
+            width, startAz, numPatches, bins = rowBins[row]
+            sunPatchTable.append(bins[int(((azimuth - startAz) % 360)/width) % numPatches])
+        except KeyError:
+            #The sky is not subdivided as expected so take the patch with the closest center.
+            sunDir = rc.Geometry.Vector3d(sunVec)
+            sunDir.Unitize()
+            closest = max(range(len(patchCenters)), key=lambda i: (patchCenters[i]*sunDir)/patchCenters[i].Length)
+            sunPatchTable.append(closest)
+    
+    return sunPatchTable
+
+def skyPatchColumn(zoneBlockedVec, patch):
+    #Get the transmissivity of one sky patch for all of the points of a zone.
+    try: return zoneBlockedVec.column(patch)
+    except AttributeError: return [vecList[patch] for vecList in zoneBlockedVec]
+
+def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, diffSolarRad, directSolarRad, globHorizRadList, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels):
     #Pull out the correct sun vector.
     sunVec = sunVecInfo[0][count]
     altitude = sunVecInfo[1][count]
     
-    #Assign the sun vector to a sky patch that aligns with the testPtBlockedVec list.
-    vectorskyPatches = []
-    
-    if sunVec != None:
-        intersected = False
-        ray = rc.Geometry.Ray3d(rc.Geometry.Point3d.Origin, sunVec)
-        for patchCount, patch in enumerate(skyPatchMeshes):
-            if rc.Geometry.Intersect.Intersection.MeshRay(patch, ray) >= 0:
-                vectorskyPatches.append(patchCount)
-                intersected = True
-        if intersected == False:
-            vectorskyPatches.append(None)
-    else:
-        vectorskyPatches.append(None)
+    #Get the sky patch of the sun from the precomputed table. This aligns with the testPtBlockedVec list.
+    sunPatch = sunPatchTable[count]
     
     
     ##Calculate the diffuse, direct, and global horizontal components of the solar radiation at the hour.
@@ -392,39 +501,45 @@ def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, di
     #Compute the solar adjusted temperature for each point.
     solarAdjustedPointMRTValues = []
     if sunVec != None:
+        #Factors that are the same for all points at this hour.
+        diffFac = 0.5*fracEff
+        dirFac = fracEff*ProjAreaFac
+        erfToMRT = (cloA/0.95)/(fracEff*radTransCoeff)
         for zoneCount, zonePtsList in enumerate(pointMRTValues):
-            if zoneHasWindows[zoneCount] != 0:
-                solarAdjustedPointMRTValues.append([])
-                for pointCount, pointMRT in enumerate(zonePtsList):
-                    #Check if the sunray is blocked.
-                    if vectorskyPatches[0] != None:
-                        if testPtBlockedVec[zoneCount][pointCount][vectorskyPatches[0]] == 0: sunBlocked = True
-                        else: sunBlocked = False
-                    else: sunBlocked = True
-                    
-                    #If the ray was not blocked, then adjust then get rid of direct solar radiation.
-                    #Note that, while the direct radiation is multiplied by the specific window transmissivity here, the diffuse window transmissivity is already accounted for in the sky view.
-                    if sunBlocked == True:
-                        dirRadFinal = 0.0
-                        globHorizRadFinal = diffRad
-                    else:
-                        dirRadFinal = dirNormRad*(testPtBlockedVec[zoneCount][pointCount][vectorskyPatches[0]])
-                        globHorizRadFinal = globHorizRad
-                    
-                    if outdoorClac == False or zoneCount != len(pointMRTValues)-1:
-                        hourERF = ((0.5*fracEff*testPtSkyView[zoneCount][pointCount]*(diffRad + (globHorizRadFinal*floorR[zoneCount][pointCount]))+ (fracEff*ProjAreaFac*dirRadFinal))*winTrans[originalHour-1])*(cloA/0.95)
-                        mrtDelt = (hourERF/(fracEff*radTransCoeff))
-                        hourMRT = mrtDelt + pointMRT
-                    else:
-                        hourERF = ((0.5*fracEff*testPtSkyView[zoneCount][pointCount]*(diffRad + (globHorizRadFinal*floorR[zoneCount][pointCount]))+ (fracEff*ProjAreaFac*dirRadFinal)))*(cloA/0.95)
-                        mrtDelt = (hourERF/(fracEff*radTransCoeff))
-                        hourMRT = mrtDelt + (skyTemp*(testPtSkyView[zoneCount][pointCount]/2) + pointMRT*(1-(testPtSkyView[zoneCount][pointCount]/2)))
-                    
-                    solarAdjustedPointMRTValues[zoneCount].append(round(hourMRT, 3))
-            else:
-                solarAdjustedPointMRTValues.append([])
-                for pointCount, pointMRT in enumerate(zonePtsList):
-                    solarAdjustedPointMRTValues[zoneCount].append(round(pointMRT, 3))
+            try:
+                zoneValues = []
+                solarAdjustedPointMRTValues.append(zoneValues)
+                if zoneHasWindows[zoneCount] != 0:
+                    zoneSkyView = testPtSkyView[zoneCount]
+                    if sunPatch != None: zoneSunTrans = skyPatchColumn(testPtBlockedVec[zoneCount], sunPatch)
+                    zoneFloorR = floorR[zoneCount]
+                    isOutdoor = outdoorClac == True and zoneCount == len(pointMRTValues)-1
+                    if isOutdoor: zoneMRTFac = erfToMRT
+                    else: zoneMRTFac = winTrans[originalHour-1]*erfToMRT
+                    for pointCount, pointMRT in enumerate(zonePtsList):
+                        #If the sun ray is blocked, then get rid of direct solar radiation.
+                        #Note that, while the direct radiation is multiplied by the specific window transmissivity here, the diffuse window transmissivity is already accounted for in the sky view.
+                        if sunPatch != None: sunTrans = zoneSunTrans[pointCount]
+                        else: sunTrans = 0
+                        if sunTrans == 0:
+                            dirRadFinal = 0.0
+                            globHorizRadFinal = diffRad
+                        else:
+                            dirRadFinal = dirNormRad*sunTrans
+                            globHorizRadFinal = globHorizRad
+                        
+                        skyView = zoneSkyView[pointCount]
+                        mrtDelt = (diffFac*skyView*(diffRad + (globHorizRadFinal*zoneFloorR[pointCount])) + (dirFac*dirRadFinal))*zoneMRTFac
+                        if isOutdoor: hourMRT = mrtDelt + (skyTemp*(skyView/2) + pointMRT*(1-(skyView/2)))
+                        else: hourMRT = mrtDelt + pointMRT
+                        
+                        zoneValues.append(round(hourMRT, 3))
+                else:
+                    for pointMRT in zonePtsList:
+                        zoneValues.append(round(pointMRT, 3))
+            except Exception, e:
+                hb_HourBlockPool.tagZone(e, zoneCount)
+                raise
     else:
         solarAdjustedPointMRTValues = pointMRTValues
     
@@ -435,20 +550,24 @@ def getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour, or
     #Calculate the value for each point.
     pointValues = []
     for zoneCount, pointList in enumerate(testPtsViewFactor):
-        if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1:
-            pointValues.append([])
-            for pointWeght in testPtZoneWeights[zoneCount]:
-                pointValue = 0
-                for Count, weight in enumerate(pointWeght):
-                    path  = Count
-                    weightedPointVal = weight*(airTempDict[path]["airTemp"][hour])
-                    pointValue = pointValue+weightedPointVal
-                pointValues[zoneCount].append(round(pointValue, 3))
-        else:
-            pointValues.append([])
-            for pointWeght in pointList:
-                pointValue = prevailingOutdoorTemp[originalHour]
-                pointValues[zoneCount].append(round(pointValue, 3))
+        try:
+            if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1:
+                pointValues.append([])
+                for pointWeght in testPtZoneWeights[zoneCount]:
+                    pointValue = 0
+                    for Count, weight in enumerate(pointWeght):
+                        path  = Count
+                        weightedPointVal = weight*(airTempDict[path]["airTemp"][hour])
+                        pointValue = pointValue+weightedPointVal
+                    pointValues[zoneCount].append(round(pointValue, 3))
+            else:
+                pointValues.append([])
+                for pointWeght in pointList:
+                    pointValue = prevailingOutdoorTemp[originalHour]
+                    pointValues[zoneCount].append(round(pointValue, 3))
+        except Exception, e:
+            hb_HourBlockPool.tagZone(e, zoneCount)
+            raise
     
     return pointValues
 
@@ -554,6 +673,89 @@ def warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainVal
     
     return pointAirTempValues
 
+class ComfortMapStream(object):
+    """A result matrix that writes the computed hours to a csv file instead of keeping them in memory."""
+    chunkSize = 168
+    
+    def __init__(self, header, resultFile):
+        self.header = header
+        self.resultFile = resultFile
+        self.hours = {}
+        self.nextHour = 1
+        self.hourCount = 0
+        self.sums = []
+        self.csvFile = open(resultFile, 'wb')
+        self.csvFile.write(header + "\n")
+    
+    def __setitem__(self, hour, values):
+        self.hours[hour] = values
+    
+    def flush(self):
+        #Write the finished hours in order and add them to the running sums.
+        while self.nextHour in self.hours:
+            values = self.hours.pop(self.nextHour)
+            if self.sums == []: self.sums = [0 for val in values]
+            for valCount, val in enumerate(values): self.sums[valCount] += val
+            self.csvFile.write(','.join([str(val) for val in values]) + "\n")
+            self.hourCount += 1
+            self.nextHour += 1
+    
+    def close(self):
+        if not self.csvFile.closed:
+            self.flush()
+            self.csvFile.close()
+        self.hours = {}
+    
+    def summary(self):
+        #Return a matrix with the average of every point over the hours that were written.
+        if self.hourCount == 0: return [self.header]
+        return [self.header, [val/float(self.hourCount) for val in self.sums]]
+
+def streamResultMtxs(resultMtxs, fileSuffixes, directory, fileName, lb_preparation):
+    workingDir = lb_preparation.makeWorkingDir(os.path.join(directory))
+    resultStreams = []
+    for mtx, fileSuffix in zip(resultMtxs, fileSuffixes):
+        resultStreams.append(ComfortMapStream(mtx[0], os.path.join(workingDir, fileName + fileSuffix)))
+    return resultStreams
+
+def getHourChunks(hourCount, resultMtxs):
+    #Streamed results are computed a chunk of hours at a time so that only one chunk is held in memory.
+    if isinstance(resultMtxs[0], ComfortMapStream): chunkSize = ComfortMapStream.chunkSize
+    else: chunkSize = hourCount
+    return [range(start, min(start+chunkSize, hourCount)) for start in range(0, hourCount, chunkSize)]
+
+def flushResultStreams(resultMtxs):
+    for mtx in resultMtxs:
+        if isinstance(mtx, ComfortMapStream): mtx.flush()
+
+def closeResultStreams(resultMtxs):
+    for mtx in resultMtxs:
+        if isinstance(mtx, ComfortMapStream): mtx.close()
+
+def summarizeResultStreams(resultStreams):
+    summaries = []
+    resultFiles = []
+    for stream in resultStreams:
+        summaries.append(stream.summary())
+        resultFiles.append(stream.resultFile)
+    return summaries, resultFiles
+
+def reportHourError(hourError, originalHOYs, testPtZoneNames, lb_preparation):
+    #Escape raises an AssertionError in the hourly calculation.
+    if hourError.errorType == "AssertionError" and hourError.message == "":
+        warning = "The calculation has been terminated by the user!"
+    else:
+        hour = originalHOYs[hourError.hour]
+        d, m, t = lb_preparation.hour2Date(hour, True)
+        warning = "The calculation failed at hour " + str(hour) + " (" + str(m+1) + "/" + str(d) + " " + str(t) + ":00)"
+        if hourError.zone != None:
+            try: zoneName = testPtZoneNames[hourError.zone]
+            except (IndexError, TypeError): zoneName = "outdoor"
+            warning = warning + " in zone " + str(zoneName)
+        warning = warning + ":\n" + hourError.errorType + ": " + hourError.message
+    print warning
+    ghenv.Component.AddRuntimeMessage(w, warning)
+
 def createShdDict(shdHeaders, shdNumbers, zoneWindowTransmiss, zoneWindowNames):
     #Create the dictionary and a starting calculation length.
     shdDict = {}
@@ -814,17 +1016,16 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
         #If there are different hourly window transmissivities for different windows, make a dictionary for the shades and make a neutral winTrans list to cancel out the usual way window transmissivity is factored in.
         neutralWinTransList = []
         winShdDict = {}
+        shadeStateCache = None
         if allWindowShadesSame == False:
             for hr in range(8760): neutralWinTransList.append(1)
             winShdDict = createShdDict(winStatusHeaders, winTrans, zoneWindowTransmiss, zoneWindowNames)
+            shadeStateCache = createShadeStateCache(winShdDict)
         
         #Make sure that there are windows in the model and, if so, generate solar outputs.
         if sum(zoneHasWindows) != 0:
-            #Create a meshed sky dome to assist with direct sunlight falling on occupants.
+            #Create a sky dome to assist with direct sunlight falling on occupants.
             skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, numSkyPatchDivs, .5)
-            skyPatchMeshes = []
-            for patch in skyPatches:
-                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
             
             #Initiate the sun vector calculator.
             lb_sunpath.initTheClass(float(latitude), northAngle, rc.Geometry.Point3d.Origin, 100, float(longitude), float(timeZone))
@@ -845,6 +1046,9 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
             sunVecInfo = [sunVecs, altitudes, azimuths]
+            
+            #Look up the sky patch of the sun once for every hour of the analysis period.
+            sunPatchTable = buildSunPatchTable(skyPatches, numSkyPatchDivs, sunVecs)
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -861,6 +1065,21 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
             projectedAreas.append(projArea)
         
         #Run through every hour of the analysis to fill up the matrices.
+        #Build the view factor and surface temperature matrices for the radiant temperature.
+        try: mrtMatrix = buildMRTMatrix(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac)
+        except KeyError:
+            warning = 'Failed to find the temperature of some of the surfaces in the connected EnergyPlus results.'
+            print warning
+            ghenv.Component.AddRuntimeMessage(w, warning)
+            return -1
+        
+        #Stream the hourly results into the result files instead of keeping them in memory.
+        #The files are opened just before the hour loop so that they are always closed after it.
+        resultMtxs = [radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx]
+        if writeResultFile_ == 3:
+            resultMtxs = streamResultMtxs(resultMtxs, ["RadiantTemp.csv", "AirTemp.csv", "OperativeTemp.csv", "AdaptComf.csv", "DegFromTarget.csv"], directory, fileName, lb_preparation)
+            radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx = resultMtxs
+        
         calcCancelled = False
         try:
             def climateMap(count):
@@ -878,27 +1097,24 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp)
+                pointMRTValues = calculatePointMRT(mrtMatrix, hour-1, originalHour-1, prevailingOutdoorTemp)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
+                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
                     else:
                         #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
-                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
+                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac, shadeStateCache)
+                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
-                radTempMtx[count+1] = pointMRTValues
                 
                 #Compute the air temperature.
                 pointAirTempValues = getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, prevailingOutdoorTemp)
                 if mixedAirOverride[hour-1] == 0: pointAirTempValues = warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainValues, adjacentList, adjacentNameList, groupedInletArea, groupedZoneHeights, groupedGlzHeights, groupedWinCeilDiffs, outdoorClac, prevailingOutdoorTemp)
                 pointAirTempValues = lb_preparation.flattenList(pointAirTempValues)
-                airTempMtx[count+1] = pointAirTempValues
                 
                 #Compute the operative temperature.
                 pointOpTempValues = []
                 for ptCount, airTemp in enumerate(pointAirTempValues):
                     pointOpTempValues.append((airTemp+pointMRTValues[ptCount])/2)
-                operativeTempMtx[count+1] = pointOpTempValues
                 
                 #Compute the wind speed.
                 pointWindSpeedValues = []
@@ -932,25 +1148,30 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                     adaptComfPointValues.append(int(comf))
                     degFromTargetPointValues.append(distFromTarget)
                 
-                adaptComfMtx[count+1] = adaptComfPointValues
-                degFromTargetMtx[count+1] = degFromTargetPointValues
+                return pointMRTValues, pointAirTempValues, pointOpTempValues, adaptComfPointValues, degFromTargetPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMap)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    #if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMap(hour)
+            #The hours are computed in blocks by a pool of workers and the results of the blocks are merged in order.
+            if parallel_ == True: hourPool = hb_HourBlockPool()
+            else: hourPool = hb_HourBlockPool(maxWorkers = 1)
+            for hourChunk in getHourChunks(len(HOYs), resultMtxs):
+                hourResults = hourPool.map(climateMap, hourChunk)
+                for count, hourResult in zip(hourChunk, hourResults):
+                    for mtx, values in zip(resultMtxs, hourResult): mtx[count+1] = values
+                flushResultStreams(resultMtxs)
+        except hb_HourBlockError, hourError:
+            reportHourError(hourError, originalHOYs, testPtZoneNames, lb_preparation)
+            calcCancelled = True
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
             ghenv.Component.AddRuntimeMessage(e, "The calculation has been terminated by the user!")
             calcCancelled = True
-        
+        finally:
+            closeResultStreams(resultMtxs)
         
         if calcCancelled == False:
+            reportShadeStates(shadeStateCache, len(HOYs))
             return radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx
         else:
             return -1
@@ -1009,17 +1230,16 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         #If there are different shade statuses for the different windows, make a neutral winTrans list for this case.
         neutralWinTransList = []
         winShdDict = {}
+        shadeStateCache = None
         if allWindowShadesSame == False:
             for hr in range(8760): neutralWinTransList.append(1)
             winShdDict = createShdDict(winStatusHeaders, winTrans, zoneWindowTransmiss, zoneWindowNames)
+            shadeStateCache = createShadeStateCache(winShdDict)
         
         #Make sure that there are windows in the model and a good reason to generate solar outputs.
         if sum(zoneHasWindows) != 0:
-            #Create a meshed sky dome to assist with direct sunlight falling on occupants.
+            #Create a sky dome to assist with direct sunlight falling on occupants.
             skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, numSkyPatchDivs, .5)
-            skyPatchMeshes = []
-            for patch in skyPatches:
-                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
             
             #Initiate the sun vector calculator.
             lb_sunpath.initTheClass(float(latitude), northAngle, rc.Geometry.Point3d.Origin, 100, float(longitude), float(timeZone))
@@ -1040,6 +1260,9 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
             sunVecInfo = [sunVecs, altitudes, azimuths]
+            
+            #Look up the sky patch of the sun once for every hour of the analysis period.
+            sunPatchTable = buildSunPatchTable(skyPatches, numSkyPatchDivs, sunVecs)
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1057,6 +1280,21 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
             projectedAreas.append(projArea)
         
         #Run through every hour of the analysis to fill up the matrices.
+        #Build the view factor and surface temperature matrices for the radiant temperature.
+        try: mrtMatrix = buildMRTMatrix(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac)
+        except KeyError:
+            warning = 'Failed to find the temperature of some of the surfaces in the connected EnergyPlus results.'
+            print warning
+            ghenv.Component.AddRuntimeMessage(w, warning)
+            return -1
+        
+        #Stream the hourly results into the result files instead of keeping them in memory.
+        #The files are opened just before the hour loop so that they are always closed after it.
+        resultMtxs = [radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx]
+        if writeResultFile_ == 3:
+            resultMtxs = streamResultMtxs(resultMtxs, ["RadiantTemp.csv", "AirTemp.csv", "SET.csv", "PPD.csv", "PMV.csv"], directory, fileName, lb_preparation)
+            radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx = resultMtxs
+        
         calcCancelled = False
         try:
             def climateMapPMV(count):
@@ -1074,21 +1312,19 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = calculatePointMRT(mrtMatrix, hour-1, originalHour-1, outDryBulbTemp)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
                         #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
-                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac, shadeStateCache)
+                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
-                radTempMtx[count+1] = pointMRTValues
                 
                 #Compute the air temperature.
                 pointAirTempValues = getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
                 if mixedAirOverride[hour-1] == 0: pointAirTempValues = warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainValues, adjacentList, adjacentNameList, groupedInletArea, groupedZoneHeights, groupedGlzHeights, groupedWinCeilDiffs, outdoorClac, outDryBulbTemp)
                 pointAirTempValues = lb_preparation.flattenList(pointAirTempValues)
-                airTempMtx[count+1] = pointAirTempValues
                 
                 #Compute the relative humidity.
                 pointRelHumidValues = getAirPointValue(relHumidDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
@@ -1138,26 +1374,30 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                         else: pmvComfPointValues.append(0)
                     pmvPointValues.append(pmv)
                 
-                SET_Mtx[count+1] = setPointValues
-                PMVComfMtx[count+1] = pmvComfPointValues
-                PMV_Mtx[count+1] = pmvPointValues
+                return pointMRTValues, pointAirTempValues, setPointValues, pmvComfPointValues, pmvPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapPMV)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapPMV(hour)
+            #The hours are computed in blocks by a pool of workers and the results of the blocks are merged in order.
+            if parallel_ == True: hourPool = hb_HourBlockPool()
+            else: hourPool = hb_HourBlockPool(maxWorkers = 1)
+            for hourChunk in getHourChunks(len(HOYs), resultMtxs):
+                hourResults = hourPool.map(climateMapPMV, hourChunk)
+                for count, hourResult in zip(hourChunk, hourResults):
+                    for mtx, values in zip(resultMtxs, hourResult): mtx[count+1] = values
+                flushResultStreams(resultMtxs)
+        except hb_HourBlockError, hourError:
+            reportHourError(hourError, originalHOYs, testPtZoneNames, lb_preparation)
+            calcCancelled = True
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
             ghenv.Component.AddRuntimeMessage(e, "The calculation has been terminated by the user!")
             calcCancelled = True
-        
+        finally:
+            closeResultStreams(resultMtxs)
         
         if calcCancelled == False:
+            reportShadeStates(shadeStateCache, len(HOYs))
             return radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx
         else:
             return -1
@@ -1216,17 +1456,16 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
         #If there are different shade statuses for the different windows, make a neutral winTrans list for this case.
         neutralWinTransList = []
         winShdDict = {}
+        shadeStateCache = None
         if allWindowShadesSame == False:
             for hr in range(8760): neutralWinTransList.append(1)
             winShdDict = createShdDict(winStatusHeaders, winTrans, zoneWindowTransmiss, zoneWindowNames)
+            shadeStateCache = createShadeStateCache(winShdDict)
         
         #Make sure that there are windows in the model and a good reason to generate solar outputs.
         if sum(zoneHasWindows) != 0:
-            #Create a meshed sky dome to assist with direct sunlight falling on occupants.
+            #Create a sky dome to assist with direct sunlight falling on occupants.
             skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, numSkyPatchDivs, .5)
-            skyPatchMeshes = []
-            for patch in skyPatches:
-                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
             
             #Initiate the sun vector calculator.
             lb_sunpath.initTheClass(float(latitude), northAngle, rc.Geometry.Point3d.Origin, 100, float(longitude), float(timeZone))
@@ -1247,6 +1486,9 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
             sunVecInfo = [sunVecs, altitudes, azimuths]
+            
+            #Look up the sky patch of the sun once for every hour of the analysis period.
+            sunPatchTable = buildSunPatchTable(skyPatches, numSkyPatchDivs, sunVecs)
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         try: airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1266,6 +1508,21 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
             projectedAreas.append(projArea)
         
         #Run through every hour of the analysis to fill up the matrices.
+        #Build the view factor and surface temperature matrices for the radiant temperature.
+        try: mrtMatrix = buildMRTMatrix(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac)
+        except KeyError:
+            warning = 'Failed to find the temperature of some of the surfaces in the connected EnergyPlus results.'
+            print warning
+            ghenv.Component.AddRuntimeMessage(w, warning)
+            return -1
+        
+        #Stream the hourly results into the result files instead of keeping them in memory.
+        #The files are opened just before the hour loop so that they are always closed after it.
+        resultMtxs = [radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx]
+        if writeResultFile_ == 3:
+            resultMtxs = streamResultMtxs(resultMtxs, ["RadiantTemp.csv", "AirTemp.csv", "UTCI.csv", "OutdoorComf.csv", "DegFromTarget.csv"], directory, fileName, lb_preparation)
+            radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx = resultMtxs
+        
         calcCancelled = False
         try:
             def climateMapUTCI(count):
@@ -1283,21 +1540,19 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = calculatePointMRT(mrtMatrix, hour-1, originalHour-1, outDryBulbTemp)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
                         #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
-                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac, shadeStateCache)
+                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
-                radTempMtx[count+1] = pointMRTValues
                 
                 #Compute the air temperature.
                 pointAirTempValues = getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
                 if mixedAirOverride[hour-1] == 0: pointAirTempValues = warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainValues, adjacentList, adjacentNameList, groupedInletArea, groupedZoneHeights, groupedGlzHeights, groupedWinCeilDiffs, outdoorClac, outDryBulbTemp)
                 pointAirTempValues = lb_preparation.flattenList(pointAirTempValues)
-                airTempMtx[count+1] = pointAirTempValues
                 
                 #Compute the relative humidity.
                 pointRelHumidValues = getAirPointValue(relHumidDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
@@ -1343,26 +1598,30 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                     outdoorComfPointValues.append(comf)
                     degNeutralPointValues.append(utci-20)
                 
-                UTCI_Mtx[count+1] = utciPointValues
-                OutdoorComfMtx[count+1] = outdoorComfPointValues
-                DegFromNeutralMtx[count+1] = degNeutralPointValues
+                return pointMRTValues, pointAirTempValues, utciPointValues, outdoorComfPointValues, degNeutralPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapUTCI)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapUTCI(hour)
+            #The hours are computed in blocks by a pool of workers and the results of the blocks are merged in order.
+            if parallel_ == True: hourPool = hb_HourBlockPool()
+            else: hourPool = hb_HourBlockPool(maxWorkers = 1)
+            for hourChunk in getHourChunks(len(HOYs), resultMtxs):
+                hourResults = hourPool.map(climateMapUTCI, hourChunk)
+                for count, hourResult in zip(hourChunk, hourResults):
+                    for mtx, values in zip(resultMtxs, hourResult): mtx[count+1] = values
+                flushResultStreams(resultMtxs)
+        except hb_HourBlockError, hourError:
+            reportHourError(hourError, originalHOYs, testPtZoneNames, lb_preparation)
+            calcCancelled = True
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
             ghenv.Component.AddRuntimeMessage(e, "The calculation has been terminated by the user!")
             calcCancelled = True
-        
+        finally:
+            closeResultStreams(resultMtxs)
         
         if calcCancelled == False:
+            reportShadeStates(shadeStateCache, len(HOYs))
             return radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx
         else:
             return -1
@@ -1421,17 +1680,16 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         #If there are different shade statuses for the different windows, make a neutral winTrans list for this case.
         neutralWinTransList = []
         winShdDict = {}
+        shadeStateCache = None
         if allWindowShadesSame == False:
             for hr in range(8760): neutralWinTransList.append(1)
             winShdDict = createShdDict(winStatusHeaders, winTrans, zoneWindowTransmiss, zoneWindowNames)
+            shadeStateCache = createShadeStateCache(winShdDict)
         
         #Make sure that there are windows in the model and a good reason to generate solar outputs.
         if sum(zoneHasWindows) != 0:
-            #Create a meshed sky dome to assist with direct sunlight falling on occupants.
+            #Create a sky dome to assist with direct sunlight falling on occupants.
             skyPatches = lb_preparation.generateSkyGeo(rc.Geometry.Point3d.Origin, numSkyPatchDivs, .5)
-            skyPatchMeshes = []
-            for patch in skyPatches:
-                skyPatchMeshes.append(rc.Geometry.Mesh.CreateFromBrep(patch, rc.Geometry.MeshingParameters.Coarse)[0])
             
             #Initiate the sun vector calculator.
             lb_sunpath.initTheClass(float(latitude), northAngle, rc.Geometry.Point3d.Origin, 100, float(longitude), float(timeZone))
@@ -1452,6 +1710,9 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
             sunVecInfo = [sunVecs, altitudes, azimuths]
+            
+            #Look up the sky patch of the sun once for every hour of the analysis period.
+            sunPatchTable = buildSunPatchTable(skyPatches, numSkyPatchDivs, sunVecs)
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         try: airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1471,6 +1732,21 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
             projectedAreas.append(projArea)
         
         #Run through every hour of the analysis to fill up the matrices.
+        #Build the view factor and surface temperature matrices for the radiant temperature.
+        try: mrtMatrix = buildMRTMatrix(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac)
+        except KeyError:
+            warning = 'Failed to find the temperature of some of the surfaces in the connected EnergyPlus results.'
+            print warning
+            ghenv.Component.AddRuntimeMessage(w, warning)
+            return -1
+        
+        #Stream the hourly results into the result files instead of keeping them in memory.
+        #The files are opened just before the hour loop so that they are always closed after it.
+        resultMtxs = [radTempMtx, airTempMtx, PET_Mtx, PET_ComfMtx, PET_CategoryMtx]
+        if writeResultFile_ == 3:
+            resultMtxs = streamResultMtxs(resultMtxs, ["RadiantTemp.csv", "AirTemp.csv", "PET.csv", "PETComf.csv", "PETCategory.csv"], directory, fileName, lb_preparation)
+            radTempMtx, airTempMtx, PET_Mtx, PET_ComfMtx, PET_CategoryMtx = resultMtxs
+        
         calcCancelled = False
         try:
             def climateMapPET(count):
@@ -1488,21 +1764,19 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = calculatePointMRT(mrtMatrix, hour-1, originalHour-1, outDryBulbTemp)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                     else:
                         #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
-                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac, shadeStateCache)
+                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, sunPatchTable, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
-                radTempMtx[count+1] = pointMRTValues
                 
                 #Compute the air temperature.
                 pointAirTempValues = getAirPointValue(airTempDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outDryBulbTemp)
                 if mixedAirOverride[hour-1] == 0: pointAirTempValues = warpByHeight(pointAirTempValues, ptHeightWeights, flowVolValues, heatGainValues, adjacentList, adjacentNameList, groupedInletArea, groupedZoneHeights, groupedGlzHeights, groupedWinCeilDiffs, outdoorClac, outDryBulbTemp)
                 pointAirTempValues = lb_preparation.flattenList(pointAirTempValues)
-                airTempMtx[count+1] = pointAirTempValues
                 
                 #Compute the relative humidity.
                 pointRelHumidValues = getAirPointValue(relHumidDict, testPtZoneWeights, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outRelHumid)
@@ -1547,26 +1821,30 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                     petComfPointValues.append(comfortablePET)
                     petCategoryValues.append(effectPET)
                 
-                PET_Mtx[count+1] = petPointValues
-                PET_ComfMtx[count+1] = petComfPointValues
-                PET_CategoryMtx[count+1] = petCategoryValues
+                return pointMRTValues, pointAirTempValues, petPointValues, petComfPointValues, petCategoryValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapPET)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapPET(hour)
+            #The hours are computed in blocks by a pool of workers and the results of the blocks are merged in order.
+            if parallel_ == True: hourPool = hb_HourBlockPool()
+            else: hourPool = hb_HourBlockPool(maxWorkers = 1)
+            for hourChunk in getHourChunks(len(HOYs), resultMtxs):
+                hourResults = hourPool.map(climateMapPET, hourChunk)
+                for count, hourResult in zip(hourChunk, hourResults):
+                    for mtx, values in zip(resultMtxs, hourResult): mtx[count+1] = values
+                flushResultStreams(resultMtxs)
+        except hb_HourBlockError, hourError:
+            reportHourError(hourError, originalHOYs, testPtZoneNames, lb_preparation)
+            calcCancelled = True
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
             ghenv.Component.AddRuntimeMessage(e, "The calculation has been terminated by the user!")
             calcCancelled = True
-        
+        finally:
+            closeResultStreams(resultMtxs)
         
         if calcCancelled == False:
+            reportShadeStates(shadeStateCache, len(HOYs))
             return radTempMtx, airTempMtx, PET_Mtx, PET_ComfMtx, PET_CategoryMtx
         else:
             return -1
@@ -1953,6 +2231,24 @@ else:
     w = gh.GH_RuntimeMessageLevel.Warning
     ghenv.Component.AddRuntimeMessage(w, "You should let the Ladybug fly first...")
 
+checkHB = True
+if not sc.sticky.has_key('honeybee_release') == True:
+    checkHB = False
+    print "You should first let Honeybee fly..."
+    ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee fly...")
+else:
+    try:
+        if not sc.sticky['honeybee_release'].isCompatible(ghenv.Component): checkHB = False
+        hb_HourBlockPool = sc.sticky["honeybee_HourBlockPool"]
+        hb_HourBlockError = sc.sticky["honeybee_HourBlockError"]
+    except:
+        checkHB = False
+        warning = "You need a newer version of Honeybee to use this compoent." + \
+        "Use updateHoneybee component to update userObjects.\n" + \
+        "If you have already updated userObjects drag Honeybee_Honeybee component " + \
+        "into canvas and try again."
+        ghenv.Component.AddRuntimeMessage(w, warning)
+
 
 #Check the type of comfort analysis recipe connected.
 recipeRecognized = False
@@ -1980,31 +2276,43 @@ manageOutput(comfortModel)
 
 #Check the data input.
 checkData = False
-if recipeRecognized == True and checkLB == True:
+if recipeRecognized == True and checkLB == True and checkHB == True:
     checkData, HOYs, analysisPeriod, fileName, directory = setDefaults(lb_defaultFolder, lb_preparation)
 
 if checkData == True and _runIt == True:
     if comfortModel == "Adaptive":
         result = mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNumbers, airTempDataHeaders, flowVolDataHeaders, flowVolDataNumbers, heatGainDataHeaders, heatGainDataNumbers, zoneSrfNames, testPtViewFactor, viewFactorMesh, latitude, longitude, timeZone, diffSolarRad, directSolarRad, globHorizRad, testPtSkyView, testPtBlockedVec, numSkyPatchDivs, winTrans, cloA, floorR, testPtZoneNames, testPtZoneWeights, ptHeightWeights, zoneInletInfo, inletHeightOverride, prevailingOutdoorTemp, ASHRAEorEN, comfClass, avgMonthOrRunMean, levelOfConditioning, mixedAirOverride, zoneHasWindows, outdoorClac, outSrfTempHeaders, outSrfTempNumbers, outdoorNonSrfViewFac, dataAnalysisPeriod, outWindSpeed, d, a, outdoorPtHeightWeights, allWindowShadesSame, winStatusHeaders, testPtBlockName, zoneWindowTransmiss, zoneWindowNames, allWindSpeedsSame, winSpeedNumbers, horizInfraredRadiation, northAngle, lb_preparation, lb_sunpath, lb_comfortModels, lb_wind)
         if result != -1:
+            if writeResultFile_ == 3:
+                result, resultFiles = summarizeResultStreams(result)
+                radTempResult, airTempResult, operativeTempResult, adaptComfResult, degFromTargetResult = resultFiles
             radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx = result
-            if writeResultFile_ != 0:
+            if writeResultFile_ != 0 and writeResultFile_ != 3:
                 radTempResult, airTempResult, operativeTempResult, adaptComfResult, degFromTargetResult = writeCSVAdapt(lb_preparation, directory, fileName, radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx)
     elif comfortModel == "PMV":
         result = mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNumbers, airTempDataHeaders, flowVolDataHeaders, flowVolDataNumbers, heatGainDataHeaders, heatGainDataNumbers, relHumidDataHeaders, relHumidDataNumbers, clothingLevel, metabolicRate, zoneSrfNames, testPtViewFactor, viewFactorMesh, latitude, longitude, timeZone, diffSolarRad, directSolarRad, globHorizRad, testPtSkyView, testPtBlockedVec, numSkyPatchDivs, winTrans, cloA, floorR, testPtZoneNames, testPtZoneWeights, ptHeightWeights, zoneInletInfo, inletHeightOverride, PPDComfortThresh, humidRatioUp, humidRatioLow, mixedAirOverride, zoneHasWindows, outdoorClac, outSrfTempHeaders, outSrfTempNumbers, outdoorNonSrfViewFac, outDryBulbTemp, outRelHumid, outWindSpeed, d, a, outdoorPtHeightWeights, allWindowShadesSame, winStatusHeaders, testPtBlockName, zoneWindowTransmiss, zoneWindowNames, allWindSpeedsSame, winSpeedNumbers, dataAnalysisPeriod, northAngle, horizInfraredRadiation, lb_preparation, lb_sunpath, lb_comfortModels, lb_wind)
         if result != -1:
+            if writeResultFile_ == 3:
+                result, resultFiles = summarizeResultStreams(result)
+                radTempResult, airTempResult, SET_Result, PMVComfResult, PMV_Result = resultFiles
             radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx = result
-            if writeResultFile_ != 0:
+            if writeResultFile_ != 0 and writeResultFile_ != 3:
                 radTempResult, airTempResult, SET_Result, PMVComfResult, PMV_Result = writeCSVPMV(lb_preparation, directory, fileName, radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx)
     elif comfortModel == "UTCI":
         result = mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNumbers, airTempDataHeaders, flowVolDataHeaders, flowVolDataNumbers, heatGainDataHeaders, heatGainDataNumbers, relHumidDataHeaders, relHumidDataNumbers, zoneSrfNames, testPtViewFactor, viewFactorMesh, latitude, longitude, timeZone, diffSolarRad, directSolarRad, globHorizRad, testPtSkyView, testPtBlockedVec, numSkyPatchDivs, winTrans, cloA, floorR, testPtZoneNames, testPtZoneWeights, ptHeightWeights, zoneInletInfo, inletHeightOverride, mixedAirOverride, zoneHasWindows, outdoorClac, outSrfTempHeaders, outSrfTempNumbers, outdoorNonSrfViewFac, outDryBulbTemp, outRelHumid, outWindSpeed, d, a, outdoorPtHeightWeights, allWindowShadesSame, winStatusHeaders, testPtBlockName, zoneWindowTransmiss, zoneWindowNames, allWindSpeedsSame, winSpeedNumbers, dataAnalysisPeriod, northAngle, horizInfraredRadiation, lb_preparation, lb_sunpath, lb_comfortModels, lb_wind)
         if result != -1:
+            if writeResultFile_ == 3:
+                result, resultFiles = summarizeResultStreams(result)
+                radTempResult, airTempResult, UTCI_Result, OutdoorComfResult, DegFromNeutralResult = resultFiles
             radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx = result
-            if writeResultFile_ != 0:
+            if writeResultFile_ != 0 and writeResultFile_ != 3:
                 radTempResult, airTempResult, UTCI_Result, OutdoorComfResult, DegFromNeutralResult = writeCSVUTCI(lb_preparation, directory, fileName, radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx)
     elif comfortModel == "PET":
         result = mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNumbers, airTempDataHeaders, flowVolDataHeaders, flowVolDataNumbers, heatGainDataHeaders, heatGainDataNumbers, relHumidDataHeaders, relHumidDataNumbers, zoneSrfNames, testPtViewFactor, viewFactorMesh, latitude, longitude, timeZone, diffSolarRad, directSolarRad, globHorizRad, testPtSkyView, testPtBlockedVec, numSkyPatchDivs, winTrans, cloA, floorR, testPtZoneNames, testPtZoneWeights, ptHeightWeights, zoneInletInfo, inletHeightOverride, mixedAirOverride, zoneHasWindows, outdoorClac, outSrfTempHeaders, outSrfTempNumbers, outdoorNonSrfViewFac, outDryBulbTemp, outRelHumid, outWindSpeed, d, a, outdoorPtHeightWeights, allWindowShadesSame, winStatusHeaders, testPtBlockName, zoneWindowTransmiss, zoneWindowNames, allWindSpeedsSame, winSpeedNumbers, dataAnalysisPeriod, northAngle, bodyCharacteristics, climate, horizInfraredRadiation, lb_preparation, lb_sunpath, lb_comfortModels, lb_wind)
         if result != -1:
+            if writeResultFile_ == 3:
+                result, resultFiles = summarizeResultStreams(result)
+                radTempResult, airTempResult, PET_Result, PET_ComfResult, PET_CategoryResult = resultFiles
             radTempMtx, airTempMtx, PET_Mtx, PET_ComfMtx, PET_CategoryMtx = result
-            if writeResultFile_ != 0:
+            if writeResultFile_ != 0 and writeResultFile_ != 3:
                 radTempResult, airTempResult, PET_Result, PET_ComfResult, PET_CategoryResult = writeCSVPET(lb_preparation, directory, fileName, radTempMtx, airTempMtx, PET_Mtx, PET_ComfMtx, PET_CategoryMtx)
@@ -30,7 +30,7 @@ Provided by Ladybug 0.0.45
     Args:
         _idfFilePath: The full file path to the idf file on your system that you would like to run (e.g. C:\ladybug\sample1.idf).
         _epwFileAddress: The full file path to epw weather file that you would like the simulation to run with.
-        parallel_: Set to "True" to run multiple IDFs using multiple CPUs.  Note that this input is only relevant when you have plugged in a list of IDF file addresses.
+        parallel_: Set to "True" to run multiple IDFs using multiple CPUs.  Note that this input is only relevant when you have plugged in a list of IDF file addresses.  Each IDF will be run in a separate folder next to the IDF file with the same name as the IDF (EnergyPlus 8.3 or newer).
         runIt_: Set to 'True' to run the simulation.  You can also connect a 2 to run the simulation in the background.
     Returns:
         report: Report!
@@ -41,11 +41,11 @@ Provided by Ladybug 0.0.45
 
 ghenv.Component.Name = "Honeybee_Re-run IDF"
 ghenv.Component.NickName = 'Re-Run IDF'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "10 | Energy | Energy"
-#compatibleHBVersion = VER 0.0.56\nJUL_24_2016
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 ghenv.Component.AdditionalHelpFromDocStrings = "0"
 
@@ -151,15 +151,48 @@ def runBatchFile(batchFileAddress, runInBackground):
     else:
         os.system(batchFileAddress)
 
+def runIDFsInBatch(idfFilePaths, epwFileAddress):
+    # run the valid idf files on all the cpus. each one runs in its own folder.
+    resultFileAddress = [None for x in idfFilePaths]
+    eioFileAddress = [None for x in idfFilePaths]
+    rddFileAddress = [None for x in idfFilePaths]
+    
+    runner = None
+    runIndexes = []
+    for i, idfFilePath in enumerate(idfFilePaths):
+        epPath = checkTheInputs(idfFilePath, epwFileAddress)
+        if epPath == -1: continue
+        if runner == None: runner = sc.sticky["honeybee_EPBatchRunner"](epPath, readVars = True)
+        runner.addRun(idfFilePath, epwFileAddress)
+        runIndexes.append(i)
+    
+    if runner == None: return resultFileAddress, eioFileAddress, rddFileAddress
+    
+    print '...'
+    print 'RUNNING %d SIMULATIONS'%len(runIndexes)
+    print '...'
+    
+    w = gh.GH_RuntimeMessageLevel.Warning
+    for i, result in zip(runIndexes, runner.run()):
+        for message in result["errSummary"]["messages"]:
+            ghenv.Component.AddRuntimeMessage(w, result["name"] + ": " + message)
+        
+        resultFileAddress[i] = result["csv"]
+        eioFileAddress[i] = result["eio"]
+        rddFileAddress[i] = result["rdd"]
+    
+    return resultFileAddress, eioFileAddress, rddFileAddress
+
 def runParallelIDFs(idfFilePaths, epwFileAddress, runIt, parallel):
+    if parallel == True:
+        return runIDFsInBatch(idfFilePaths, epwFileAddress)
+    
     # placeholders for final lists.
     resultFileAddress = [None for x in idfFilePaths]
     eioFileAddress = [None for x in idfFilePaths]
     rddFileAddress = [None for x in idfFilePaths]
     
-    reunInBackground = runIt
-    if parallel == True:
-        runInBackground = 2
+    runInBackground = runIt
     
     def runEP(i):
         epPath = checkTheInputs(idfFilePaths[i], _epwFileAddress)
@@ -177,11 +210,8 @@ def runParallelIDFs(idfFilePaths, epwFileAddress, runIt, parallel):
             eioFileAddress[i] = resultFileAddress[i].replace('.csv', '.eio')
             rddFileAddress[i] = resultFileAddress[i].replace('.csv', '.rdd')
     
-    if parallel == True:
-        tasks.Parallel.ForEach(range(len(idfFilePaths)), runEP)
-    else:
-        for x in range(len(idfFilePaths)):
-            runEP(x)
+    for x in range(len(idfFilePaths)):
+        runEP(x)
     
     
     return resultFileAddress, eioFileAddress, rddFileAddress
@@ -34,7 +34,7 @@ Provided by Honeybee 0.0.65
         _DLAIllumThresholds_: Illuminance threshold for Daylight Autonomy calculation in lux. Default is set to 300 lux.
         SHDGroupI_Sensors_: Senors for dhading group I. Use shadingGroupSensors component to prepare the inputs
         SHDGroupII_Sensors_: Senors for dhading group II. Use shadingGroupSensors component to prepare the inputs
-        _runIt: set to True to run the analysis
+        _runIt: set to True to run the analysis. Set to 3 to calculate DA, CDA, UDLI and sDA inside Grasshopper without running Daysim's ds_el_lighting for each space. This is much faster for models with many spaces but annualProfiles and htmReport will not be generated. For dynamic shadings the annual profiles of an earlier run of this component are used to find the state of the blinds.
     Returns:
         DLA: Daylight Autonomy > Percentage of the time during the active occupancy hours that the test point receives more daylight than the illuminance threshold.
         UDLI_Less_100: Useful Daylight illuminance > Percentage of time during the active occupancy hours that the test point receives less than 100 lux.
@@ -46,11 +46,11 @@ Provided by Honeybee 0.0.65
 """
 ghenv.Component.Name = "Honeybee_Read Annual Result I"
 ghenv.Component.NickName = 'readAnnualResultsI'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "04 | Daylight | Daylight"
-#compatibleHBVersion = VER 0.0.57\nNOV_03_2015
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "2"
 except: pass
@@ -84,7 +84,7 @@ def getFilelength(fileName):
             pass
     return i + 1
 
-def executeBatchFiles(batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.2):
+def executeBatchFiles(batchFileNames, maxPRuns = None, shell = False):
 
     """Run a number of batch files in parallel and
         wait to end of the analysis.
@@ -95,46 +95,13 @@ def executeBatchFiles(batchFileNames, maxPRuns = None, shell = False, waitingTim
             shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
     """
 
-    if not maxPRuns : maxPRuns = 1
-    maxPRuns = int(maxPRuns)
-    total = len(batchFileNames)
+    scheduler = sc.sticky["honeybee_JobScheduler"]()
+    for count, batchFileName in enumerate(batchFileNames):
+        # batch files of different folders can have the same name
+        scheduler.addTask("%d_%s"%(count, os.path.basename(batchFileName)), batchFileName.replace("\\", "/"), shell = shell)
     
-    if maxPRuns < 1: maxPRuns = 1
-    if maxPRuns > total: maxPRuns = total
-    
-    running = 0
-    done = False
-    jobs = []
-    pid = 0
-    
-    try:
-        while not done:
-            if running < maxPRuns and pid < total:
-                # execute the files
-                jobs.append(subprocess.Popen(batchFileNames[pid].replace("\\", "/") , shell = shell))
-                pid+=1
-                time.sleep(waitingTime)
-            
-            # count how many jobs are running and how many are done
-            running = 0
-            finished = 0
-            for job in jobs:
-                if job.poll() is None:
-                    #one job is still running
-                    running += 1
-                else:
-                    finished += 1
-    
-            if running == maxPRuns:
-                # wait for half a second
-                #print "waiting..."
-                time.sleep(waitingTime)
-    
-            if finished ==  total:
-                done = True
-    
-    except Exception, e:
-        print "Something went wrong: %s"%str(e) 
+    if not scheduler.run(maxPRuns or 1):
+        print "Something went wrong:\n" + scheduler.report()
 
 
 def convertIllFileDaraTreeIntoSortedDictionary(illFilesAddress):
@@ -222,7 +189,60 @@ def convertEPScheduleToDSSchedule(scheduleName, folder):
     
     return fullPath
 
-def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SHDGroupI_Sensors, SHDGroupII_Sensors, DLAIllumThresholds, runInBackground=False):
+def calculateMetricsInProcess(illFileSets, numOfPtsInEachSpace, occFiles, DLAIllumThresholds, projectDirectory):
+    """Calculate the results for all the spaces from the ill files without running Daysim."""
+    
+    w = gh.GH_RuntimeMessageLevel.Warning
+    metricsClass = sc.sticky["honeybee_AnnualDaylightMetrics"]
+    baseMetrics = metricsClass(illFileSets[0][0])
+    
+    # Honeybee currently only supports one shading group for results visulaization.
+    shadingStates = []
+    if len(illFileSets.keys()) > 1:
+        shadingStates = [metricsClass(stateFiles) for stateFiles in illFileSets[1]]
+    if len(illFileSets.keys()) > 2:
+        ghenv.Component.AddRuntimeMessage(w, "Only the first shading group is considered in calculating the results.")
+    
+    # find annual profiles from an earlier run to set the state of the blinds
+    annualProfiles = {}
+    if shadingStates:
+        for fileName in os.listdir(projectDirectory):
+            if fileName.endswith("_intgain.csv") and "_space_" in fileName:
+                try: annualProfiles[int(fileName[:-len("_intgain.csv")].split("_")[-1])] = os.path.join(projectDirectory, fileName)
+                except ValueError: pass
+        if len(annualProfiles) == 0:
+            warning = "Can't find the annual profiles of an earlier Daysim run in " + projectDirectory + \
+                      "\nThe results are calculated with the dynamic shadings open for all the hours."
+            ghenv.Component.AddRuntimeMessage(w, warning)
+    
+    results = [[], [], [], [], [], [], []]
+    occupancyMasks = {}
+    firstPoint = 0
+    for spaceCount, ptsCount in enumerate(numOfPtsInEachSpace):
+        try: occFile = occFiles[spaceCount]
+        except: occFile = occFiles[0]
+        if occFile not in occupancyMasks:
+            occupancyMasks[occFile] = metricsClass.occupancyMask(occFile, baseMetrics.hourCount)
+        
+        try: illumT = float(DLAIllumThresholds[spaceCount])
+        except: illumT = float(DLAIllumThresholds[0])
+        
+        shadingProfile = None
+        if spaceCount in annualProfiles:
+            shadingProfiles = metricsClass.readShadingProfiles(annualProfiles[spaceCount])
+            if len(shadingProfiles) != 0: shadingProfile = shadingProfiles[0]
+        
+        spaceResults = baseMetrics.calculate(firstPoint, ptsCount, occupancyMasks[occFile], illumT, shadingStates, shadingProfile)
+        for resultCount, key in enumerate(["DA", "UDI_Less_100", "UDI_100_2000", "UDI_More_2000", "cDA"]):
+            results[resultCount].append(spaceResults[key])
+        # annual profiles and lighting reports are only generated by Daysim
+        results[5].append(None)
+        results[6].append(None)
+        firstPoint += ptsCount
+    
+    return results
+
+def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SHDGroupI_Sensors, SHDGroupII_Sensors, DLAIllumThresholds, runInBackground=False, calculateInProcess=False):
     
     if sc.sticky.has_key('honeybee_release'):
 
@@ -389,11 +409,7 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
     # that's why I just try the first list of the ill files
     numOfPtsInEachFile = []
     for illFile in originalIllFilesSorted[0][0]:
-        with open(illFile, "r") as illInf:
-            for lineCount, line in enumerate(illInf):
-                if not line.startswith("#"):
-                    numOfPtsInEachFile.append(len(line.strip().split(" ")) - 4)
-                    break
+        numOfPtsInEachFile.append(sc.sticky["honeybee_DaysimIllIndex"].get(illFile).pointCount)
     
     # find the current project directory that could be differnt from the old one
     projectDirectory = os.path.dirname(originalIllFilesSorted[0][0][0]) + "\\"
@@ -406,6 +422,10 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
         msg = "Number of points in ill files: " + `sum(numOfPtsInEachFile)` + \
               " doesn't match the number of points in point files: " + `numOfPts`
         return msg, None
+    
+    # calculate the results from the ill files and skip ds_el_lighting
+    if calculateInProcess:
+        return None, calculateMetricsInProcess(originalIllFilesSorted, numOfPtsInEachSpace, occFiles, DLAIllumThresholds, projectDirectory)
    
     # find the heading files and creat multiple ill files for the study
     heaFiles = []
@@ -908,7 +928,7 @@ if _runIt and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
     lightingControlGroups_.SimplifyPaths()
     _illFilesAddress.SimplifyPaths()
     
-    res = main(_illFilesAddress, _testPoints, ptsVectors_, occupancyFiles_, lightingControlGroups_, SHDGroupI_Sensors_, SHDGroupII_Sensors_, _DLAIllumThresholds_, _runIt > 1)
+    res = main(_illFilesAddress, _testPoints, ptsVectors_, occupancyFiles_, lightingControlGroups_, SHDGroupI_Sensors_, SHDGroupII_Sensors_, _DLAIllumThresholds_, _runIt > 1, _runIt == 3)
     if res!= -1:
         msg, results = res
         
@@ -928,6 +948,8 @@ if _runIt and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
             htmReport = DataTree[Object]()
             
             def readDSStandardResults(filePath):
+                # results that are calculated inside Grasshopper are already a list of values
+                if isinstance(filePath, list): return filePath
                 results = []
                 with open(filePath, "r") as inf:
                     for line in inf:
@@ -936,11 +958,7 @@ if _runIt and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
                 return results
             
             def getsDA(DLARes, threshold = 50):
-                moreThan = 0
-                for res in DLARes:
-                    if res >= threshold:
-                        moreThan += 1
-                return "%.2f"%((moreThan/len(DLARes)) * 100)
+                return "%.2f"%sc.sticky["honeybee_AnnualDaylightMetrics"].sDA(DLARes, threshold)
             
             
             for branchNum in range(_testPoints.BranchCount):
@@ -39,11 +39,11 @@ Provided by Honeybee 0.0.65
 """
 ghenv.Component.Name = "Honeybee_Read DS Result for a point"
 ghenv.Component.NickName = 'readDSHourlyResults'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "04 | Daylight | Daylight"
-#compatibleHBVersion = VER 0.0.56\nFEB_01_2015
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "0"
 except: pass
@@ -57,6 +57,24 @@ import Grasshopper.Kernel as gh
 from Grasshopper import DataTree
 from Grasshopper.Kernel.Data import GH_Path
 
+w = gh.GH_RuntimeMessageLevel.Warning
+#Honeybee check.
+hbCheck = True
+if not sc.sticky.has_key('honeybee_release') == True:
+    hbCheck = False
+    print "You should first let Honeybee fly..."
+    ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee fly...")
+else:
+    try:
+        if not sc.sticky['honeybee_release'].isCompatible(ghenv.Component): hbCheck = False
+    except:
+        hbCheck = False
+        warning = "You need a newer version of Honeybee to use this compoent." + \
+        "Use updateHoneybee component to update userObjects.\n" + \
+        "If you have already updated userObjects drag Honeybee_Honeybee component " + \
+        "into canvas and try again."
+        ghenv.Component.AddRuntimeMessage(w, warning)
+
 def isAllNone(dataList):
     for item in dataList.AllData():
         if item!=None: return False
@@ -187,11 +205,7 @@ def main(illFilesAddress, testPoints, targetPoint, annualProfiles):
     # that's why I just try the first list of the ill files
     numOfPtsInEachFile = []
     for illFile in illFileSets[0][0]:
-        with open(illFile, "r") as illInf:
-            for lineCount, line in enumerate(illInf):
-                if not line.startswith("#"):
-                    numOfPtsInEachFile.append(len(line.strip().split(" ")) - 4)
-                    break
+        numOfPtsInEachFile.append(sc.sticky["honeybee_DaysimIllIndex"].get(illFile).pointCount)
     
     # find the right ill file(s) to look into and read the results
     # print targetPtIndex
@@ -241,18 +255,16 @@ def main(illFilesAddress, testPoints, targetPoint, annualProfiles):
     for shadingGroupCount in illFileSets.keys():
         for stateCount, targetIllFiles in enumerate(illFileSets[shadingGroupCount]):
             targetIllFile = targetIllFiles[targetListNumber]
-            result = open(targetIllFile, 'r')
-            for lineCount, line in enumerate(result):
-                hourLuxValue = line.strip().split(" ")[targetIndexNumber + 4]
-                illuminanceValues[shadingGroupCount][stateCount].append(float(hourLuxValue))
-            result.close()
+            # the point-major copy of the ill file is written once and reused for other points
+            illIndex = sc.sticky["honeybee_DaysimIllIndex"].get(targetIllFile, transpose = True)
+            illuminanceValues[shadingGroupCount][stateCount].extend(illIndex.readPoint(targetIndexNumber))
             
                 
     return msg, illuminanceValues, shadingProfiles[branch]
 
 
 
-if _targetPoint!=None and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
+if hbCheck and _targetPoint!=None and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
     
     _testPoints.SimplifyPaths()
     _illFilesAddress.SimplifyPaths()
@@ -43,11 +43,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Refine Daylight Simulation"
 ghenv.Component.NickName = 'refineDaylightAnalysis'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "04 | Daylight | Daylight"
-#compatibleHBVersion = VER 0.0.56\nFEB_01_2015
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "0"
 except: pass
@@ -98,7 +98,7 @@ def main(octFile, analysisRecipe, numOfCPUs, thisRunName, runIt):
         return -1
     
     lb_preparation = sc.sticky["ladybug_Preparation"]()
-    hb_writeRAD = sc.sticky["honeybee_WriteRAD"]()
+    hb_writeRAD = sc.sticky["honeybee_WriteRAD"](ghenv.Component)
     hb_writeRADAUX = sc.sticky["honeybee_WriteRADAUX"]()
     hb_materilaLib = sc.sticky["honeybee_materialLib"]
     hb_scheduleLib = sc.sticky["honeybee_ScheduleLib"]
@@ -172,6 +172,9 @@ def main(octFile, analysisRecipe, numOfCPUs, thisRunName, runIt):
     # except image-based simulation
     testPtsEachCPU, lenOfPts = hb_writeRAD.writeTestPtFile(subWorkingDir, \
                                     radFileName, numOfCPUs, analysisRecipe)
+    
+    if len(testPtsEachCPU)!=0: # make sure it is a grid based analysis
+        numOfCPUs = len(testPtsEachCPU) # grid-based studies are split into more files than CPUs
             
     ######################## WRITE BATCH FILES #######################
     # if analysis type is annual this function will write hea files too
@@ -183,7 +186,7 @@ def main(octFile, analysisRecipe, numOfCPUs, thisRunName, runIt):
     
     if runIt:
         hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
-                                  fileNames, pcompBatchFile, waitingTime)
+                                  fileNames, pcompBatchFile)
         
         results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
                                 numOfCPUs, analysisRecipe, expectedResultFiles)
@@ -205,7 +208,6 @@ if _runIt == True and _analysisRecipe!=None and _octFile!=None and _thisRunName!
     
     report = ""
     done = False
-    waitingTime = 0.2 # waiting time between batch files in seconds
     try: numOfCPUs = int(_numOfCPUs_)
     except: numOfCPUs = 1
     
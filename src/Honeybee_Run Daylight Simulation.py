@@ -22,6 +22,8 @@
 
 """
 export geometries to rad file, and run daylighting/energy simulation
+-
+Scene octrees are cached in radianceCache folder inside the working directory so changing only the sky or the test points doesn't re-build the scene. Grid-based studies also reuse the ambient file of the previous runs with the same scene, sky and Radiance parameters.
 
 -
 Provided by Honeybee 0.0.65
@@ -54,11 +56,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Run Daylight Simulation"
 ghenv.Component.NickName = 'runDaylightAnalysis'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "04 | Daylight | Daylight"
-#compatibleHBVersion = VER 0.0.56\nDEC_21_2015
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "1"
 except: pass
@@ -80,7 +82,7 @@ ghenv.Component.Params.Output[3].NickName = "results"
 ghenv.Component.Params.Output[3].Name = "results"
 results = []
 
-def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir, radFileName, meshParameters, waitingTime, additionalRadFiles, overwriteResults, exportAirWalls):
+def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir, radFileName, meshParameters, additionalRadFiles, overwriteResults, exportAirWalls):
     # import the classes
     w = gh.GH_RuntimeMessageLevel.Warning
     
@@ -209,7 +211,10 @@ def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir
     
     if runRad:
         hb_writeRAD.runBatchFiles(initBatchFileName, batchFilesName, \
-                                  fileNames, pcompBatchFile, waitingTime, runRad > 1)
+                                  fileNames, pcompBatchFile, runRad > 1)
+        
+        if hb_writeRAD.sceneCache != None:
+            print hb_writeRAD.sceneCache.report()
         
         results = hb_writeRAD.collectResults(subWorkingDir, radFileName, \
                                 numOfCPUs, analysisRecipe, expectedResultFiles)
@@ -236,7 +241,6 @@ if _writeRad == True and _analysisRecipe!=None and ((len(_HBObjects)!=0 and _HBO
     
     report = ""
     done = False
-    waitingTime = 0.2 # waiting time between batch files in seconds
     try: numOfCPUs = int(_numOfCPUs_)
     except: numOfCPUs = 1
     
@@ -251,7 +255,7 @@ if _writeRad == True and _analysisRecipe!=None and ((len(_HBObjects)!=0 and _HBO
     
     
     result = main(north_, _HBObjects, _analysisRecipe, runRad_, numOfCPUs, \
-                  _workingDir_, _radFileName_, meshSettings_, waitingTime, \
+                  _workingDir_, _radFileName_, meshSettings_, \
                   additionalRadFiles_, overwriteResults_, exportAirWalls_)
     
     if result!= -1:
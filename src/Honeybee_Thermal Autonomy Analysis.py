@@ -35,8 +35,8 @@ Levitt, B.; Ubbelohde, M.; Loisos, G.; Brown, N.  Thermal Autonomy as Metric and
 Provided by Honeybee 0.0.65
     
     Args:
-        _comfResultsMtx: A comfort matrix (adaptive, PMV or Outdoor) output from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.
-        _degOrPMVMtx: The degreeFromTargetMtx, PMV_Mtx, or DegFromNeutralMtx from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.
+        _comfResultsMtx: A comfort matrix (adaptive, PMV or Outdoor) output from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.  This can also be the comfort csv result file (eg. PMVComfResult) of a 'Honeybee_Microclimate Map Analysis' that was run with writeResultFile_ set to 3, in which case the hours are read from the file one at a time without loading the whole matrix.
+        _degOrPMVMtx: The degreeFromTargetMtx, PMV_Mtx, or DegFromNeutralMtx from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.  As with the _comfResultsMtx, this can also be the matching csv result file of a streamed 'Honeybee_Microclimate Map Analysis'.
         _viewFactorMesh: The list of view factor meshes that comes out of the  "Honeybee_Indoor View Factor Calculator".
         _HBZones: The HBZones out of any of the HB components that generate or alter zones.  Note that these should ideally be the zones that are fed into the Run Energy Simulation component as surfaces may not align otherwise.  Zones read back into Grasshopper from the Import idf component will not align correctly with the EP Result data.
         _totalThermalEnergy_: The totalThermalEnergy output from the "Honeybee_Read EP Result" component.  If no data tree is connected here, it will be assumed that all zones are completely passive and only occupancy will be taken into accout for the Thermal Autonomy calculation.
@@ -64,11 +64,11 @@ Provided by Honeybee 0.0.65
 
 ghenv.Component.Name = "Honeybee_Thermal Autonomy Analysis"
 ghenv.Component.NickName = 'ThermalAutonomy'
-ghenv.Component.Message = 'VER 0.0.65\nJAN_01_2020'
+ghenv.Component.Message = 'VER 0.0.65\nOCT_18_2026'
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Honeybee"
 ghenv.Component.SubCategory = "10 | Energy | Energy"
-#compatibleHBVersion = VER 0.0.56\nFEB_01_2015
+#compatibleHBVersion = VER 0.0.65\nOCT_18_2026
 #compatibleLBVersion = VER 0.0.59\nFEB_01_2015
 try: ghenv.Component.AdditionalHelpFromDocStrings = "6"
 except: pass
@@ -81,6 +81,7 @@ import Rhino as rc
 import scriptcontext as sc
 import math
 import os
+import itertools
 import System.Threading.Tasks as tasks
 
 
@@ -114,7 +115,7 @@ def recallHBZoneProperties(HOYs, occupancyThere):
     HBScheduleList = sc.sticky["honeybee_ScheduleLib"].keys()
     
     for zoneCount, HZone in enumerate(_HBZones):
-        zone = hb_hive.callFromHoneybeeHive([HZone])[0]
+        zone = hb_hive.proxyFromHoneybeeHive([HZone], ghenv.Component)[0]
         zoneNames.append(zone.name)
         values = []
         if occupancyThere == False:
@@ -151,6 +152,9 @@ def recallHBZoneProperties(HOYs, occupancyThere):
                 analysisPValues.append(values[hour-1])
             occupancySchList.append(analysisPValues)
     
+    # the zones are only read so they shouldn't be copied
+    if sc.sticky["honeybee_Hive"].reportProxies:
+        print "\n".join(sc.sticky["honeybee_Hive"].proxyReport(ghenv.Component, clear = True))
     
     return checkZones, zoneNames, occupancySchList
 
@@ -302,6 +306,33 @@ def checkOccupancyFile(occupancyFile, HOYs):
     
     return checkData5, analysisPValues
 
+def isComfortResultFile(comfMtx):
+    #A streamed Microclimate Map Analysis gives the path to the csv file of each matrix instead of the matrix.
+    return len(comfMtx) == 1 and str(comfMtx[0]).lower().endswith(".csv")
+
+def comfortMatrixHead(comfMtx):
+    #Get the header and the first hour of a comfort matrix or of its csv result file.
+    if isComfortResultFile(comfMtx):
+        with open(comfMtx[0], 'r') as resultFile:
+            header = resultFile.readline().strip()
+            firstRow = resultFile.readline().strip().split(',')
+        return header, firstRow
+    return comfMtx[0], comfMtx[1]
+
+def comfortMatrixRows(comfMtx):
+    #Yield the hours of a comfort matrix one at a time so that csv result files are never loaded as a whole.
+    if isComfortResultFile(comfMtx):
+        with open(comfMtx[0], 'r') as resultFile:
+            resultFile.readline()
+            for line in resultFile:
+                if line.strip() != '': yield [float(val) for val in line.split(',')]
+    else:
+        for row in comfMtx[1:]: yield row
+
+def occupancyBitmap(values, threshold):
+    #One byte for each hour of the analysis period that is 1 when the value is above the threshold.
+    return bytearray([1 if val > threshold else 0 for val in values])
+
 def checkTheInputs():
     #Set a default fileName.
     lb_defaultFolder = sc.sticky["Ladybug_DefaultFolder"]
@@ -315,12 +346,22 @@ def checkTheInputs():
     workingDir = os.path.join(workingDir, fileName, "ComfortAnalysis")
     workingDir = lb_preparation.makeWorkingDir(workingDir)
     
+    #Check that the csv result files of a streamed Microclimate Map Analysis exist.
+    for comfMtx, inputName in [(_comfResultsMtx, "_comfResultsMtx"), (_degOrPMVMtx, "_degOrPMVMtx")]:
+        if isComfortResultFile(comfMtx) and not os.path.isfile(comfMtx[0]):
+            warning = "Cannot find the " + inputName + " result file: " + comfMtx[0]
+            print warning
+            ghenv.Component.AddRuntimeMessage(w, warning)
+            return False, None, None, None, None, None, None, None, None, None, None
+    comfHeader, comfFirstHour = comfortMatrixHead(_comfResultsMtx)
+    degHeader, degFirstHour = comfortMatrixHead(_degOrPMVMtx)
+    
     #Check to be sure that the length of the mesh faces and result matrices match.
     checkData1 = False
     comfortType = ""
-    comfortType = _comfResultsMtx[0].split(" ")[0]
-    ptLen1 = len(_comfResultsMtx[1])
-    ptLen3 = len(_degOrPMVMtx[1])
+    comfortType = comfHeader.split(" ")[0]
+    ptLen1 = len(comfFirstHour)
+    ptLen3 = len(degFirstHour)
     meshFaceCount = []
     for mesh in _viewFactorMesh:
         meshFaceCount.append(mesh.Faces.Count)
@@ -333,8 +374,8 @@ def checkTheInputs():
     
     #Check the analysis period.
     try:
-        analysisPeriod1 = (int(_comfResultsMtx[0].split(";")[-2].split(",")[0].split("(")[-1]), int(_comfResultsMtx[0].split(";")[-2].split(",")[1].split(" ")[-1]), int(_comfResultsMtx[0].split(";")[-2].split(",")[-1].split(" ")[-1].split(")")[0]))
-        analysisPeriod2 = (int(_comfResultsMtx[0].split(";")[-1].split(",")[0].split("(")[-1]), int(_comfResultsMtx[0].split(";")[-1].split(",")[1].split(" ")[-1]), int(_comfResultsMtx[0].split(";")[-1].split(",")[-1].split(" ")[-1].split(")")[0]))
+        analysisPeriod1 = (int(comfHeader.split(";")[-2].split(",")[0].split("(")[-1]), int(comfHeader.split(";")[-2].split(",")[1].split(" ")[-1]), int(comfHeader.split(";")[-2].split(",")[-1].split(" ")[-1].split(")")[0]))
+        analysisPeriod2 = (int(comfHeader.split(";")[-1].split(",")[0].split("(")[-1]), int(comfHeader.split(";")[-1].split(",")[1].split(" ")[-1]), int(comfHeader.split(";")[-1].split(",")[-1].split(" ")[-1].split(")")[0]))
         analysisPeriod = [analysisPeriod1, analysisPeriod2]
     except:
         analysisPeriod = []
@@ -422,10 +463,10 @@ def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zon
     
     #Create placeholders for all of the hours.
     for hour in occupancySchList[0]:
-        occTCP_Mtx.append(0)
-        TA_Mtx.append(0)
-        OverHeatedMtx.append(0)
-        UnderHeatedMtx.append(0)
+        occTCP_Mtx.append([])
+        TA_Mtx.append([])
+        OverHeatedMtx.append([])
+        UnderHeatedMtx.append([])
    
     #Match the totalEnergy values to the HBZones.
     totEnergyNumbersMatched = []
@@ -475,55 +516,51 @@ def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zon
     occHrsNum = []
     for point in pointZoneList: occHrsNum.append(0)
     
-    #Finally, compute the matrices for each hour and point.
-    def calcComf(count):
+    #Turn the occupancy schedules and the energy use of each zone into bitmaps of the hours that are occupied and conditioned.
+    occupiedHours = [occupancyBitmap(schedule, occupancyThreshold) for schedule in occupancySchList]
+    conditionedHours = [occupancyBitmap(energyList, 0) for energyList in totEnergyNumbersMatched]
+    
+    #Finally, compute the matrices in a single pass over the hours of the comfort matrices.
+    hourCount = len(occupancySchList[0])
+    for count, comfRow, degRow in itertools.izip(xrange(hourCount), comfortMatrixRows(_comfResultsMtx), comfortMatrixRows(_degOrPMVMtx)):
+        occupied = [bitmap[count] for bitmap in occupiedHours]
+        conditioned = [bitmap[count] for bitmap in conditionedHours]
         occTCP = []
         TA = []
         OverHeated = []
         UnderHeated = []
-        for pointCount, pointZone in enumerate(pointZoneList):
-            try:
-                _comfResultsMtx[count + 1][pointCount]
-                #Check to see if the point's zone is occupied.  Otheriswe, it does not count for anything.
-                if occupancySchList[pointZone][count] > occupancyThreshold:
-                    occHrsNum[pointCount] += 1
-                    #Check to see if the point is comfortable.
-                    if _comfResultsMtx[count + 1][pointCount] > 0:
-                        occTCP.append(1)
-                        OverHeated.append(0)
+        for pointCount, pointZone in enumerate(pointZoneList[:len(comfRow)]):
+            #Check to see if the point's zone is occupied.  Otheriswe, it does not count for anything.
+            if occupied[pointZone]:
+                occHrsNum[pointCount] += 1
+                #Check to see if the point is comfortable.
+                if comfRow[pointCount] > 0:
+                    occTCP.append(1)
+                    OverHeated.append(0)
+                    UnderHeated.append(0)
+                    #Check to see if the point's zone is being conditioned.
+                    if conditioned[pointZone]: TA.append(0)
+                    else: TA.append(1)
+                else:
+                    occTCP.append(0)
+                    TA.append(0)
+                    if degRow[pointCount] > 0:
+                        OverHeated.append(1)
                         UnderHeated.append(0)
-                        #Check to see if the point's zone is being conditioned.
-                        if totEnergyNumbersMatched[pointZone][count] > 0: TA.append(0)
-                        else: TA.append(1)
                     else:
-                        occTCP.append(0)
-                        TA.append(0)
-                        if _degOrPMVMtx[count + 1][pointCount] > 0:
-                            OverHeated.append(1)
-                            UnderHeated.append(0)
-                        else:
-                            OverHeated.append(0)
-                            UnderHeated.append(1)
-                else:
-                    occTCP.append(0.0)
-                    TA.append(0.0)
-                    OverHeated.append(0.0)
-                    UnderHeated.append(0.0)
-            except:
-                pass
+                        OverHeated.append(0)
+                        UnderHeated.append(1)
+            else:
+                occTCP.append(0.0)
+                TA.append(0.0)
+                OverHeated.append(0.0)
+                UnderHeated.append(0.0)
         
         occTCP_Mtx[count+1] = occTCP
         TA_Mtx[count+1] = TA
         OverHeatedMtx[count+1] = OverHeated
         UnderHeatedMtx[count+1] = UnderHeated
     
-    #Run through every hour of the analysis to fill up the matrices.
-    #if parallel_ == True and len(occupancySchList[0]) != 1:
-    #    tasks.Parallel.ForEach(range(len(occupancySchList[0])), calcComf)
-    #else:
-    for hour in range(len(occupancySchList[0])):
-        calcComf(hour)
-    
     # Add the total occupied hours to the matrix (to be used to help calculate comfort autonomy).
     occTCP_Mtx.append(occHrsNum)
     TA_Mtx.append(occHrsNum)